@@ -0,0 +1,90 @@
+"""Cost of Q-network checkpoints and how much they stall the event loop.
+
+A ticker task measures the longest gap between event loop iterations while
+checkpoints are saved, against the same ticker with serialization run inline
+(torch.save on the event loop), then times a cold load of the latest version.
+
+    python -m benchmarks.bench_checkpoints --saves 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import numpy as np
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.checkpoint_manager import CheckpointManager, FileCheckpointBackend, serialize_agent
+
+STATE_SIZE = 20
+ACTION_SIZE = 7
+
+
+def make_agent():
+    agent = AdaptiveQNetwork(STATE_SIZE, ACTION_SIZE)
+    rng = np.random.default_rng(0)
+    for i in range(64):
+        agent.store_experience((rng.random(STATE_SIZE), i % ACTION_SIZE, 1.0, rng.random(STATE_SIZE), False))
+    agent.train()
+    return agent
+
+
+async def max_loop_gap(work):
+    gaps = []
+    running = True
+
+    async def ticker():
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    running = False
+    await task
+    return elapsed, max(gaps) if gaps else 0.0
+
+
+async def run(saves):
+    agent = make_agent()
+    with tempfile.TemporaryDirectory() as directory:
+        manager = CheckpointManager(agent, FileCheckpointBackend(os.path.join(directory, "dqn_model.pth")), keep=3)
+
+        async def background_saves():
+            for _ in range(saves):
+                await manager.save(force=True)
+
+        async def inline_saves():
+            for _ in range(saves):
+                serialize_agent(agent)
+                await asyncio.sleep(0)
+
+        elapsed, gap = await max_loop_gap(background_saves)
+        print(f"background save  {elapsed / saves * 1000:6.2f}ms/save  max loop stall {gap * 1000:6.2f}ms  blob {manager.last_blob_bytes / 1024:.1f}KB")
+        elapsed, gap = await max_loop_gap(inline_saves)
+        print(f"inline serialize {elapsed / saves * 1000:6.2f}ms/save  max loop stall {gap * 1000:6.2f}ms")
+
+        fresh = CheckpointManager(AdaptiveQNetwork(STATE_SIZE, ACTION_SIZE), manager.backend)
+        started = time.perf_counter()
+        version = await fresh.load_latest()
+        print(f"cold load v{version}     {(time.perf_counter() - started) * 1000:6.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--saves", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.saves))
+
+
+if __name__ == "__main__":
+    main()
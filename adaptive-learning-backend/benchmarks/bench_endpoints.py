@@ -0,0 +1,131 @@
+"""Offline load test of /process-answer and the quiz batch endpoint.
+
+Runs the learning router in process against the fake LLM backend (or a
+StubGeminiServer with --stub), so no quota is spent. Mastery writes are
+skipped to keep MongoDB out of the measurement.
+
+    python -m benchmarks.bench_endpoints --requests 200 --concurrency 20 --latency lognormal:0.3,0.5
+
+With --prefetch, quiz batches are served first and /process-answer answers
+their questions wrongly, so explanations warmed by the ExplanationPrefetcher
+are measured as cache hits.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import httpx
+from fastapi import FastAPI
+from src.api.routes import learning
+from src.services.gemini_client import GeminiClient, close_http_client
+from src.services.llm_backends import FakeLLMBackend
+from src.services.rate_limiter import GeminiRateLimiter
+from src.services.stub_gemini_server import StubGeminiServer
+
+
+def wrong_answer(student_id, served=None):
+    if served:
+        question = served[student_id % len(served)]
+        wrong = next(index for index, option in enumerate(question["options"]) if not option["correct"])
+        return {"studentId": student_id, "questionId": 1, "selectedAnswer": wrong, "isCorrect": False,
+                "currentState": {"classLevel": 5, "consecutiveCorrect": 0, "consecutiveWrong": 0}, "questionData": question}
+    return {
+        "studentId": student_id,
+        "questionId": 1,
+        "selectedAnswer": 0,
+        "isCorrect": False,
+        "currentState": {"classLevel": 5, "consecutiveCorrect": 0, "consecutiveWrong": 1, "currentDifficulty": "medium",
+                         "recentPerformance": [True, False], "timeSpent": 40, "hintsUsed": 0},
+        "questionData": {"id": 1, "question": f"What is {student_id % 12 + 2} × 7?", "difficulty": "medium",
+                         "conceptTags": ["multiplication"],
+                         "options": [{"text": "12", "correct": False}, {"text": str((student_id % 12 + 2) * 7), "correct": True},
+                                     {"text": "30", "correct": False}, {"text": "42", "correct": False}]}
+    }
+
+
+def quiz_batch(student_id):
+    return {"conceptTags": ["Multiplication"], "classLevel": 5, "subjectType": "math", "studentId": student_id}
+
+
+async def run(client, path, make_body, n, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    responses = []
+    failures = 0
+
+    async def one(i):
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post(path, json=make_body(i))
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failures += 1
+            else:
+                responses.append(response.json())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{path:32s} {n / elapsed:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f}ms  "
+          f"p95 {p95 * 1000:7.1f}ms  failures {failures}")
+    return responses
+
+
+async def main_async(args):
+    app = FastAPI()
+    app.include_router(learning.router, prefix="/api/learning")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        if not args.prefetch:
+            await run(client, "/api/learning/process-answer", wrong_answer, args.requests, args.concurrency)
+            await run(client, "/api/learning/generate-quiz-batch", quiz_batch, args.requests, args.concurrency)
+        else:
+            prefetcher = learning.explanation_prefetcher
+            prefetcher.enabled = True
+            prefetcher.start()
+            batches = await run(client, "/api/learning/generate-quiz-batch", quiz_batch, args.requests, args.concurrency)
+            served = [question for batch in batches for question in batch["questions"]]
+            start = time.perf_counter()
+            while prefetcher.stats()["pending"] or prefetcher.stats()["inProgress"]:
+                await asyncio.sleep(0.05)
+            print(f"Prefetch drained in {time.perf_counter() - start:.2f}s: {prefetcher.stats()}")
+            await run(client, "/api/learning/process-answer", lambda i: wrong_answer(i, served), args.requests, args.concurrency)
+            await prefetcher.stop()
+    await close_http_client()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", default="lognormal:0.3,0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--prefetch", action="store_true", help="prefetch explanations for served questions (unlimited budget)")
+    parser.add_argument("--stub", action="store_true", help="go through HTTP to a local stub server instead of the in-process fake")
+    args = parser.parse_args()
+
+    if args.stub:
+        url = StubGeminiServer(latency=args.latency, error_rate=args.error_rate).start()
+        learning.gemini_service.client = GeminiClient(url, rate_limiter=GeminiRateLimiter(rpm=1000000, tpm=1000000000))
+    else:
+        learning.gemini_service.client = FakeLLMBackend(latency=args.latency, error_rate=args.error_rate)
+    learning.mastery_service.update_mastery_level = lambda **kwargs: None
+    learning.explanation_prefetcher.max_per_minute = 1000000
+    learning.explanation_prefetcher.concurrency = 8
+    learning.explanation_prefetcher.max_pending = 100000
+
+    print(f"Backend: {'stub server' if args.stub else 'in-process fake'}, latency {args.latency}, error rate {args.error_rate}")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Concurrent throughput of the Gemini transport against a local stub endpoint.
+
+Compares the old blocking ``requests.post`` call made from inside a coroutine
+with the pooled async ``GeminiClient``.
+
+    python -m benchmarks.bench_gemini_client --requests 50 --latency 0.1
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import requests
+from src.services.gemini_client import GeminiClient, close_http_client
+from src.services.rate_limiter import GeminiRateLimiter
+from src.services.stub_gemini_server import StubGeminiServer
+
+
+async def run_blocking(url, n):
+    async def call():
+        response = requests.post(url, json={"contents": [{"parts": [{"text": "hi"}]}]}, timeout=10)
+        response.raise_for_status()
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(n)))
+    return time.perf_counter() - start
+
+
+async def run_async(url, n):
+    # Quota is not what is being measured here
+    client = GeminiClient(url, max_retries=1, rate_limiter=GeminiRateLimiter(rpm=1000000, tpm=1000000000))
+    start = time.perf_counter()
+    await asyncio.gather(*(client.generate_content("hi") for _ in range(n)))
+    elapsed = time.perf_counter() - start
+    await close_http_client()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    url = StubGeminiServer(latency=args.latency).start()
+    for name, runner in (("blocking requests.post", run_blocking), ("async GeminiClient", run_async)):
+        elapsed = asyncio.run(runner(url, args.requests))
+        print(f"{name:24s} {args.requests} calls in {elapsed:6.2f}s -> {args.requests / elapsed:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
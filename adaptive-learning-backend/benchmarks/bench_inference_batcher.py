@@ -0,0 +1,78 @@
+"""Latency/throughput trade-off of micro-batched policy inference.
+
+Each of --concurrency clients calls select_action in a loop. "unbatched" is
+a batch-of-one forward pass per call in training mode with autograd, as
+select_action used to run; the batcher rows vary the window.
+
+    python -m benchmarks.bench_inference_batcher --concurrency 1 8 64 --windows 0 0.5 2 5
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import numpy as np
+import torch
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.inference_batcher import InferenceBatcher
+
+STATE_SIZE = 20
+ACTION_SIZE = 7
+
+
+async def run_clients(select, concurrency, calls_per_client):
+    rng = np.random.default_rng(0)
+    states = rng.random((256, STATE_SIZE))
+    latencies = []
+
+    async def client(offset):
+        for i in range(calls_per_client):
+            started = time.perf_counter()
+            await select(states[(offset + i) % len(states)])
+            latencies.append(time.perf_counter() - started)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 0.5, 2, 5])
+    parser.add_argument("--calls", type=int, default=2000, help="total calls per run")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    agent = AdaptiveQNetwork(STATE_SIZE, ACTION_SIZE)
+    agent.epsilon = 0.0
+
+    async def unbatched(state):
+        # select_action before inference batching: train mode, autograd on
+        return torch.argmax(agent.q_network(torch.FloatTensor(state).unsqueeze(0))).item()
+
+    for concurrency in args.concurrency:
+        calls_per_client = max(1, args.calls // concurrency)
+        rows = [("unbatched", unbatched)]
+        for window in args.windows:
+            batcher = InferenceBatcher(agent, window_ms=window, max_batch=args.max_batch)
+            rows.append((f"window {window}ms", batcher.select_action))
+        print(f"concurrency {concurrency}")
+        for name, select in rows:
+            throughput, p50, p99 = asyncio.run(run_clients(select, concurrency, calls_per_client))
+            batch = ""
+            if hasattr(select, "__self__") and isinstance(select.__self__, InferenceBatcher):
+                batch = f"  avg batch {select.__self__.stats()['avgBatchSize']}"
+            print(f"  {name:16s} {throughput:9.0f} actions/s  p50 {p50 * 1000:6.3f}ms  p99 {p99 * 1000:6.3f}ms{batch}")
+
+
+if __name__ == "__main__":
+    main()
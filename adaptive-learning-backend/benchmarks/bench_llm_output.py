@@ -0,0 +1,89 @@
+"""Parse time and salvage rate of the LLM output extractor on a synthetic corpus.
+
+Compares the old fence slicing + ``json.loads`` with ``parse_questions``. The
+corpus mixes clean responses with the failure modes seen from Gemini: prose
+around the payload, bare fences, trailing commas and single bad elements.
+
+    python -m benchmarks.bench_llm_output --responses 2000
+"""
+import argparse
+import json
+import random
+import time
+
+from src.services.llm_output import parse_questions, validate_question
+
+
+def make_question(question_id, broken=False):
+    correct = [False, False] if broken else [True, False]
+    return {
+        "id": question_id,
+        "question": f"What is {question_id} + 1?",
+        "options": [{"text": str(question_id + 1), "correct": correct[0]}, {"text": str(question_id), "correct": correct[1]}],
+        "explanation": "Add one.",
+        "hint": "Count up.",
+        "conceptTags": ["addition"]
+    }
+
+
+def make_corpus(size, questions_per_response, seed=0):
+    """Responses whose valid questions total size * questions_per_response minus one per bad_element response"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        questions = [make_question(rng.randint(1, 999)) for _ in range(questions_per_response)]
+        kind = rng.choice(["clean", "fenced", "prose", "trailing_comma", "bad_element"])
+        if kind == "bad_element":
+            questions[rng.randrange(len(questions))] = make_question(0, broken=True)
+        payload = json.dumps(questions, indent=2)
+        if kind == "trailing_comma":
+            payload = payload[:-1].rstrip() + ",\n]"
+        if kind == "fenced":
+            payload = f"```\n{payload}\n```"
+        elif kind == "prose":
+            payload = f"Here are your questions [{questions_per_response}]:\n{payload}\nEnjoy!"
+        else:
+            payload = f"```json\n{payload}\n```"
+        corpus.append(payload)
+    return corpus
+
+
+def legacy_parse(response_text):
+    if "```json" in response_text:
+        json_start = response_text.find("```json") + 7
+        json_end = response_text.find("```", json_start)
+        response_text = response_text[json_start:json_end].strip()
+    elif "```" in response_text:
+        json_start = response_text.find("```") + 3
+        json_end = response_text.find("```", json_start)
+        response_text = response_text[json_start:json_end].strip()
+    try:
+        questions = json.loads(response_text)
+    except json.JSONDecodeError:
+        return []
+    return questions if isinstance(questions, list) else [questions]
+
+
+def run(name, parse, corpus, expected):
+    start = time.perf_counter()
+    kept = sum(len(parse(text)) for text in corpus)
+    elapsed = time.perf_counter() - start
+    print(f"{name:18s} {len(corpus)} responses in {elapsed * 1000:8.1f} ms "
+          f"({elapsed / len(corpus) * 1e6:7.1f} us each), kept {kept}/{expected} valid questions")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--responses", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.responses, args.questions)
+    expected = args.responses * args.questions
+    # Count only questions that would pass validation, so both columns are comparable
+    run("legacy json.loads", lambda text: [q for q in legacy_parse(text) if validate_question(q)], corpus, expected)
+    run("parse_questions", lambda text: parse_questions(text)[0], corpus, expected)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Cold start, memory and per-call latency of torch vs NumPy policy serving.
+
+Import time and peak RSS are measured in a fresh interpreter importing the
+whole app (src.main) with RL_INFERENCE_BACKEND=torch and =numpy; latency compares
+AdaptiveQNetwork.predict_actions with NumpyPolicy on the same exported weights.
+
+    python -m benchmarks.bench_numpy_policy --batch-sizes 1 32
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import numpy as np
+
+STATE_SIZE = 20
+ACTION_SIZE = 7
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import src.main
+seconds = time.perf_counter() - start
+# VmHWM resets on exec, unlike ru_maxrss which a child inherits from a forked parent
+peak_kb = next(int(line.split()[1]) for line in open("/proc/self/status") if line.startswith("VmHWM"))
+print(json.dumps({"seconds": seconds, "rss_mb": peak_kb / 1024, "torch": "torch" in sys.modules}))
+"""
+
+
+def measure_import(backend, policy_path, repeats):
+    env = dict(os.environ, RL_INFERENCE_BACKEND=backend, RL_POLICY_PATH=policy_path)
+    runs = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", IMPORT_PROBE], env=env, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    runs.sort(key=lambda run: run["seconds"])
+    return runs[len(runs) // 2]
+
+
+def measure_latency(predict, states, calls):
+    predict(states)
+    start = time.perf_counter()
+    for _ in range(calls):
+        predict(states)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--import-repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    import torch
+    from src.rl.adaptive_q_network import AdaptiveQNetwork
+    from src.rl.numpy_policy import NumpyPolicy
+
+    torch.set_num_threads(1)
+    agent = AdaptiveQNetwork(STATE_SIZE, ACTION_SIZE)
+    with tempfile.TemporaryDirectory() as directory:
+        policy_path = os.path.join(directory, "policy.npz")
+        agent.export_policy(policy_path)
+        policy = NumpyPolicy.load(policy_path)
+
+        for backend in ("torch", "numpy"):
+            run = measure_import(backend, policy_path, args.import_repeats)
+            print(f"{backend:6s} import app {run['seconds']:6.2f}s  peak RSS {run['rss_mb']:6.0f}MB  torch loaded: {run['torch']}")
+
+    rng = np.random.default_rng(0)
+    for batch_size in args.batch_sizes:
+        states = rng.random((batch_size, STATE_SIZE), dtype=np.float32)
+        torch_us = measure_latency(agent.predict_actions, states, args.calls)
+        numpy_us = measure_latency(policy.predict_actions, states, args.calls)
+        print(f"batch {batch_size:3d}  torch {torch_us:8.2f}us  numpy {numpy_us:8.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Offline training throughput by DataLoader worker count.
+
+Writes a synthetic NDJSON transition log, then reports samples/s for reading
+alone and for reading plus training (large minibatches), with chunks parsed
+in the main process (--workers 0) or prefetched by worker processes.
+
+    python -m benchmarks.bench_offline_trainer --transitions 200000 --workers 0 1 2 4
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.offline_trainer import NDJSONTransitionSource, TransitionDataset, train_offline
+
+STATE_SIZE = 20
+ACTION_SIZE = 7
+
+
+def write_log(path, count):
+    rng = np.random.default_rng(0)
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"state": rng.random(STATE_SIZE).round(4).tolist(), "action": int(i % ACTION_SIZE),
+                                "reward": float(rng.random()), "next_state": rng.random(STATE_SIZE).round(4).tolist(),
+                                "done": bool(i % 5 == 0)}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transitions", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--chunk-size", type=int, default=8192)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "transitions.ndjson")
+        write_log(path, args.transitions)
+        source = NDJSONTransitionSource(path, chunk_size=args.chunk_size)
+        print(f"{args.transitions} transitions, {os.path.getsize(path) / 1e6:.0f}MB NDJSON, {os.cpu_count()} CPUs")
+        for workers in args.workers:
+            loader = DataLoader(TransitionDataset(source), batch_size=None, num_workers=workers,
+                                prefetch_factor=4 if workers > 0 else None)
+            started = time.perf_counter()
+            samples = sum(len(chunk["states"]) for chunk in loader)
+            read_rate = samples / (time.perf_counter() - started)
+            agent = AdaptiveQNetwork(STATE_SIZE, ACTION_SIZE, batch_size=args.batch_size)
+            result = train_offline(agent, source, batch_size=args.batch_size, num_workers=workers, log_every_seconds=1e9)
+            print(f"  workers {workers}  read {read_rate:9.0f} samples/s   read+train {result['samplesPerSecond']:9.0f} samples/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Sampling cost of prioritized replay against the uniform ring buffer.
+
+Buffers are filled to capacity with random priorities, then each operation
+samples a batch and gathers it into tensors; the prioritized rows also
+compute importance weights and write back new priorities, as a training
+step does. "cumsum" is the O(n) alternative to the sum tree: a prefix sum
+over all priorities per batch, then a binary search.
+
+    python -m benchmarks.bench_prioritized_replay --capacities 10000 100000 1000000
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import numpy as np
+from src.rl.prioritized_replay import PrioritizedReplayBuffer
+from src.rl.replay_buffer import ReplayBuffer
+
+STATE_SIZE = 20
+
+
+def fill(buffer, capacity):
+    # Bulk fill instead of `capacity` add() calls, which would dominate the run at 1M
+    rng = np.random.default_rng(0)
+    buffer._arrays["states"][:] = rng.random((capacity, STATE_SIZE), dtype=np.float32)
+    buffer._cursor[:] = (0, capacity)
+    if isinstance(buffer, PrioritizedReplayBuffer):
+        buffer.tree.update(np.arange(capacity), rng.random(capacity) ** buffer.alpha)
+
+
+def time_per_op(operation, operations):
+    start = time.perf_counter()
+    for _ in range(operations):
+        operation()
+    return (time.perf_counter() - start) / operations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacities", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--operations", type=int, default=2000)
+    args = parser.parse_args()
+
+    td_errors = np.random.default_rng(1).random(args.batch_size)
+    for capacity in args.capacities:
+        uniform = ReplayBuffer(capacity, STATE_SIZE, seed=0)
+        prioritized = PrioritizedReplayBuffer(capacity, STATE_SIZE, seed=0)
+        fill(uniform, capacity)
+        fill(prioritized, capacity)
+
+        def prioritized_step():
+            indices, _, _ = prioritized.sample_with_weights(args.batch_size)
+            prioritized.update_priorities(indices, td_errors)
+
+        priorities = prioritized.tree.get(np.arange(capacity))
+        rng = np.random.default_rng(2)
+
+        def cumsum_sample():
+            cumulative = np.cumsum(priorities)
+            return np.searchsorted(cumulative, rng.random(args.batch_size) * cumulative[-1])
+
+        experience = (np.zeros(STATE_SIZE), 0, 0.0, np.zeros(STATE_SIZE), False)
+        uniform_sample = time_per_op(lambda: uniform.sample(args.batch_size), args.operations)
+        prioritized_sample = time_per_op(prioritized_step, args.operations)
+        cumsum = time_per_op(cumsum_sample, max(10, args.operations // 100))
+        uniform_add = time_per_op(lambda: uniform.add(experience), args.operations)
+        prioritized_add = time_per_op(lambda: prioritized.add(experience), args.operations)
+        print(f"capacity {capacity:8d}  sample: uniform {uniform_sample:7.1f}us  prioritized+update {prioritized_sample:7.1f}us  cumsum {cumsum:8.1f}us"
+              f"  |  add: uniform {uniform_add:5.1f}us  prioritized {prioritized_add:5.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Render time and size of every registered prompt template.
+
+    python -m benchmarks.bench_prompt_templates --renders 20000
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from src.services.prompt_templates import PROMPTS, BATCH_NAME_OPTIONS, BATCH_OBJECT_OPTIONS
+
+
+def sample_values():
+    return {
+        "topic": "Multiplication",
+        "difficulty": "medium",
+        "count": 5,
+        "total": 5,
+        "class_level": 3,
+        "grade_desc": "intermediate, suitable for third graders (ages 8-9)",
+        "unique_id": f"{random.randint(1000, 9999)}-{random.randint(1000, 9999)}",
+        "batch_id": f"{int(time.time() * 1000)}-{random.randint(1000, 9999)}",
+        "numbers": random.sample(range(2, 20), 4),
+        "names": random.choice(BATCH_NAME_OPTIONS),
+        "objects": random.choice(BATCH_OBJECT_OPTIONS),
+        "number_sets": [random.sample(range(2, 15), 5) for _ in range(5)],
+        "mix_lines": "- EXACTLY 2 question(s) with \"difficulty\": \"easy\"",
+        "question": "What is 7 × 8?",
+        "student_answer": "54",
+        "correct_answer": "56",
+        "concepts": "multiplication"
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--renders", type=int, default=20000)
+    args = parser.parse_args()
+
+    values = sample_values()
+    for name in PROMPTS.names():
+        template = PROMPTS.get(name)
+        start = time.perf_counter()
+        for _ in range(args.renders):
+            template.render(**values)
+        elapsed = time.perf_counter() - start
+        stats = template.stats()
+        print(f"{name:24s} {elapsed / args.renders * 1e6:6.2f} us/render  "
+              f"{stats['avgChars']:5d} chars  ~{stats['avgTokens']:4d} tokens  ({stats['staticTokens']} static)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Training throughput of AdaptiveQNetwork: per-sample loop vs one batched step.
+
+The per-sample loop is the previous implementation of AdaptiveQNetwork.train
+(three forward passes and one Adam step per experience). "request" times the
+RL work of one /process-answer call: select_action, store_experience, train;
+with the background trainer it is select_action and submit, while a thread
+trains concurrently.
+
+    python -m benchmarks.bench_q_network --steps 200 --batch-size 32
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import numpy as np
+import torch
+from torch import nn
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.background_trainer import BackgroundTrainer
+
+STATE_SIZE = 20
+ACTION_SIZE = 7
+
+
+def train_per_sample(agent):
+    """The former AdaptiveQNetwork.train"""
+    if len(agent.replay_buffer) < agent.batch_size:
+        return
+    minibatch = zip(*(tensor.tolist() for tensor in agent.replay_buffer.sample(agent.batch_size)))
+    for state, action, reward, next_state, done in minibatch:
+        target = reward
+        if not done:
+            target += agent.gamma * torch.max(agent.target_network(torch.FloatTensor(next_state).unsqueeze(0))).item()
+        target_f = agent.q_network(torch.FloatTensor(state).unsqueeze(0))
+        target_f[0][action] = target
+        agent.optimizer.zero_grad()
+        loss = nn.MSELoss()(agent.q_network(torch.FloatTensor(state).unsqueeze(0)), target_f)
+        loss.backward()
+        agent.optimizer.step()
+
+
+def make_agent(batch_size, capacity):
+    agent = AdaptiveQNetwork(STATE_SIZE, ACTION_SIZE, batch_size=batch_size, replay_buffer_size=capacity)
+    agent.epsilon = 0.0  # always run the network in select_action
+    rng = np.random.default_rng(0)
+    for i in range(capacity):
+        agent.store_experience((rng.random(STATE_SIZE), i % ACTION_SIZE, float(rng.random()), rng.random(STATE_SIZE), bool(i % 2)))
+    return agent
+
+
+def measure(name, agent, train, steps):
+    rng = np.random.default_rng(1)
+    start = time.perf_counter()
+    for _ in range(steps):
+        train(agent)
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(steps):
+        state = rng.random(STATE_SIZE)
+        started = time.perf_counter()
+        action = agent.select_action(state)
+        agent.store_experience((state, action, 1.0, state, False))
+        train(agent)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"{name:22s} {steps / elapsed:9.1f} minibatches/s   request p50 {latencies[len(latencies) // 2] * 1000:6.2f}ms"
+          f"  p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.2f}ms")
+
+
+def measure_background(agent, steps, interval):
+    trainer = BackgroundTrainer(agent, train_interval=interval)
+    trainer.start()
+    rng = np.random.default_rng(1)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(steps):
+        state = rng.random(STATE_SIZE)
+        started = time.perf_counter()
+        action = agent.select_action(state)
+        trainer.submit((state, action, 1.0, state, False))
+        latencies.append(time.perf_counter() - started)
+        # Requests arrive spaced out rather than back to back
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    stats = trainer.stats()
+    latencies.sort()
+    print(f"{'background trainer':22s} {stats['trainSteps'] / elapsed:9.1f} minibatches/s   request p50 {latencies[len(latencies) // 2] * 1000:6.2f}ms"
+          f"  p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.2f}ms  (policy v{stats['policyVersion']})")
+    asyncio.run(trainer.stop())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--capacity", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--train-interval", type=float, default=0.05)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+    measure("per-sample loop", make_agent(args.batch_size, args.capacity), train_per_sample, args.steps)
+    measure("batched train()", make_agent(args.batch_size, args.capacity), AdaptiveQNetwork.train, args.steps)
+    measure_background(make_agent(args.batch_size, args.capacity), args.steps, args.train_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Throughput of the offline procedural question engine.
+
+    python -m benchmarks.bench_question_bank --questions 20000
+"""
+import argparse
+import time
+
+from src.data.question_bank import QuestionGenerator
+
+CASES = [
+    ("Multiplication", "easy", "math"),
+    ("Multiplication", "hard", "math"),
+    ("Division", "medium", "math"),
+    ("Addition and Subtraction", "medium", "math"),
+    ("Plants Around Us", "easy", "science")
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for topic, difficulty, subject_type in CASES:
+        generator = QuestionGenerator(seed=args.seed)
+        start = time.perf_counter()
+        for _ in range(args.questions):
+            generator.generate(topic, difficulty, subject_type)
+        elapsed = time.perf_counter() - start
+        print(f"{topic:26s} {difficulty:6s} {args.questions / elapsed:10.0f} questions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Insert and sample cost of the replay buffers at capacity.
+
+Compares the former list buffer (list.pop(0) once full, tuples turned into
+tensors on every sample) and deque buffer with the preallocated ring.
+
+    python -m benchmarks.bench_replay_buffer --capacity 10000 --batch-size 32
+"""
+import argparse
+import random
+import time
+from collections import deque
+import numpy as np
+import torch
+from src.rl.replay_buffer import ReplayBuffer
+
+STATE_SIZE = 20
+
+
+class ListBuffer:
+    """The former adaptive_q_network.ReplayBuffer"""
+
+    def __init__(self, max_size):
+        self.buffer = []
+        self.max_size = max_size
+
+    def add(self, experience):
+        if len(self.buffer) >= self.max_size:
+            self.buffer.pop(0)
+        self.buffer.append(experience)
+
+    def sample(self, batch_size):
+        return to_tensors(random.sample(self.buffer, batch_size))
+
+
+class DequeBuffer:
+    """The former trainer.ReplayBuffer"""
+
+    def __init__(self, max_size):
+        self.buffer = deque(maxlen=max_size)
+
+    def add(self, experience):
+        self.buffer.append(experience)
+
+    def sample(self, batch_size):
+        return to_tensors(random.sample(self.buffer, batch_size))
+
+
+def to_tensors(batch):
+    states, actions, rewards, next_states, dones = zip(*batch)
+    return (torch.FloatTensor(np.array(states)), torch.LongTensor(actions), torch.FloatTensor(rewards),
+            torch.FloatTensor(np.array(next_states)), torch.FloatTensor(dones))
+
+
+def measure(name, buffer, capacity, batch_size, operations):
+    rng = np.random.default_rng(0)
+    experiences = [(rng.random(STATE_SIZE), i % 7, float(i), rng.random(STATE_SIZE), bool(i % 2)) for i in range(1000)]
+    for i in range(capacity):
+        buffer.add(experiences[i % 1000])
+
+    start = time.perf_counter()
+    for i in range(operations):
+        buffer.add(experiences[i % 1000])
+    insert_us = (time.perf_counter() - start) / operations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(operations):
+        buffer.sample(batch_size)
+    sample_us = (time.perf_counter() - start) / operations * 1e6
+    print(f"{name:18s} insert {insert_us:9.2f}us   sample->tensors {sample_us:9.2f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacity", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--operations", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"capacity {args.capacity}, batch {args.batch_size}")
+    measure("list (pop(0))", ListBuffer(args.capacity), args.capacity, args.batch_size, args.operations)
+    measure("deque", DequeBuffer(args.capacity), args.capacity, args.batch_size, args.operations)
+    measure("numpy ring", ReplayBuffer(args.capacity, STATE_SIZE), args.capacity, args.batch_size, args.operations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Memory of N serving workers with per-process Q-networks vs one shared policy.
+
+Starts N worker processes at once. "per-process" workers build their own
+AdaptiveQNetwork, as every uvicorn worker did before; "shared" workers map
+the policy segment published by this process. While all are alive, their
+RSS and PSS are read from /proc (PSS splits shared pages between the
+processes that map them). Then it times a publish and how long a reader
+takes to pick up the new version.
+
+    python -m benchmarks.bench_shared_policy --workers 1 4 8
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import numpy as np
+
+STATE_SIZE = 20
+ACTION_SIZE = 7
+
+WORKERS = {
+    "per-process": (
+        "from src.rl.adaptive_q_network import AdaptiveQNetwork\n"
+        "policy = AdaptiveQNetwork({state}, {actions})\n"
+    ),
+    "shared": (
+        "from src.rl.shared_policy import SharedPolicy\n"
+        "policy = SharedPolicy({path!r}, {state}, {actions})\n"
+    )
+}
+WORKER_TAIL = (
+    "import numpy as np, sys\n"
+    "policy.predict_actions(np.zeros((32, {state}), dtype=np.float32))\n"
+    "print('ready', flush=True)\n"
+    "sys.stdin.read()\n"
+)
+
+
+def memory_mb(pid):
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0]) / 1024
+    return values["Rss"], values["Pss"]
+
+
+def measure_workers(kind, count, path):
+    code = (WORKERS[kind] + WORKER_TAIL).format(path=path, state=STATE_SIZE, actions=ACTION_SIZE)
+    processes = [subprocess.Popen([sys.executable, "-c", code], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True) for _ in range(count)]
+    try:
+        for process in processes:
+            process.stdout.readline()
+        usage = [memory_mb(process.pid) for process in processes]
+    finally:
+        for process in processes:
+            process.stdin.close()
+            process.wait()
+    rss = sum(r for r, _ in usage)
+    pss = sum(p for _, p in usage)
+    print(f"  {kind:11s} x{count}  total RSS {rss:7.0f}MB  total PSS {pss:7.0f}MB  PSS/worker {pss / count:6.0f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--publishes", type=int, default=200)
+    args = parser.parse_args()
+
+    from src.rl.adaptive_q_network import AdaptiveQNetwork
+    from src.rl.shared_policy import SharedPolicy, SharedPolicyPublisher
+
+    with tempfile.TemporaryDirectory(dir="/dev/shm" if os.path.isdir("/dev/shm") else None) as directory:
+        path = os.path.join(directory, "policy.bin")
+        agent = AdaptiveQNetwork(STATE_SIZE, ACTION_SIZE)
+        SharedPolicyPublisher(path, agent, trainer=None)
+        for count in args.workers:
+            print(f"{count} workers")
+            for kind in WORKERS:
+                measure_workers(kind, count, path)
+
+        reader = SharedPolicy(path, STATE_SIZE, ACTION_SIZE)
+        states = np.random.default_rng(0).random((1, STATE_SIZE), dtype=np.float32)
+        publish_seconds, swap_seconds = 0.0, 0.0
+        for _ in range(args.publishes):
+            started = time.perf_counter()
+            agent.publish_policy()
+            published = time.perf_counter()
+            reader.predict_actions(states)
+            swap_seconds += time.perf_counter() - published
+            publish_seconds += published - started
+        assert reader.policy_version == agent.policy_version
+        print(f"publish (snapshot + segment write) {publish_seconds / args.publishes * 1e6:7.1f}us")
+        print(f"first reader call after a publish  {swap_seconds / args.publishes * 1e6:7.1f}us")
+
+
+if __name__ == "__main__":
+    main()
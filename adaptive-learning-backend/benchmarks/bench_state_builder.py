@@ -0,0 +1,73 @@
+"""Cost of building Q-network state vectors per request vs in batches.
+
+"per-request" is the former process_answer path: a hand-built feature list
+with random.random() noise and build_state_vector (two concatenates and a
+mean/std pass). build_state is its replacement; build_batch fills a
+preallocated (N, 20) array for N requests at once.
+
+    python -m benchmarks.bench_state_builder --batch-sizes 1 32 256
+"""
+import argparse
+import random
+import time
+from src.rl.state_builder import StateBuilder
+
+STATE_SIZE = 20
+LEARNING_STATE = {
+    "classLevel": 6, "consecutiveCorrect": 2, "consecutiveWrong": 1, "currentDifficulty": "medium",
+    "isInAdaptiveMode": True, "recentPerformance": [True, False, True, True], "timeSpent": 90, "hintsUsed": 1
+}
+QUESTION = {"difficulty": "easy", "options": [{}, {}, {}, {}], "conceptTags": ["fractions", "division"]}
+
+
+def per_request(builder, current_state_data, question_data):
+    student_features = [
+        current_state_data.get("classLevel", 5) / 12.0,
+        current_state_data.get("consecutiveCorrect", 0) / 10.0,
+        current_state_data.get("consecutiveWrong", 0) / 10.0,
+        1.0 if current_state_data.get("isInAdaptiveMode", False) else 0.0,
+        len(current_state_data.get("recentPerformance", [])) / 10.0,
+        sum(current_state_data.get("recentPerformance", [])) / max(len(current_state_data.get("recentPerformance", [])), 1),
+        current_state_data.get("timeSpent", 0) / 300.0,
+        current_state_data.get("hintsUsed", 0) / 5.0,
+        1.0 if current_state_data.get("currentDifficulty") == "easy" else (0.5 if current_state_data.get("currentDifficulty") == "medium" else 0.0),
+        random.random()
+    ]
+    question_features = [
+        1.0 if question_data.get("difficulty") == "easy" else (0.5 if question_data.get("difficulty") == "medium" else 0.0),
+        len(question_data.get("options", [])) / 4.0,
+        len(question_data.get("conceptTags", [])) / 5.0,
+        random.random(),
+        0.5, 0.5, 0.5, 0.5, 0.5, 0.5
+    ]
+    return builder.build_state_vector(student_features, question_features)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 32, 256])
+    parser.add_argument("--states", type=int, default=50000, help="states built per measurement")
+    args = parser.parse_args()
+
+    builder = StateBuilder(max_length=STATE_SIZE, seed=0)
+    start = time.perf_counter()
+    for _ in range(args.states):
+        per_request(builder, LEARNING_STATE, QUESTION)
+    print(f"per-request (former)   {(time.perf_counter() - start) / args.states * 1e6:6.2f}us/state")
+
+    start = time.perf_counter()
+    for _ in range(args.states):
+        builder.build_state(LEARNING_STATE, QUESTION)
+    print(f"build_state            {(time.perf_counter() - start) / args.states * 1e6:6.2f}us/state")
+
+    for batch_size in args.batch_sizes:
+        states, questions = [LEARNING_STATE] * batch_size, [QUESTION] * batch_size
+        rounds = max(1, args.states // batch_size)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            builder.build_batch(states, questions)
+        print(f"build_batch N={batch_size:<4d}     {(time.perf_counter() - start) / (rounds * batch_size) * 1e6:6.2f}us/state")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,22 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
-from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.background_trainer import BackgroundTrainer
+from src.rl.inference_batcher import InferenceBatcher
 from src.rl.action_executor import ActionExecutor
 from src.rl.state_builder import StateBuilder
 from src.rl.reward_calculator import RewardCalculator
 from src.services.mastery_service import MasteryService
 from src.services.gemini_service import GeminiService
+from src.services.explanation_prefetcher import ExplanationPrefetcher
 from src.services.persistence_service import PersistenceService
+from src.services.question_pool import QuestionPool
+from src.services.prompt_templates import PROMPTS
+from src.services.rate_limiter import get_gemini_rate_limiter
 from src.config import settings
+import json
+import os
 import random
 
 router = APIRouter()
@@ -17,13 +25,48 @@ router = APIRouter()
 STATE_SIZE = 20
 ACTION_SIZE = 7
 
-adaptive_q_network = AdaptiveQNetwork(
-    state_size=STATE_SIZE,
-    action_size=ACTION_SIZE,
-    learning_rate=settings.learning_rate,
-    replay_buffer_size=settings.replay_buffer_size,
-    batch_size=settings.batch_size
-)
+
+def create_policy_agent():
+    """Torch agent trained in this process, or a torch-free policy (exported file or shared memory) for serving-only workers"""
+    if settings.rl_inference_backend == "numpy":
+        # Imported here so serving-only workers never load torch
+        from src.rl.numpy_policy import NumpyPolicy
+        if os.path.exists(settings.rl_policy_path):
+            print(f"Serving exported policy from {settings.rl_policy_path} (numpy)")
+            return NumpyPolicy.load(settings.rl_policy_path, epsilon=settings.epsilon_end), None
+        print(f"⚠️ No exported policy at {settings.rl_policy_path}, serving untrained weights (numpy)")
+        return NumpyPolicy.random_init(STATE_SIZE, ACTION_SIZE, epsilon=settings.epsilon_end), None
+    if settings.rl_shared_policy:
+        from src.rl.shared_policy import ExperienceSender, SharedPolicy, claim_trainer_role
+        if not claim_trainer_role(settings.rl_shared_policy_path):
+            # Another worker trains; serve its weights from shared memory and send it our experiences
+            print(f"Serving shared policy from {settings.rl_shared_policy_path} (numpy)")
+            policy = SharedPolicy(settings.rl_shared_policy_path, STATE_SIZE, ACTION_SIZE)
+            return policy, ExperienceSender(settings.rl_shared_policy_path, policy)
+        print(f"Training the shared policy at {settings.rl_shared_policy_path} in this worker")
+    
+    from src.rl.adaptive_q_network import AdaptiveQNetwork
+    agent = AdaptiveQNetwork(
+        state_size=STATE_SIZE,
+        action_size=ACTION_SIZE,
+        learning_rate=settings.learning_rate,
+        replay_buffer_size=settings.replay_buffer_size,
+        batch_size=settings.batch_size,
+        target_update_frequency=settings.target_update_frequency,
+        replay_buffer_path=settings.replay_buffer_path,
+        prioritized_replay=settings.prioritized_replay
+    )
+    # Trains the agent on its own thread; requests only run inference and submit experiences
+    return agent, BackgroundTrainer(agent)
+
+adaptive_q_network, rl_trainer = create_policy_agent()
+# The training worker mirrors each published policy to the other workers and trains on their experiences
+shared_policy_publisher = None
+if settings.rl_shared_policy and isinstance(rl_trainer, BackgroundTrainer):
+    from src.rl.shared_policy import SharedPolicyPublisher
+    shared_policy_publisher = SharedPolicyPublisher(settings.rl_shared_policy_path, adaptive_q_network, rl_trainer)
+# Concurrent requests share one forward pass of the published policy
+inference_batcher = InferenceBatcher(adaptive_q_network)
 
 mastery_service = MasteryService(
     db_url=settings.mongodb_url,
@@ -31,11 +74,22 @@ mastery_service = MasteryService(
 )
 
 gemini_service = GeminiService()
+question_pool = QuestionPool(gemini_service)
+explanation_prefetcher = ExplanationPrefetcher(gemini_service)
 action_executor = ActionExecutor(gemini_service=gemini_service, mastery_service=mastery_service)
 state_builder = StateBuilder(max_length=STATE_SIZE)
 reward_calculator = RewardCalculator()
 persistence_service = PersistenceService()
 
+# Versioned checkpoints of the trained agent; serving-only (numpy) workers have nothing to save
+checkpoint_manager = None
+if isinstance(rl_trainer, BackgroundTrainer):
+    from src.rl.checkpoint_manager import create_checkpoint_manager
+    checkpoint_manager = create_checkpoint_manager(adaptive_q_network, lock=rl_trainer.lock, persistence_service=persistence_service)
+
+# Quiz questions in progressive order: 2 easy (direct arithmetic), 2 medium and 1 hard (word problems)
+QUIZ_DIFFICULTY_MIX = {"easy": 2, "medium": 2, "hard": 1}
+
 # Request/Response Models
 class Option(BaseModel):
     text: str
@@ -115,31 +169,10 @@ async def process_answer(request: Dict[str, Any]):
         question_data = request.get("questionData", {})
         
         # Build state vector
-        student_features = [
-            current_state_data.get("classLevel", 5) / 12.0,
-            current_state_data.get("consecutiveCorrect", 0) / 10.0,
-            current_state_data.get("consecutiveWrong", 0) / 10.0,
-            1.0 if current_state_data.get("isInAdaptiveMode", False) else 0.0,
-            len(current_state_data.get("recentPerformance", [])) / 10.0,
-            sum(current_state_data.get("recentPerformance", [])) / max(len(current_state_data.get("recentPerformance", [])), 1),
-            current_state_data.get("timeSpent", 0) / 300.0,  # Normalize to 5 min
-            current_state_data.get("hintsUsed", 0) / 5.0,
-            1.0 if current_state_data.get("currentDifficulty") == "easy" else (0.5 if current_state_data.get("currentDifficulty") == "medium" else 0.0),
-            random.random()  # Add some randomness
-        ]
-        
-        question_features = [
-            1.0 if question_data.get("difficulty") == "easy" else (0.5 if question_data.get("difficulty") == "medium" else 0.0),
-            len(question_data.get("options", [])) / 4.0,
-            len(question_data.get("conceptTags", [])) / 5.0,
-            random.random(),
-            0.5, 0.5, 0.5, 0.5, 0.5, 0.5  # Padding
-        ]
-        
-        state = state_builder.build_state_vector(student_features, question_features)
+        state = state_builder.build_state(current_state_data, question_data)
         
         # Select action from RL agent
-        action_index = adaptive_q_network.select_action(state)
+        action_index = await inference_batcher.select_action(state)
         
         # Map action index to action name
         action_map = {
@@ -232,11 +265,9 @@ async def process_answer(request: Dict[str, Any]):
             level=1 if is_correct else 0
         )
         
-        # Store experience for training
-        adaptive_q_network.store_experience((state, action_index, reward, state, not is_correct))
-        
-        # Train the network if enough experiences
-        adaptive_q_network.train()
+        # Queue the experience; the background trainer learns from it and publishes new weights
+        if rl_trainer is not None:
+            rl_trainer.submit((state, action_index, reward, state, not is_correct))
         
         print(f"Returning response - Action: {action}, Has explanation: {'explanation' in response_data}, Has hint: {'hint' in response_data}")
         
@@ -262,6 +293,7 @@ async def generate_question(request: GenerateQuestionRequest):
         # For now, assume this is for quiz mode - later we can add a mode parameter
         action_result = await action_executor.generate_question(request.difficulty, request.classLevel, request.conceptTags)
         question_data = action_result["question"]
+        explanation_prefetcher.enqueue([question_data])
         
         return QuestionData(**question_data)
         
@@ -279,6 +311,7 @@ async def generate_quiz_batch(request: Dict[str, Any]):
         concept_tags = request.get("conceptTags", [])
         class_level = request.get("classLevel", 5)
         subject_type = request.get("subjectType", "math")  # 'math' or 'science'
+        student_id = request.get("studentId")
         topic = " ".join(concept_tags) if concept_tags else "general"
         
         print(f"📚 Subject Type: {subject_type.upper()} - Using {'MATH' if subject_type == 'math' else 'SCIENCE'} prompts")
@@ -294,41 +327,21 @@ async def generate_quiz_batch(request: Dict[str, Any]):
             'word problem with moderate numbers'
         ]
         
-        # Generate all 5 questions in optimal batches
-        all_questions = []
-        
-        # Batch 1: Generate 2 easy questions together (direct arithmetic only)
-        easy_questions = await gemini_service.generate_question_batch(
+        # Serve all 5 questions from the pre-generated pools; any shortfall is generated
+        # live with ONE mixed-difficulty call (2 easy direct arithmetic, 2 medium and 1 hard word problems)
+        all_questions = await question_pool.take_mix(
             topic=topic,  # Pass topic as-is (e.g., "Multiplication" or "Division")
-            difficulty='easy',
-            count=2,
-            class_level=class_level,
-            subject_type=subject_type
-        )
-        all_questions.extend(easy_questions[:2])
-        
-        # Batch 2: Generate 2 medium questions together (word problems)
-        medium_questions = await gemini_service.generate_question_batch(
-            topic=topic,
-            difficulty='medium',
-            count=2,
-            class_level=class_level,
-            subject_type=subject_type
-        )
-        all_questions.extend(medium_questions[:2])
-        
-        # Batch 3: Generate 1 hard question (complex word problem)
-        hard_questions = await gemini_service.generate_question_batch(
-            topic=topic,
-            difficulty='hard',
-            count=1,
+            mix=QUIZ_DIFFICULTY_MIX,
             class_level=class_level,
-            subject_type=subject_type
+            subject_type=subject_type,
+            student_id=student_id  # Skip questions this student has already been served
         )
-        all_questions.extend(hard_questions[:1])
         
         print(f"Successfully generated {len(all_questions)} questions in batch")
         
+        # Warm explanations for the wrong options before the student answers
+        explanation_prefetcher.enqueue(all_questions)
+        
         return {
             "questions": all_questions,
             "count": len(all_questions)
@@ -341,6 +354,71 @@ async def generate_quiz_batch(request: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/generate-quiz-batch/stream")
+async def generate_quiz_batch_stream(request: Dict[str, Any]):
+    """Stream the 5 quiz questions as each one becomes available.
+
+    Emits NDJSON lines by default, or server-sent events with "format": "sse".
+    Each question event carries its quiz slot `index` (easy 0-1, medium 2-3,
+    hard 4) since pooled questions can arrive before streamed ones.
+    """
+    concept_tags = request.get("conceptTags", [])
+    class_level = request.get("classLevel", 5)
+    subject_type = request.get("subjectType", "math")  # 'math' or 'science'
+    use_sse = request.get("format", "ndjson") == "sse"
+    student_id = request.get("studentId")
+    topic = " ".join(concept_tags) if concept_tags else "general"
+    
+    slots = {}
+    next_index = 0
+    for difficulty, count in QUIZ_DIFFICULTY_MIX.items():
+        slots[difficulty] = list(range(next_index, next_index + count))
+        next_index += count
+    
+    def encode(event: str, payload: Dict[str, Any]) -> str:
+        if use_sse:
+            return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps(dict(payload, type=event)) + "\n"
+    
+    async def events():
+        sent = 0
+        try:
+            by_difficulty, shortfall = question_pool.take_available(topic, QUIZ_DIFFICULTY_MIX, class_level, subject_type, student_id)
+            for difficulty, questions in by_difficulty.items():
+                explanation_prefetcher.enqueue(questions)
+                for question in questions:
+                    yield encode("question", {"index": slots[difficulty].pop(0), "question": question})
+                    sent += 1
+            
+            if shortfall:
+                async for question in gemini_service.stream_question_mix(topic, shortfall, class_level, subject_type):
+                    difficulty = question["difficulty"]
+                    if not slots.get(difficulty):
+                        continue
+                    if student_id is not None and not question_pool.fingerprints.filter_new(student_id, topic, [question])[0]:
+                        continue
+                    question_pool.record_live(topic, difficulty, class_level, subject_type)
+                    explanation_prefetcher.enqueue([question])
+                    yield encode("question", {"index": slots[difficulty].pop(0), "question": question})
+                    sent += 1
+            
+            # Slots left empty by repeats in the stream are filled like the batch endpoint
+            remaining = {difficulty: len(indices) for difficulty, indices in slots.items() if indices}
+            if remaining:
+                remaining_questions = await question_pool.take_mix(topic, remaining, class_level, subject_type, student_id)
+                explanation_prefetcher.enqueue(remaining_questions)
+                for question in remaining_questions:
+                    yield encode("question", {"index": slots[question["difficulty"]].pop(0), "question": question})
+                    sent += 1
+        except Exception as e:
+            print(f"Error streaming quiz batch: {str(e)}")
+            yield encode("error", {"detail": str(e)})
+        yield encode("done", {"count": sent})
+    
+    print(f"Streaming quiz batch for topic: {topic} ({'SSE' if use_sse else 'NDJSON'})")
+    return StreamingResponse(events(), media_type="text/event-stream" if use_sse else "application/x-ndjson")
+
+
 @router.post("/start-adaptive-mode")
 async def start_adaptive_mode(request: Dict[str, Any]):
     """Start adaptive practice mode with ALL 3 difficulty levels generated upfront for smooth progression"""
@@ -361,37 +439,15 @@ async def start_adaptive_mode(request: Dict[str, Any]):
         # - Easy: Direct arithmetic (single-digit × single-digit OR double-digit simple)
         # - Medium: Simple word problems with easy single-digit multiplication
         # - Hard: Word problems with moderate multiplication (one digit 5-9, other 10-20)
-        all_practice_questions = []
-        
-        # Level 1: Easy question (same as quiz Q1-Q2)
-        easy_questions = await gemini_service.generate_question_batch(
+        all_practice_questions = await question_pool.take_mix(
             topic=topic,
-            difficulty='easy',
-            count=1,
+            mix={"easy": 1, "medium": 1, "hard": 1},
             class_level=class_level,
-            subject_type=subject_type
+            subject_type=subject_type,
+            student_id=student_id
         )
-        all_practice_questions.extend(easy_questions[:1])
         
-        # Level 2: Medium question (same as quiz Q3-Q4)
-        medium_questions = await gemini_service.generate_question_batch(
-            topic=topic,
-            difficulty='medium',
-            count=1,
-            class_level=class_level,
-            subject_type=subject_type
-        )
-        all_practice_questions.extend(medium_questions[:1])
-        
-        # Level 3: Hard question (same as quiz Q5)
-        hard_questions = await gemini_service.generate_question_batch(
-            topic=topic,
-            difficulty='hard',
-            count=1,
-            class_level=class_level,
-            subject_type=subject_type
-        )
-        all_practice_questions.extend(hard_questions[:1])
+        explanation_prefetcher.enqueue(all_practice_questions)
         
         print(f"✅ Generated {len(all_practice_questions)} practice questions (easy, medium, hard) - ready for smooth progression!")
         
@@ -424,6 +480,37 @@ async def start_adaptive_mode(request: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/metrics")
+async def get_metrics():
+    """Operational counters for the Gemini integration"""
+    return {
+        "rateLimiter": get_gemini_rate_limiter().stats(),
+        "explanationCache": gemini_service.explanation_cache.stats(),
+        "explanationCoalescing": gemini_service.explanation_flights.stats(),
+        "questionCache": gemini_service.question_cache.stats(),
+        "questionPool": question_pool.stats(),
+        "explanationPrefetch": explanation_prefetcher.stats(),
+        "responseStore": gemini_service.response_store.stats() if gemini_service.response_store is not None else None,
+        "prompts": PROMPTS.stats(),
+        "circuitBreakers": gemini_service.breaker_stats(),
+        "rlTrainer": rl_trainer.stats() if rl_trainer is not None else None,
+        "rlInference": inference_batcher.stats(),
+        "sharedPolicy": shared_policy_publisher.stats() if shared_policy_publisher is not None else None,
+        "rlCheckpoints": checkpoint_manager.stats() if checkpoint_manager is not None else None
+    }
+
+
+@router.post("/model/rollback")
+async def rollback_model(request: Dict[str, Any]):
+    """Reload a Q-network checkpoint: `version`, or the one before the current by default"""
+    if checkpoint_manager is None:
+        raise HTTPException(status_code=400, detail="Checkpointing is disabled on this worker")
+    version = await checkpoint_manager.rollback(request.get("version"))
+    if version is None:
+        raise HTTPException(status_code=404, detail="No checkpoint to roll back to")
+    return {"version": version, "trainingStep": adaptive_q_network.training_step}
+
+
 def generate_ai_explanation(question: str, correct_answer: str, student_answer: str, concept_tags: List[str]) -> AIExplanation:
     """Generate AI-powered explanation with encouragement, explanation, example, and tip"""
     
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Dict, Any
-from src.rl.adaptive_q_network import AdaptiveQNetwork
 from src.models.schemas import StudentAnswer, ActionResponse
 from src.services.mastery_service import MasteryService
 from src.services.persistence_service import PersistenceService
@@ -15,13 +14,24 @@ router = APIRouter()
 STATE_SIZE = 20
 ACTION_SIZE = 7
 
-adaptive_q_network = AdaptiveQNetwork(
-    state_size=STATE_SIZE,
-    action_size=ACTION_SIZE,
-    learning_rate=settings.learning_rate,
-    replay_buffer_size=settings.replay_buffer_size,
-    batch_size=settings.batch_size
-)
+_adaptive_q_network = None
+
+
+def get_adaptive_q_network():
+    """Agent built on first use, so importing the app does not load torch on serving-only workers"""
+    global _adaptive_q_network
+    if _adaptive_q_network is None:
+        from src.rl.adaptive_q_network import AdaptiveQNetwork
+        _adaptive_q_network = AdaptiveQNetwork(
+            state_size=STATE_SIZE,
+            action_size=ACTION_SIZE,
+            learning_rate=settings.learning_rate,
+            replay_buffer_size=settings.replay_buffer_size,
+            batch_size=settings.batch_size,
+            target_update_frequency=settings.target_update_frequency
+        )
+    return _adaptive_q_network
+
 mastery_service = MasteryService(
     db_url=settings.mongodb_url,
     db_name=settings.mongodb_db
@@ -43,7 +53,7 @@ async def submit_answer(submission: AnswerSubmission):
         mastery_service.update_mastery(submission.student_id, submission.question_id, correctness)
         
         # Get the next action from the RL agent
-        action = adaptive_q_network.get_action(submission.student_id, submission.question_id, correctness)
+        action = get_adaptive_q_network().get_action(submission.student_id, submission.question_id, correctness)
         
         return ActionResponse(action=action)
     except Exception as e:
@@ -53,7 +63,7 @@ async def submit_answer(submission: AnswerSubmission):
 async def initiate_practice(student_id: str):
     try:
         # Initialize practice mode and generate an easy practice question
-        practice_question = await adaptive_q_network.start_practice(student_id)
+        practice_question = await get_adaptive_q_network().start_practice(student_id)
         return {"question": practice_question}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
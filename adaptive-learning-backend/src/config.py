@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import List, Optional
 import os
 from dotenv import load_dotenv
 
@@ -9,14 +9,83 @@ class Settings(BaseSettings):
     mongodb_url: str = "mongodb://localhost:27017"
     mongodb_db: str = "adaptive_learning"
     gemini_api_key: str = ""
+    gemini_base_url: str = "https://generativelanguage.googleapis.com/v1beta"  # point at a StubGeminiServer for load tests
+    gemini_model: str = "gemini-2.0-flash"
+    llm_backend: str = "gemini"  # "gemini" or "fake"
+    fake_llm_latency: str = "0"  # e.g. "0.3", "uniform:0.1,0.5", "lognormal:0.8,0.4"
+    fake_llm_error_rate: float = 0.0
+    gemini_timeout_seconds: float = 15.0
+    gemini_max_connections: int = 20
+    gemini_max_keepalive_connections: int = 10
+    gemini_keepalive_expiry_seconds: float = 30.0
+    gemini_max_retries: int = 3
+    gemini_retry_base_delay: float = 10.0
+    gemini_retry_max_delay: float = 60.0  # also caps an upstream Retry-After
+    gemini_rpm: float = 15
+    gemini_tpm: float = 1000000
+    gemini_rate_limit_backend: str = "memory"  # "memory", "file" or "redis"
+    gemini_rate_limit_file: str = "data/gemini_rate_limit.json"
+    explanation_cache_max_entries: int = 2000
+    explanation_cache_max_bytes: int = 8 * 1024 * 1024
+    explanation_cache_ttl_seconds: float = 24 * 3600
+    question_cache_max_entries: int = 500
+    question_cache_max_bytes: int = 4 * 1024 * 1024
+    question_cache_ttl_seconds: float = 3600
+    question_pool_low_water: int = 2
+    question_pool_target: int = 5
+    question_pool_max_keys: int = 100
+    question_pool_refill_interval: float = 5.0
+    fingerprint_max_scopes: int = 5000
+    fingerprint_max_per_scope: int = 200
+    explanation_prefetch_enabled: bool = False
+    explanation_prefetch_max_pending: int = 200
+    explanation_prefetch_rpm_share: float = 0.2  # share of gemini_rpm spent on speculative explanations
+    explanation_prefetch_concurrency: int = 2
+    response_store_backend: str = "none"  # "none", "sqlite", "redis" or "mongo"
+    response_store_sqlite_path: str = "data/gemini_responses.sqlite3"
+    response_store_ttl_seconds: float = 7 * 24 * 3600
+    response_store_min_questions: int = 30
+    response_store_max_questions: int = 200
+    response_store_generate_fraction: float = 0.2  # share of question requests that still generate once the bank is full enough
+    circuit_window_size: int = 20
+    circuit_min_calls: int = 5
+    circuit_failure_rate: float = 0.5
+    circuit_slow_call_seconds: float = 8.0
+    circuit_slow_call_rate: float = 0.8
+    circuit_open_seconds: float = 30.0
+    redis_host: str = "localhost"
+    redis_port: int = 6379
+    redis_db: int = 0
     epsilon_start: float = 1.0
     epsilon_end: float = 0.1
     epsilon_decay: float = 0.995
     learning_rate: float = 0.001
     batch_size: int = 32
     replay_buffer_size: int = 10000
+    replay_buffer_path: Optional[str] = None  # directory for a memory-mapped buffer that survives restarts
     target_update_frequency: int = 1000
+    prioritized_replay: bool = False  # sample experiences by TD error instead of uniformly
+    priority_alpha: float = 0.6
+    priority_beta: float = 0.4  # annealed to 1 over priority_beta_steps samples
+    priority_beta_steps: int = 100000
+    priority_epsilon: float = 0.001
+    rl_train_interval_seconds: float = 1.0
+    rl_max_steps_per_round: int = 32
+    rl_experience_queue_size: int = 10000
+    rl_transition_log_path: Optional[str] = None  # NDJSON file of every experience, for src.rl.offline_trainer
+    rl_transition_collection: str = "rl_transitions"  # MongoDB source for src.rl.offline_trainer
+    rl_inference_window_ms: float = 0.0  # 0 batches only calls made in the same event loop iteration
+    rl_inference_max_batch: int = 32
+    rl_inference_backend: str = "torch"  # "torch" (trains in process) or "numpy" (serving only, no torch import)
+    rl_policy_path: str = "data/models/policy.npz"
+    # One trainer process shares its policy with the other uvicorn workers through this
+    # memory-mapped file (put it under /dev/shm to keep it off disk)
+    rl_shared_policy: bool = False
+    rl_shared_policy_path: str = "data/models/shared_policy.bin"
     model_save_path: str = "data/models/dqn_model.pth"
+    checkpoint_backend: str = "file"  # "file" (versions next to model_save_path), "mongo" or "none"
+    checkpoint_interval_seconds: float = 300.0
+    checkpoint_keep: int = 5
     allow_origins: List[str] = ["http://localhost:5173", "http://localhost:3000", "*"]
     SECRET_KEY: str
     ALGORITHM: str
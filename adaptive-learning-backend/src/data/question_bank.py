@@ -0,0 +1,267 @@
+import random
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Operand ranges per operation and difficulty, following the style guides in the prompts:
+# easy is direct arithmetic, medium and hard are one-step word problems.
+MULTIPLICATION_RANGES = {
+    "easy": [((2, 9), (2, 9)), ((10, 20), (2, 9))],
+    "medium": [((2, 9), (2, 9))],
+    "hard": [((5, 9), (10, 20))]
+}
+ADDITION_RANGES = {
+    "easy": (5, 50),
+    "medium": (10, 99),
+    "hard": (100, 499)
+}
+# Products above this are too big for Class 3-5 hard word problems
+MAX_HARD_PRODUCT = 150
+
+NAMES = ["Sarah", "Tom", "Maria", "Alex", "Emily", "Jack", "Lily", "Noah", "Emma", "Oliver",
+         "Sophia", "Liam", "Ava", "Lucas", "Mia", "Ben", "Zoe", "Ryan", "Chloe", "Max"]
+# (plural object, container it comes in)
+OBJECTS = [
+    ("apples", "baskets"), ("oranges", "bags"), ("pencils", "boxes"), ("crayons", "packs"),
+    ("cookies", "jars"), ("cupcakes", "trays"), ("stickers", "sheets"), ("marbles", "pouches"),
+    ("books", "shelves"), ("flowers", "vases"), ("eggs", "cartons"), ("balloons", "bunches")
+]
+
+MULTIPLICATION_STORIES = [
+    "{name} has {a} {container} with {b} {objects} in each. How many {objects} does {name} have in total?",
+    "There are {a} {container} and each one holds {b} {objects}. How many {objects} are there altogether?",
+    "{name} buys {a} {container} of {objects}. Each of them has {b} {objects}. How many {objects} did {name} buy?"
+]
+DIVISION_STORIES = [
+    "{name} has {total} {objects} and shares them equally among {b} friends. How many {objects} does each friend get?",
+    "{total} {objects} are packed equally into {b} {container}. How many {objects} go in each?",
+    "{name} puts {total} {objects} into groups of {b}. How many groups does {name} make?"
+]
+ADDITION_STORIES = [
+    "{name} had {a} {objects} and got {b} more. How many {objects} does {name} have now?",
+    "There are {a} {objects} in one box and {b} {objects} in another. How many {objects} are there in all?"
+]
+SUBTRACTION_STORIES = [
+    "{name} had {a} {objects} and gave away {b}. How many {objects} are left?",
+    "There were {a} {objects} on the table. {name} took {b} of them. How many {objects} are still on the table?"
+]
+
+# Topic keywords -> operation; checked in order against the lower-cased topic
+TOPIC_OPERATIONS = [
+    ("multipl", "multiplication"),
+    ("times", "multiplication"),
+    ("table", "multiplication"),
+    ("divi", "division"),
+    ("shar", "division"),
+    ("subtract", "subtraction"),
+    ("minus", "subtraction"),
+    ("add", "addition"),
+    ("sum", "addition")
+]
+OPERATIONS = ["multiplication", "division", "addition", "subtraction"]
+
+# Offline science questions: (keywords, question, correct answer, distractors, explanation)
+SCIENCE_FACTS = [
+    (("plant",), "What do plants need to make their own food?", "Sunlight, water and air", ["Only soil", "Darkness", "Sugar and salt"],
+     "Plants use sunlight, water and air (carbon dioxide) to make food in their leaves."),
+    (("plant",), "Which part of a plant takes in water from the soil?", "Roots", ["Flowers", "Leaves", "Fruits"],
+     "Roots hold the plant in the soil and soak up water and minerals."),
+    (("plant", "leaf", "leaves"), "Which part of a plant makes food for it?", "Leaves", ["Roots", "Stem", "Seeds"],
+     "Leaves use sunlight to make food for the whole plant."),
+    (("plant", "seed"), "What does a seed need to start growing?", "Water, air and warmth", ["Only sunlight", "Ice", "Salt"],
+     "A seed sprouts when it gets water, air and the right warmth."),
+    (("animal", "home", "habitat"), "Where does a fish live?", "In water", ["In a nest", "In a burrow", "In a tree"],
+     "Fish breathe with gills and live in water."),
+    (("animal", "home", "habitat"), "Which animal lives in a hive?", "Bee", ["Lion", "Fish", "Rabbit"],
+     "Bees build hives where they store honey and raise young."),
+    (("animal", "home", "habitat"), "What do we call a bird's home?", "Nest", ["Den", "Kennel", "Stable"],
+     "Birds build nests to lay eggs and keep their babies safe."),
+    (("animal", "food chain"), "Which of these animals eats only plants?", "Cow", ["Lion", "Tiger", "Wolf"],
+     "Animals that eat only plants are called herbivores, like cows."),
+    (("water",), "What happens to water when it is frozen?", "It turns into ice", ["It turns into steam", "It disappears", "It becomes salt"],
+     "Water freezes into solid ice when it gets very cold."),
+    (("water",), "What do we call water when it turns into a gas?", "Water vapour", ["Ice", "Rain", "Snow"],
+     "Heated water evaporates and becomes water vapour."),
+    (("water", "weather", "cycle"), "Where does rain come from?", "Clouds", ["The ground", "Trees", "The sun"],
+     "Water vapour cools into droplets in clouds and falls as rain."),
+    (("body", "sense"), "Which organ do we use to see?", "Eyes", ["Ears", "Nose", "Tongue"],
+     "Our eyes let us see the world around us."),
+    (("body", "sense"), "Which body part helps us smell?", "Nose", ["Eyes", "Hands", "Knees"],
+     "The nose is the sense organ for smell."),
+    (("body", "health", "habit"), "Why should we wash our hands before eating?", "To remove germs", ["To make them cold", "To make them heavy", "To change their colour"],
+     "Washing hands removes germs that could make us sick."),
+    (("living", "non-living"), "Which of these is a living thing?", "A tree", ["A rock", "A chair", "A spoon"],
+     "Living things grow, need food and water, and can reproduce."),
+    (("living", "non-living"), "Which of these is a non-living thing?", "A stone", ["A cat", "A flower", "A bird"],
+     "A stone does not grow, eat or breathe, so it is non-living."),
+    (("air", "weather"), "What do we need to breathe to stay alive?", "Air", ["Sand", "Juice", "Smoke"],
+     "Our lungs take in air, which has the oxygen our body needs."),
+    (("sun", "energy", "earth"), "What gives Earth light and heat during the day?", "The Sun", ["The Moon", "The stars", "Clouds"],
+     "The Sun is a star that gives Earth light and warmth.")
+]
+
+# Bound on remembered question signatures per (topic, difficulty, subject) in one session
+MAX_SEEN_PER_KEY = 5000
+MAX_SEEN_KEYS = 200
+
+
+class QuestionGenerator:
+    """Procedural, offline question source.
+
+    Everything random comes from one seeded `random.Random`, so the same seed
+    and call sequence always give the same questions. A generator instance is
+    one session: it remembers what it has produced and does not repeat a
+    question (same operation and operands, or same science fact) until the
+    space for that topic and difficulty is used up.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self._seen: "OrderedDict[Tuple[str, str, str], Set[tuple]]" = OrderedDict()
+        self.generated = 0
+
+    def generate(self, topic: str, difficulty: str, subject_type: str = 'math') -> dict:
+        difficulty = difficulty if difficulty in MULTIPLICATION_RANGES else "medium"
+        if subject_type == 'math':
+            return self._math_question(topic, difficulty)
+        return self._science_question(topic, difficulty)
+
+    def generate_many(self, topic: str, difficulty: str, count: int, subject_type: str = 'math') -> List[dict]:
+        return [self.generate(topic, difficulty, subject_type) for _ in range(count)]
+
+    def _seen_for(self, topic: str, difficulty: str, subject_type: str) -> Set[tuple]:
+        key = (topic.lower(), difficulty, subject_type)
+        seen = self._seen.get(key)
+        if seen is None:
+            seen = self._seen[key] = set()
+            while len(self._seen) > MAX_SEEN_KEYS:
+                self._seen.popitem(last=False)
+        else:
+            self._seen.move_to_end(key)
+        return seen
+
+    def _unique(self, seen: Set[tuple], draw: Callable[[], tuple], attempts: int = 50) -> tuple:
+        """Draw signatures until one has not been used; forget the history if the space is exhausted"""
+        for _ in range(attempts):
+            signature = draw()
+            if signature not in seen:
+                break
+        else:
+            seen.clear()
+        if len(seen) >= MAX_SEEN_PER_KEY:
+            seen.clear()
+        seen.add(signature)
+        return signature
+
+    # ---- math
+
+    def _operation_for(self, topic: str) -> str:
+        lowered = topic.lower()
+        for keyword, operation in TOPIC_OPERATIONS:
+            if keyword in lowered:
+                return operation
+        return self.rng.choice(OPERATIONS)
+
+    def _draw_operands(self, operation: str, difficulty: str) -> Tuple[int, int]:
+        rng = self.rng
+        if operation in ("multiplication", "division"):
+            while True:
+                (a_low, a_high), (b_low, b_high) = rng.choice(MULTIPLICATION_RANGES[difficulty])
+                a, b = rng.randint(a_low, a_high), rng.randint(b_low, b_high)
+                if difficulty != "hard" or a * b < MAX_HARD_PRODUCT:
+                    break
+            if rng.random() < 0.5:
+                a, b = b, a
+            return a, b
+        low, high = ADDITION_RANGES[difficulty]
+        a, b = rng.randint(low, high), rng.randint(low, high)
+        if operation == "subtraction" and a < b:
+            a, b = b, a
+        return a, b
+
+    def _math_question(self, topic: str, difficulty: str) -> dict:
+        operation = self._operation_for(topic)
+        seen = self._seen_for(topic, difficulty, "math")
+        _, a, b = self._unique(seen, lambda: (operation,) + self._draw_operands(operation, difficulty))
+        rng = self.rng
+
+        if operation == "multiplication":
+            answer, symbol, total = a * b, "×", None
+            distractors = [a * (b + 1), a * (b - 1), (a + 1) * b, a + b, answer + 10, answer - 10, answer + 1, answer - 1]
+            stories = MULTIPLICATION_STORIES
+            hint = f"Think: {a} groups of {b} is {a} × {b}."
+            explanation = f"{a} × {b} = {answer}."
+        elif operation == "division":
+            # a is the quotient and b the divisor, so the division is always exact
+            total = a * b
+            answer, symbol = a, "÷"
+            distractors = [a + 1, a - 1, a + 2, b, total - b, a * 2, a + b]
+            stories = DIVISION_STORIES
+            hint = f"Ask yourself: what number times {b} makes {total}?"
+            explanation = f"{total} ÷ {b} = {a}, because {a} × {b} = {total}."
+        elif operation == "addition":
+            answer, symbol, total = a + b, "+", None
+            distractors = [answer + 1, answer - 1, answer + 10, answer - 10, abs(a - b), answer + 2]
+            stories = ADDITION_STORIES
+            hint = f"Add the tens first, then the ones: {a} + {b}."
+            explanation = f"{a} + {b} = {answer}."
+        else:
+            answer, symbol, total = a - b, "-", None
+            distractors = [answer + 1, answer - 1, answer + 10, answer - 10, a + b, answer + 2]
+            stories = SUBTRACTION_STORIES
+            hint = f"Count up from {b} to {a}."
+            explanation = f"{a} - {b} = {answer}."
+
+        if difficulty == "easy":
+            left = total if operation == "division" else a
+            question_text = f"What is {left} {symbol} {b}?"
+        else:
+            objects, container = rng.choice(OBJECTS)
+            question_text = rng.choice(stories).format(
+                name=rng.choice(NAMES), objects=objects, container=container, a=a, b=b, total=total
+            )
+
+        options = self._options(str(answer), [str(value) for value in distractors if value > 0 and value != answer])
+        return self._question(question_text, options, difficulty, explanation, hint, topic)
+
+    # ---- science
+
+    def _science_question(self, topic: str, difficulty: str) -> dict:
+        lowered = topic.lower()
+        facts = [fact for fact in SCIENCE_FACTS if any(keyword in lowered for keyword in fact[0])] or SCIENCE_FACTS
+        seen = self._seen_for(topic, difficulty, "science")
+        (index,) = self._unique(seen, lambda: (self.rng.randrange(len(facts)),), attempts=len(facts) * 4)
+        _, question_text, correct, distractors, explanation = facts[index]
+        options = self._options(correct, distractors)
+        hint = "Think about what you see around you every day."
+        return self._question(question_text, options, difficulty, explanation, hint, topic)
+
+    # ---- shared
+
+    def _options(self, correct: str, distractors: List[str], count: int = 4) -> List[dict]:
+        """Correct answer plus distinct distractors, shuffled"""
+        unique_distractors = list(dict.fromkeys(value for value in distractors if value != correct))
+        chosen = self.rng.sample(unique_distractors, min(count - 1, len(unique_distractors)))
+        options = [{"text": correct, "correct": True}] + [{"text": text, "correct": False} for text in chosen]
+        self.rng.shuffle(options)
+        return options
+
+    def _question(self, question_text: str, options: List[dict], difficulty: str, explanation: str, hint: str, topic: str) -> dict:
+        self.generated += 1
+        return {
+            "id": self.rng.randint(100000, 999999),
+            "question": question_text,
+            "options": options,
+            "difficulty": difficulty,
+            "explanation": explanation,
+            "hint": hint,
+            "conceptTags": [topic]
+        }
+
+
+# Process-wide session used by the Gemini fallback path
+_default_generator = QuestionGenerator()
+
+
+def get_fallback_question(topic: str, difficulty: str, subject_type: str = 'math') -> dict:
+    """Instant offline question for when Gemini is unavailable"""
+    return _default_generator.generate(topic, difficulty, subject_type)
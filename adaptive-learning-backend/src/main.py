@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.api.routes import student, practice, mastery, learning, auth
 from src.config import settings
+from src.services.gemini_client import close_http_client
 
 app = FastAPI()
 
@@ -19,6 +20,30 @@ app.include_router(student.router, prefix="/api/students", tags=["students"])
 app.include_router(practice.router, prefix="/api/practice", tags=["practice"])
 app.include_router(mastery.router, prefix="/api/mastery", tags=["mastery"])
 
+@app.on_event("startup")
+async def startup():
+    learning.question_pool.start()
+    learning.explanation_prefetcher.start()
+    if learning.rl_trainer is not None:
+        learning.rl_trainer.start()
+    if learning.shared_policy_publisher is not None:
+        learning.shared_policy_publisher.start()
+    if learning.checkpoint_manager is not None:
+        learning.checkpoint_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    if learning.shared_policy_publisher is not None:
+        await learning.shared_policy_publisher.stop()
+    if learning.rl_trainer is not None:
+        await learning.rl_trainer.stop()
+    # After the trainer, so the final checkpoint includes its last round
+    if learning.checkpoint_manager is not None:
+        await learning.checkpoint_manager.stop()
+    await learning.explanation_prefetcher.stop()
+    await learning.question_pool.stop()
+    await close_http_client()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Adaptive Learning API!"}
\ No newline at end of file
@@ -3,19 +3,37 @@ from torch import nn
 import torch.optim as optim
 import numpy as np
 import random
+from src.rl.numpy_policy import export_policy_weights
+from src.rl.prioritized_replay import PrioritizedReplayBuffer
+from src.rl.replay_buffer import ReplayBuffer
 
 class AdaptiveQNetwork:
-    def __init__(self, state_size, action_size, learning_rate=0.001, replay_buffer_size=10000, batch_size=32):
+    def __init__(self, state_size, action_size, learning_rate=0.001, replay_buffer_size=10000, batch_size=32, target_update_frequency=1000, replay_buffer_path=None, prioritized_replay=False):
         self.state_size = state_size
         self.action_size = action_size
         self.learning_rate = learning_rate
         self.replay_buffer_size = replay_buffer_size
         self.batch_size = batch_size
+        self.target_update_frequency = target_update_frequency
         
         self.q_network = QNetwork(state_size, action_size)
         self.target_network = QNetwork(state_size, action_size)
+        # The target network only provides bootstrap targets, so it never runs dropout
+        self.target_network.load_state_dict(self.q_network.state_dict())
+        self.target_network.eval()
+        # Requests run inference on a published copy, so training never changes weights a request is reading
+        self.policy_network = self._snapshot()
+        self.policy_version = 0
+        # Called with the agent after every publish_policy(), e.g. to mirror weights to other processes
+        self.publish_hooks = []
         self.optimizer = optim.Adam(self.q_network.parameters(), lr=self.learning_rate)
-        self.replay_buffer = ReplayBuffer(replay_buffer_size)
+        self.loss_fn = nn.MSELoss()
+        self.training_step = 0
+        self.prioritized_replay = prioritized_replay
+        if prioritized_replay:
+            self.replay_buffer = PrioritizedReplayBuffer(replay_buffer_size, state_size, path=replay_buffer_path)
+        else:
+            self.replay_buffer = ReplayBuffer(replay_buffer_size, state_size, path=replay_buffer_path)
         self.epsilon = 1.0
         self.epsilon_decay = 0.995
         self.epsilon_min = 0.01
@@ -28,29 +46,80 @@ class AdaptiveQNetwork:
     def select_action(self, state):
         if np.random.rand() <= self.epsilon:
             return random.randrange(self.action_size)
-        state = torch.FloatTensor(state).unsqueeze(0)
-        q_values = self.q_network(state)
+        policy = self.policy_network
+        with torch.inference_mode():
+            q_values = policy(torch.FloatTensor(state).unsqueeze(0))
         return torch.argmax(q_values).item()
 
+    def predict_actions(self, states):
+        """Greedy actions of the published policy for a (N, state_size) float32 array"""
+        policy = self.policy_network
+        with torch.inference_mode():
+            return policy(torch.from_numpy(states)).argmax(dim=1).tolist()
+
+    def export_policy(self, path):
+        """Write the published policy weights for torch-free serving (see numpy_policy)"""
+        export_policy_weights(self.policy_network, path)
+
+    def _snapshot(self):
+        network = QNetwork(self.state_size, self.action_size)
+        network.load_state_dict(self.q_network.state_dict())
+        network.eval()
+        return network
+
+    def publish_policy(self):
+        """Make the current training weights the ones select_action uses.
+
+        The copy is built off to the side and swapped in with one reference
+        assignment, so a concurrent select_action sees either the old or the
+        new weights, never a mix.
+        """
+        self.policy_network = self._snapshot()
+        self.policy_version += 1
+        for hook in self.publish_hooks:
+            hook(self)
+
     def store_experience(self, experience):
         self.replay_buffer.add(experience)
 
     def train(self):
+        """One optimizer step on a sampled minibatch; returns the loss, or None while the buffer is too small"""
         if len(self.replay_buffer) < self.batch_size:
-            return
+            return None
         
-        minibatch = self.replay_buffer.sample(self.batch_size)
-        for state, action, reward, next_state, done in minibatch:
-            target = reward
-            if not done:
-                target += self.gamma * torch.max(self.target_network(torch.FloatTensor(next_state).unsqueeze(0))).item()
-            target_f = self.q_network(torch.FloatTensor(state).unsqueeze(0))
-            target_f[0][action] = target
-            
-            self.optimizer.zero_grad()
-            loss = nn.MSELoss()(self.q_network(torch.FloatTensor(state).unsqueeze(0)), target_f)
-            loss.backward()
-            self.optimizer.step()
+        if not self.prioritized_replay:
+            return self.train_on_batch(self.replay_buffer.sample(self.batch_size))
+        indices, batch, weights = self.replay_buffer.sample_with_weights(self.batch_size)
+        loss, td_errors = self._learn(batch, weights)
+        self.replay_buffer.update_priorities(indices, td_errors.numpy())
+        return loss
+
+    def train_on_batch(self, batch):
+        """One optimizer step on a (states, actions, rewards, next_states, dones) batch of tensors; returns the loss"""
+        return self._learn(batch)[0]
+
+    def _learn(self, batch, weights=None):
+        states, actions, rewards, next_states, dones = batch
+        
+        # Bootstrap targets from the target network, outside the autograd graph
+        with torch.no_grad():
+            targets = rewards + self.gamma * self.target_network(next_states).max(1)[0] * (1 - dones)
+        q_values = self.q_network(states).gather(1, actions.unsqueeze(1)).squeeze(1)
+        
+        td_errors = q_values - targets
+        if weights is not None:
+            # Importance-sampling weights undo the bias of sampling by priority
+            loss = (weights * td_errors.pow(2)).mean()
+        else:
+            loss = self.loss_fn(q_values, targets)
+        self.optimizer.zero_grad()
+        loss.backward()
+        self.optimizer.step()
+        
+        self.training_step += 1
+        if self.training_step % self.target_update_frequency == 0:
+            self.update_target_network()
+        return loss.item(), td_errors.detach()
 
     def update_target_network(self):
         self.target_network.load_state_dict(self.q_network.state_dict())
@@ -69,19 +138,3 @@ class QNetwork(nn.Module):
         x = nn.functional.relu(self.fc2(x))
         x = self.dropout(x)
         return self.fc3(x)
-
-class ReplayBuffer:
-    def __init__(self, max_size):
-        self.buffer = []
-        self.max_size = max_size
-
-    def add(self, experience):
-        if len(self.buffer) >= self.max_size:
-            self.buffer.pop(0)
-        self.buffer.append(experience)
-
-    def sample(self, batch_size):
-        return random.sample(self.buffer, batch_size)
-
-    def __len__(self):
-        return len(self.buffer)
\ No newline at end of file
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from src.config import settings
+
+
+class BackgroundTrainer:
+    """Trains an AdaptiveQNetwork on a dedicated thread, off the request path.
+
+    Requests only run inference and `submit` experiences to a bounded queue.
+    Every `train_interval` seconds the thread moves queued experiences into
+    the replay buffer, takes one optimizer step per new experience (at most
+    `max_steps_per_round`) and publishes the new weights with
+    publish_policy(). Only this thread touches the replay buffer and the
+    training network; `lock` is held for each round so others (checkpoints)
+    can read a consistent model. With `transition_log_path`, every
+    experience is also appended to that NDJSON file for offline training.
+    """
+
+    def __init__(self, agent, train_interval: float = None, max_steps_per_round: int = None, max_queue: int = None,
+                 transition_log_path: Optional[str] = None):
+        self.agent = agent
+        self.train_interval = train_interval if train_interval is not None else settings.rl_train_interval_seconds
+        self.max_steps_per_round = max_steps_per_round if max_steps_per_round is not None else settings.rl_max_steps_per_round
+        self._queue: "queue.Queue[Tuple]" = queue.Queue(maxsize=max_queue if max_queue is not None else settings.rl_experience_queue_size)
+        self._stop = threading.Event()
+        self.lock = threading.Lock()
+        self.transition_log_path = transition_log_path if transition_log_path is not None else settings.rl_transition_log_path
+        self._transition_log = None
+        self.logged = 0
+        self._thread: Optional[threading.Thread] = None
+        self.submitted = 0
+        self.dropped = 0
+        self.rounds = 0
+        self.train_steps = 0
+        self.errors = 0
+        self.last_loss: Optional[float] = None
+        self.total_train_seconds = 0.0
+        self.last_publish: Optional[float] = None
+
+    def submit(self, experience: Tuple) -> bool:
+        """Queue a (state, action, reward, next_state, done) experience; False if the queue is full"""
+        try:
+            self._queue.put_nowait(experience)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def run_once(self) -> int:
+        """Drain the queue, train and publish; returns the number of optimizer steps taken"""
+        with self.lock:
+            return self._train_round()
+
+    def _train_round(self) -> int:
+        new_experiences = 0
+        while True:
+            try:
+                experience = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self.agent.store_experience(experience)
+            if self.transition_log_path:
+                self._log_transition(experience)
+            new_experiences += 1
+        if self._transition_log is not None:
+            self._transition_log.flush()
+        steps = 0
+        started = time.perf_counter()
+        for _ in range(min(new_experiences, self.max_steps_per_round)):
+            loss = self.agent.train()
+            if loss is None:
+                break
+            self.last_loss = loss
+            steps += 1
+        if steps:
+            self.agent.publish_policy()
+            self.last_publish = time.monotonic()
+            self.total_train_seconds += time.perf_counter() - started
+            self.train_steps += steps
+        self.rounds += 1
+        return steps
+
+    def _log_transition(self, experience: Tuple) -> None:
+        if self._transition_log is None:
+            directory = os.path.dirname(self.transition_log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._transition_log = open(self.transition_log_path, "a")
+        state, action, reward, next_state, done = experience
+        self._transition_log.write(json.dumps({
+            "state": [float(x) for x in state],
+            "action": int(action),
+            "reward": float(reward),
+            "next_state": [float(x) for x in next_state],
+            "done": bool(done)
+        }) + "\n")
+        self.logged += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.train_interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.errors += 1
+                print(f"ERROR in background training round: {type(e).__name__}: {str(e)}")
+
+    def start(self) -> None:
+        """Launch the training thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="rl-trainer", daemon=True)
+            self._thread.start()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop the thread after its current round, without blocking the event loop"""
+        if self._thread is not None:
+            self._stop.set()
+            await asyncio.to_thread(self._thread.join, timeout)
+            self._thread = None
+        if self._transition_log is not None:
+            self._transition_log.close()
+            self._transition_log = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queueDepth": self._queue.qsize(),
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "logged": self.logged,
+            "replaySize": len(self.agent.replay_buffer),
+            "rounds": self.rounds,
+            "trainSteps": self.train_steps,
+            "errors": self.errors,
+            "lastLoss": round(self.last_loss, 5) if self.last_loss is not None else None,
+            "avgStepMs": round(self.total_train_seconds / self.train_steps * 1000, 3) if self.train_steps else 0.0,
+            "policyVersion": self.agent.policy_version,
+            "secondsSincePublish": round(time.monotonic() - self.last_publish, 1) if self.last_publish is not None else None
+        }
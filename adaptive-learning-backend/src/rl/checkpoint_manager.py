@@ -0,0 +1,300 @@
+import asyncio
+import io
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+import torch
+from src.config import settings
+
+CHECKPOINT_FORMAT_VERSION = 1
+
+
+def serialize_agent(agent) -> bytes:
+    """Weights, optimizer state and exploration schedule of an AdaptiveQNetwork as one torch.save blob"""
+    buffer = io.BytesIO()
+    torch.save({
+        "format_version": CHECKPOINT_FORMAT_VERSION,
+        "state_size": agent.state_size,
+        "action_size": agent.action_size,
+        "q_network": agent.q_network.state_dict(),
+        "target_network": agent.target_network.state_dict(),
+        "optimizer": agent.optimizer.state_dict(),
+        "epsilon": agent.epsilon,
+        "training_step": agent.training_step
+    }, buffer)
+    return buffer.getvalue()
+
+
+def deserialize_agent(agent, blob: bytes) -> None:
+    """Load a serialize_agent blob into `agent` and publish its weights"""
+    # weights_only keeps a tampered checkpoint from running code on load
+    checkpoint = torch.load(io.BytesIO(blob), map_location="cpu", weights_only=True)
+    if checkpoint["format_version"] != CHECKPOINT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported checkpoint format version {checkpoint['format_version']}")
+    if (checkpoint["state_size"], checkpoint["action_size"]) != (agent.state_size, agent.action_size):
+        raise ValueError(f"Checkpoint is for a {checkpoint['state_size']}x{checkpoint['action_size']} network, "
+                         f"not {agent.state_size}x{agent.action_size}")
+    agent.q_network.load_state_dict(checkpoint["q_network"])
+    agent.target_network.load_state_dict(checkpoint["target_network"])
+    agent.optimizer.load_state_dict(checkpoint["optimizer"])
+    agent.epsilon = checkpoint["epsilon"]
+    agent.training_step = checkpoint["training_step"]
+    agent.publish_policy()
+
+
+class FileCheckpointBackend:
+    """Checkpoints as numbered files next to `path` (dqn_model.pth -> dqn_model.v000012.pth)"""
+
+    def __init__(self, path: str):
+        self.root, self.extension = os.path.splitext(path)
+        self.directory = os.path.dirname(path) or "."
+        self.prefix = os.path.basename(self.root) + ".v"
+
+    def _path(self, version: int) -> str:
+        return f"{self.root}.v{version:06d}{self.extension}"
+
+    def _write(self, path: str, data: bytes) -> None:
+        # Written to the side and renamed, so a crash never leaves a truncated checkpoint
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    async def save(self, version: int, blob: bytes, metadata: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._write, self._path(version), blob)
+
+    async def load(self, version: int) -> Optional[bytes]:
+        def read():
+            try:
+                with open(self._path(version), "rb") as f:
+                    return f.read()
+            except FileNotFoundError:
+                return None
+        return await asyncio.to_thread(read)
+
+    async def versions(self) -> List[int]:
+        def scan():
+            if not os.path.isdir(self.directory):
+                return []
+            found = []
+            for name in os.listdir(self.directory):
+                if name.startswith(self.prefix) and name.endswith(self.extension):
+                    number = name[len(self.prefix):len(name) - len(self.extension)]
+                    if number.isdigit():
+                        found.append(int(number))
+            return sorted(found)
+        return await asyncio.to_thread(scan)
+
+    async def delete(self, version: int) -> None:
+        def remove():
+            try:
+                os.remove(self._path(version))
+            except FileNotFoundError:
+                pass
+        await asyncio.to_thread(remove)
+
+    async def get_current(self) -> Optional[int]:
+        def read():
+            try:
+                with open(f"{self.root}.current") as f:
+                    return int(f.read().strip())
+            except (OSError, ValueError):
+                return None
+        return await asyncio.to_thread(read)
+
+    async def set_current(self, version: int) -> None:
+        await asyncio.to_thread(self._write, f"{self.root}.current", str(version).encode())
+
+
+class MongoCheckpointBackend:
+    """Checkpoints as binary documents in MongoDB (via PersistenceService), shared by every host"""
+
+    def __init__(self, persistence_service, model_id: str = "adaptive_q_network"):
+        self.persistence_service = persistence_service
+        self.model_id = model_id
+        self._indexed = False
+
+    async def save(self, version: int, blob: bytes, metadata: Dict[str, Any]) -> None:
+        if not self._indexed:
+            await self.persistence_service.ensure_checkpoint_indexes()
+            self._indexed = True
+        await self.persistence_service.save_model_checkpoint(self.model_id, version, blob, metadata)
+
+    async def load(self, version: int) -> Optional[bytes]:
+        return await self.persistence_service.load_model_checkpoint(self.model_id, version)
+
+    async def versions(self) -> List[int]:
+        return await self.persistence_service.list_model_checkpoints(self.model_id)
+
+    async def delete(self, version: int) -> None:
+        await self.persistence_service.delete_model_checkpoint(self.model_id, version)
+
+    async def get_current(self) -> Optional[int]:
+        state = await self.persistence_service.load_model_state(self.model_id)
+        return state.get("current_version") if state else None
+
+    async def set_current(self, version: int) -> None:
+        await self.persistence_service.save_model_state(self.model_id, {"current_version": version})
+
+
+class CheckpointManager:
+    """Versioned checkpoints of an AdaptiveQNetwork, written in the background.
+
+    Every `interval_seconds` the agent is serialized on a worker thread while
+    holding `lock` (the BackgroundTrainer's, so no optimizer step runs
+    mid-copy) and stored as the next version; requests keep running on the
+    published policy throughout. The newest `keep` versions are retained and
+    a "current" pointer names the one startup loads, so rollback() only moves
+    the pointer back and reloads. Loading happens in the background task too,
+    so startup does not wait on it; until it finishes the untrained policy
+    serves. A memory-mapped replay buffer is flushed with each checkpoint.
+    """
+
+    def __init__(self, agent, backend, interval_seconds: float = None, keep: int = None, lock: threading.Lock = None):
+        self.agent = agent
+        self.backend = backend
+        self.interval_seconds = interval_seconds if interval_seconds is not None else settings.checkpoint_interval_seconds
+        self.keep = keep if keep is not None else settings.checkpoint_keep
+        self.lock = lock or threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.current_version: Optional[int] = None
+        self.saved_training_step: Optional[int] = None
+        self.saves = 0
+        self.loads = 0
+        self.errors = 0
+        self.last_save_seconds: Optional[float] = None
+        self.last_blob_bytes = 0
+
+    def _serialize(self) -> bytes:
+        with self.lock:
+            self.agent.replay_buffer.flush()
+            return serialize_agent(self.agent)
+
+    def _apply(self, blob: bytes) -> None:
+        with self.lock:
+            deserialize_agent(self.agent, blob)
+
+    async def save(self, force: bool = False) -> Optional[int]:
+        """Store the agent as a new version; None if nothing was trained since the last save"""
+        if not force and self.agent.training_step == self.saved_training_step:
+            return None
+        started = time.perf_counter()
+        training_step = self.agent.training_step
+        blob = await asyncio.to_thread(self._serialize)
+        versions = await self.backend.versions()
+        version = (versions[-1] if versions else 0) + 1
+        await self.backend.save(version, blob, {
+            "training_step": training_step,
+            "epsilon": self.agent.epsilon,
+            "created_at": datetime.now(timezone.utc)
+        })
+        await self.backend.set_current(version)
+        self.current_version = version
+        self.saved_training_step = training_step
+        self.saves += 1
+        self.last_blob_bytes = len(blob)
+        self.last_save_seconds = time.perf_counter() - started
+        for old_version in (versions + [version])[:-self.keep] if self.keep > 0 else []:
+            await self.backend.delete(old_version)
+        return version
+
+    async def load_version(self, version: int) -> bool:
+        blob = await self.backend.load(version)
+        if blob is None:
+            return False
+        await asyncio.to_thread(self._apply, blob)
+        self.current_version = version
+        self.saved_training_step = self.agent.training_step
+        self.loads += 1
+        return True
+
+    async def load_latest(self) -> Optional[int]:
+        """Load the current version (or the newest, without a pointer); None if there is no checkpoint"""
+        versions = await self.backend.versions()
+        current = await self.backend.get_current()
+        candidates = ([current] if current in versions else []) + [v for v in reversed(versions) if v != current]
+        for version in candidates:
+            try:
+                if await self.load_version(version):
+                    print(f"Loaded Q-network checkpoint v{version} (training step {self.agent.training_step})")
+                    return version
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Skipping unreadable checkpoint v{version}: {type(e).__name__}: {str(e)}")
+        return None
+
+    async def rollback(self, version: int = None) -> Optional[int]:
+        """Load `version` (default: the one before the current) and make it current"""
+        versions = await self.backend.versions()
+        if version is None:
+            older = [v for v in versions if self.current_version is None or v < self.current_version]
+            if not older:
+                return None
+            version = older[-1]
+        if version not in versions or not await self.load_version(version):
+            return None
+        await self.backend.set_current(version)
+        print(f"Rolled Q-network back to checkpoint v{version}")
+        return version
+
+    async def _run(self) -> None:
+        try:
+            await self.load_latest()
+        except Exception as e:
+            self.errors += 1
+            print(f"ERROR loading Q-network checkpoint: {type(e).__name__}: {str(e)}")
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.save()
+            except Exception as e:
+                self.errors += 1
+                print(f"ERROR saving Q-network checkpoint: {type(e).__name__}: {str(e)}")
+
+    def start(self) -> None:
+        """Load the latest checkpoint, then checkpoint periodically, in a background task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the periodic task and write a final checkpoint"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.save()
+        except Exception as e:
+            self.errors += 1
+            print(f"ERROR saving Q-network checkpoint: {type(e).__name__}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "currentVersion": self.current_version,
+            "savedTrainingStep": self.saved_training_step,
+            "saves": self.saves,
+            "loads": self.loads,
+            "errors": self.errors,
+            "lastSaveMs": round(self.last_save_seconds * 1000, 1) if self.last_save_seconds is not None else None,
+            "lastCheckpointBytes": self.last_blob_bytes
+        }
+
+
+def create_checkpoint_manager(agent, lock: threading.Lock = None, persistence_service=None, name: str = None) -> Optional[CheckpointManager]:
+    """Manager selected by settings.checkpoint_backend: "file", "mongo" or "none" """
+    name = name or settings.checkpoint_backend
+    if name == "file":
+        return CheckpointManager(agent, FileCheckpointBackend(settings.model_save_path), lock=lock)
+    if name == "mongo":
+        if persistence_service is None:
+            from src.services.persistence_service import PersistenceService
+            persistence_service = PersistenceService()
+        return CheckpointManager(agent, MongoCheckpointBackend(persistence_service), lock=lock)
+    return None
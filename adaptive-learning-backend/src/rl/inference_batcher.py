@@ -0,0 +1,86 @@
+import asyncio
+import random
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src.config import settings
+
+
+class InferenceBatcher:
+    """Micro-batches concurrent select_action calls into one forward pass.
+
+    The first greedy request opens a window of `window_ms`; requests arriving
+    within it (up to `max_batch`, which flushes immediately) are stacked and
+    run through the published policy in a single pass via the agent's
+    predict_actions (torch.inference_mode() for AdaptiveQNetwork, plain NumPy
+    for NumpyPolicy). A window of 0 adds no delay and only batches
+    requests made in the same event loop iteration. Exploration (epsilon)
+    draws are answered immediately without touching the network.
+    """
+
+    def __init__(self, agent, window_ms: float = None, max_batch: int = None):
+        self.agent = agent
+        self.window_seconds = (window_ms if window_ms is not None else settings.rl_inference_window_ms) / 1000.0
+        self.max_batch = max_batch if max_batch is not None else settings.rl_inference_max_batch
+        self._pending: List[Tuple[np.ndarray, asyncio.Future]] = []
+        self._timer: Optional[asyncio.Handle] = None
+        self._states = np.empty((self.max_batch, agent.state_size), dtype=np.float32)
+        self.requests = 0
+        self.explored = 0
+        self.batches = 0
+        self.max_batch_seen = 0
+
+    async def select_action(self, state) -> int:
+        self.requests += 1
+        if np.random.rand() <= self.agent.epsilon:
+            self.explored += 1
+            return random.randrange(self.agent.action_size)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((state, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            if self.window_seconds > 0:
+                self._timer = loop.call_later(self.window_seconds, self._flush)
+            else:
+                self._timer = loop.call_soon(self._flush)
+        return await future
+
+    def _forward(self, states: List[Any]) -> List[int]:
+        batch = self._states[:len(states)]
+        for row, state in enumerate(states):
+            batch[row] = state
+        return self.agent.predict_actions(batch)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        self.batches += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(pending))
+        try:
+            actions = self._forward([state for state, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), action in zip(pending, actions):
+            # A caller cancelled while waiting no longer needs its action
+            if not future.done():
+                future.set_result(action)
+
+    def stats(self) -> Dict[str, Any]:
+        greedy = self.requests - self.explored
+        return {
+            "windowMs": self.window_seconds * 1000,
+            "maxBatch": self.max_batch,
+            "requests": self.requests,
+            "explored": self.explored,
+            "batches": self.batches,
+            "avgBatchSize": round(greedy / self.batches, 2) if self.batches else 0.0,
+            "maxBatchSeen": self.max_batch_seen
+        }
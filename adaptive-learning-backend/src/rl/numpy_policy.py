@@ -0,0 +1,92 @@
+"""Torch-free inference for the Q-network.
+
+Training stays in torch; serving-only workers load exported weights into a
+NumpyPolicy and never import torch. The export format is an .npz file with
+one (in, out) float32 weight matrix `w{i}` and bias `b{i}` per Linear layer
+in forward order, ReLU between layers, plus a `format_version` scalar.
+Dropout is omitted since inference runs in eval mode.
+"""
+import os
+import random
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+
+POLICY_FORMAT_VERSION = 1
+
+
+def linear_layer_arrays(network) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """(in, out) float32 weight and bias of each Linear layer of a torch MLP, in registration order"""
+    layers = [module for module in network.children() if type(module).__name__ == "Linear"]
+    return [(np.ascontiguousarray(layer.weight.detach().cpu().numpy().T, dtype=np.float32),
+             layer.bias.detach().cpu().numpy().astype(np.float32)) for layer in layers]
+
+
+def export_policy_weights(network, path: str) -> None:
+    """Write the Linear layers of a torch MLP as a NumpyPolicy file.
+
+    Layers are taken in registration order, which is forward order for the
+    QNetwork classes here. The file is written next to `path` and renamed over
+    it, so readers never see a partial export.
+    """
+    arrays = {"format_version": np.array(POLICY_FORMAT_VERSION)}
+    for index, (weight, bias) in enumerate(linear_layer_arrays(network)):
+        arrays[f"w{index}"] = weight
+        arrays[f"b{index}"] = bias
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(temp_path, **arrays)
+    os.replace(temp_path, path)
+
+
+class NumpyPolicy:
+    """MLP forward pass in NumPy with the select_action/predict_actions interface of AdaptiveQNetwork"""
+
+    def __init__(self, layers: Sequence[Tuple[np.ndarray, np.ndarray]], epsilon: float = 0.0):
+        self.layers: List[Tuple[np.ndarray, np.ndarray]] = [(np.asarray(w, dtype=np.float32), np.asarray(b, dtype=np.float32)) for w, b in layers]
+        self.state_size = self.layers[0][0].shape[0]
+        self.action_size = self.layers[-1][0].shape[1]
+        self.epsilon = epsilon
+        self.policy_version = 0
+
+    @classmethod
+    def load(cls, path: str, epsilon: float = 0.0) -> "NumpyPolicy":
+        with np.load(path) as data:
+            version = int(data["format_version"])
+            if version != POLICY_FORMAT_VERSION:
+                raise ValueError(f"Unsupported policy format version {version} in {path}")
+            count = sum(1 for name in data.files if name.startswith("w"))
+            layers = [(data[f"w{i}"], data[f"b{i}"]) for i in range(count)]
+        return cls(layers, epsilon)
+
+    @classmethod
+    def random_init(cls, state_size: int, action_size: int, hidden: Sequence[int] = (64, 64), epsilon: float = 0.0,
+                    seed: Optional[int] = None) -> "NumpyPolicy":
+        """Untrained weights drawn like torch.nn.Linear's default, U(-1/sqrt(fan_in), 1/sqrt(fan_in))"""
+        rng = np.random.default_rng(seed)
+        sizes = [state_size, *hidden, action_size]
+        layers = []
+        for fan_in, fan_out in zip(sizes, sizes[1:]):
+            bound = 1.0 / np.sqrt(fan_in)
+            layers.append((rng.uniform(-bound, bound, (fan_in, fan_out)), rng.uniform(-bound, bound, fan_out)))
+        return cls(layers, epsilon)
+
+    def q_values(self, states: np.ndarray) -> np.ndarray:
+        x = np.asarray(states, dtype=np.float32)
+        last = len(self.layers) - 1
+        for index, (weight, bias) in enumerate(self.layers):
+            x = x @ weight
+            x += bias
+            if index < last:
+                np.maximum(x, 0, out=x)
+        return x
+
+    def predict_actions(self, states: np.ndarray) -> List[int]:
+        """Greedy action per row of a (N, state_size) float32 array"""
+        return self.q_values(states).argmax(axis=1).tolist()
+
+    def select_action(self, state) -> int:
+        if np.random.rand() <= self.epsilon:
+            return random.randrange(self.action_size)
+        return int(self.q_values(np.asarray(state, dtype=np.float32)[None, :])[0].argmax())
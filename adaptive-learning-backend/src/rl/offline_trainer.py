@@ -0,0 +1,282 @@
+"""Train the adaptive policy offline on logged transitions.
+
+Transitions are streamed in chunks from an NDJSON file (one {"state",
+"action", "reward", "next_state", "done"} object per line, as BackgroundTrainer
+writes with RL_TRANSITION_LOG_PATH), a NumPy source (an .npz file, or a
+directory of .npy arrays such as a persisted ReplayBuffer), or a MongoDB
+collection of documents with the same fields. A torch DataLoader reads
+chunks in worker processes while the main process trains on large shuffled
+minibatches. The result is saved as a checkpoint that the API loads at
+startup (see CheckpointManager).
+
+    python -m src.rl.offline_trainer --ndjson data/transitions.ndjson --epochs 3 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+from src.config import settings
+
+TRANSITION_DTYPES = {
+    "states": np.float32,
+    "actions": np.int64,
+    "rewards": np.float32,
+    "next_states": np.float32,
+    "dones": np.float32
+}
+
+Chunk = Dict[str, np.ndarray]
+
+
+def _chunk_from_records(records: List[Dict[str, Any]]) -> Chunk:
+    return {
+        "states": np.array([r["state"] for r in records], dtype=np.float32),
+        "actions": np.array([r["action"] for r in records], dtype=np.int64),
+        "rewards": np.array([r["reward"] for r in records], dtype=np.float32),
+        "next_states": np.array([r["next_state"] for r in records], dtype=np.float32),
+        "dones": np.array([r["done"] for r in records], dtype=np.float32)
+    }
+
+
+class NDJSONTransitionSource:
+    """Transitions in an NDJSON file, split into byte ranges that workers parse independently"""
+
+    def __init__(self, path: str, chunk_size: int = 8192):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    def chunks(self) -> List[Tuple[int, int]]:
+        size = os.path.getsize(self.path)
+        if size == 0:
+            return []
+        # Size ranges from the first lines so each holds about chunk_size records
+        with open(self.path, "rb") as f:
+            sample = [len(line) for _, line in zip(range(100), f)]
+        chunk_bytes = max(1, int(sum(sample) / len(sample) * self.chunk_size))
+        return [(start, min(start + chunk_bytes, size)) for start in range(0, size, chunk_bytes)]
+
+    def read(self, chunk: Tuple[int, int]) -> Optional[Chunk]:
+        """Lines that start inside [start, end)"""
+        start, end = chunk
+        records = []
+        with open(self.path, "rb") as f:
+            if start > 0:
+                # The line running over `start` belongs to the previous range
+                f.seek(start - 1)
+                f.readline()
+            while f.tell() < end:
+                line = f.readline()
+                if not line:
+                    break
+                if line.strip():
+                    records.append(json.loads(line))
+        return _chunk_from_records(records) if records else None
+
+
+class NumpyTransitionSource:
+    """Transitions in an .npz file or a directory of states/actions/rewards/next_states/dones .npy arrays.
+
+    Directories are memory-mapped, so each worker only reads its own ranges;
+    a persisted ReplayBuffer directory is used up to its stored size.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 8192):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._arrays: Optional[Dict[str, np.ndarray]] = None
+
+    def _load(self) -> Dict[str, np.ndarray]:
+        if self._arrays is None:
+            if os.path.isdir(self.path):
+                arrays = {name: np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r") for name in TRANSITION_DTYPES}
+                cursor_path = os.path.join(self.path, "cursor.npy")
+                if os.path.exists(cursor_path):
+                    size = int(np.load(cursor_path)[1])
+                    arrays = {name: array[:size] for name, array in arrays.items()}
+            else:
+                with np.load(self.path) as data:
+                    arrays = {name: data[name] for name in TRANSITION_DTYPES}
+            self._arrays = arrays
+        return self._arrays
+
+    def chunks(self) -> List[Tuple[int, int]]:
+        count = len(self._load()["states"])
+        return [(start, min(start + self.chunk_size, count)) for start in range(0, count, self.chunk_size)]
+
+    def read(self, chunk: Tuple[int, int]) -> Chunk:
+        start, end = chunk
+        # Copied out of the read-only mapping; the tensors built from it are handed to the trainer
+        return {name: np.array(array[start:end], dtype=TRANSITION_DTYPES[name]) for name, array in self._load().items()}
+
+    def __getstate__(self):
+        # Workers map the files themselves rather than receiving copies
+        return {**self.__dict__, "_arrays": None}
+
+
+class MongoTransitionSource:
+    """Transitions stored as documents in a MongoDB collection, read in _id order"""
+
+    def __init__(self, collection: str = None, chunk_size: int = 8192, mongodb_url: str = None, mongodb_db: str = None):
+        self.collection_name = collection or settings.rl_transition_collection
+        self.chunk_size = chunk_size
+        self.mongodb_url = mongodb_url or settings.mongodb_url
+        self.mongodb_db = mongodb_db or settings.mongodb_db
+        self._collection = None
+        self._pid = None
+
+    def _get_collection(self):
+        # One synchronous client per process; a client must not be shared across fork
+        if self._collection is None or self._pid != os.getpid():
+            from pymongo import MongoClient
+            self._collection = MongoClient(self.mongodb_url)[self.mongodb_db][self.collection_name]
+            self._pid = os.getpid()
+        return self._collection
+
+    def chunks(self) -> List[Tuple[int, int]]:
+        count = self._get_collection().count_documents({})
+        return [(start, min(self.chunk_size, count - start)) for start in range(0, count, self.chunk_size)]
+
+    def read(self, chunk: Tuple[int, int]) -> Optional[Chunk]:
+        skip, limit = chunk
+        fields = {"state": 1, "action": 1, "reward": 1, "next_state": 1, "done": 1, "_id": 0}
+        records = list(self._get_collection().find({}, fields).sort("_id", 1).skip(skip).limit(limit))
+        return _chunk_from_records(records) if records else None
+
+    def __getstate__(self):
+        return {**self.__dict__, "_collection": None, "_pid": None}
+
+
+class TransitionDataset(IterableDataset):
+    """Chunks of a source as tensors; DataLoader workers each read every num_workers-th chunk"""
+
+    def __init__(self, source, shuffle: bool = True, seed: int = 0):
+        self.source = source
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+        self.chunk_specs = source.chunks()
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+
+    def __iter__(self) -> Iterator[Dict[str, torch.Tensor]]:
+        specs = list(self.chunk_specs)
+        if self.shuffle:
+            # Same order in every worker, so the shards stay disjoint
+            np.random.default_rng(self.seed + self.epoch).shuffle(specs)
+        worker = get_worker_info()
+        if worker is not None:
+            specs = specs[worker.id::worker.num_workers]
+        for spec in specs:
+            chunk = self.source.read(spec)
+            if chunk is not None and len(chunk["states"]):
+                yield {name: torch.from_numpy(array) for name, array in chunk.items()}
+
+
+def train_offline(agent, source, epochs: int = 1, batch_size: int = 1024, num_workers: int = 2, prefetch_factor: int = 4,
+                  shuffle: bool = True, seed: int = 0, log_every_seconds: float = 10.0) -> Dict[str, Any]:
+    """Train `agent` (an AdaptiveQNetwork) on every transition of `source` for `epochs` passes"""
+    dataset = TransitionDataset(source, shuffle=shuffle, seed=seed)
+    loader = DataLoader(dataset, batch_size=None, num_workers=num_workers,
+                        prefetch_factor=prefetch_factor if num_workers > 0 else None)
+    generator = torch.Generator().manual_seed(seed)
+    agent.q_network.train()
+    samples = 0
+    steps = 0
+    last_loss = None
+    started = time.perf_counter()
+    last_log = started
+    for epoch in range(epochs):
+        dataset.set_epoch(epoch)
+        for chunk in loader:
+            count = len(chunk["states"])
+            order = torch.randperm(count, generator=generator) if shuffle else torch.arange(count)
+            for start in range(0, count, batch_size):
+                indices = order[start:start + batch_size]
+                last_loss = agent.train_on_batch(tuple(chunk[name][indices] for name in TRANSITION_DTYPES))
+                steps += 1
+            samples += count
+            now = time.perf_counter()
+            if now - last_log >= log_every_seconds:
+                print(f"epoch {epoch + 1}/{epochs}: {samples} samples, {samples / (now - started):.0f} samples/s, loss {last_loss:.5f}")
+                last_log = now
+    elapsed = time.perf_counter() - started
+    agent.publish_policy()
+    return {
+        "samples": samples,
+        "steps": steps,
+        "seconds": round(elapsed, 2),
+        "samplesPerSecond": round(samples / elapsed, 1) if elapsed > 0 else 0.0,
+        "lastLoss": round(last_loss, 5) if last_loss is not None else None
+    }
+
+
+def create_transition_source(args) -> Any:
+    if args.ndjson:
+        return NDJSONTransitionSource(args.ndjson, chunk_size=args.chunk_size)
+    if args.numpy:
+        return NumpyTransitionSource(args.numpy, chunk_size=args.chunk_size)
+    return MongoTransitionSource(args.mongo_collection, chunk_size=args.chunk_size)
+
+
+def main(argv: List[str] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Train the adaptive policy offline on logged transitions")
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--ndjson", help="NDJSON transition log")
+    source_group.add_argument("--numpy", help=".npz file or directory of .npy arrays (e.g. a persisted replay buffer)")
+    source_group.add_argument("--mongo-collection", help="MongoDB collection of transition documents")
+    parser.add_argument("--action-size", type=int, default=7)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--chunk-size", type=int, default=8192, help="transitions read per worker task")
+    parser.add_argument("--workers", type=int, default=2, help="DataLoader worker processes (0 reads in the main process)")
+    parser.add_argument("--prefetch", type=int, default=4, help="chunks each worker reads ahead")
+    parser.add_argument("--learning-rate", type=float, default=settings.learning_rate)
+    parser.add_argument("--target-update", type=int, default=100, help="optimizer steps between target network syncs")
+    parser.add_argument("--epsilon", type=float, default=settings.epsilon_end, help="exploration rate stored in the checkpoint")
+    parser.add_argument("--resume", action="store_true", help="start from the API's current checkpoint")
+    parser.add_argument("--checkpoint-backend", choices=["file", "mongo"],
+                        default="mongo" if settings.checkpoint_backend == "mongo" else "file")
+    parser.add_argument("--export-policy", help="also write the weights for torch-free serving to this .npz path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from src.rl.adaptive_q_network import AdaptiveQNetwork
+    from src.rl.checkpoint_manager import create_checkpoint_manager
+
+    torch.manual_seed(args.seed)
+    source = create_transition_source(args)
+    sample_chunk = next((chunk for chunk in (source.read(spec) for spec in source.chunks()[:1]) if chunk is not None), None)
+    if sample_chunk is None:
+        raise SystemExit("No transitions to train on")
+    state_size = sample_chunk["states"].shape[1]
+    agent = AdaptiveQNetwork(state_size=state_size, action_size=args.action_size, learning_rate=args.learning_rate,
+                             replay_buffer_size=1, batch_size=args.batch_size, target_update_frequency=args.target_update)
+    manager = create_checkpoint_manager(agent, name=args.checkpoint_backend)
+
+    async def resume_train_and_save() -> Dict[str, Any]:
+        # One event loop for every checkpoint call: a Motor client stays bound to the loop it first ran on
+        if args.resume:
+            version = await manager.load_latest()
+            print(f"Resuming from checkpoint v{version}" if version is not None else "No checkpoint to resume from, starting fresh")
+        result = train_offline(agent, source, epochs=args.epochs, batch_size=args.batch_size, num_workers=args.workers,
+                               prefetch_factor=args.prefetch, seed=args.seed)
+        agent.epsilon = args.epsilon
+        result["checkpointVersion"] = await manager.save(force=True)
+        return result
+
+    result = asyncio.run(resume_train_and_save())
+    if args.export_policy:
+        agent.export_policy(args.export_policy)
+    print(f"Trained on {result['samples']} transitions in {result['seconds']}s ({result['samplesPerSecond']:.0f} samples/s), "
+          f"loss {result['lastLoss']}; saved checkpoint v{result['checkpointVersion']}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+from typing import Optional, Tuple
+import numpy as np
+import torch
+from src.config import settings
+from src.rl.replay_buffer import ReplayBatch, ReplayBuffer
+
+
+class SumTree:
+    """Binary tree of priority sums stored in one flat array.
+
+    Leaves start at `leaf_offset` (capacity rounded up to a power of two) and
+    node i holds the sum of nodes 2i and 2i+1, so the root tree[1] is the total
+    priority. Updates and proportional lookups walk one root-to-leaf path,
+    O(log n), and both are vectorized over a whole batch of indices.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.leaf_offset = 1
+        while self.leaf_offset < capacity:
+            self.leaf_offset *= 2
+        self.depth = self.leaf_offset.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaf_offset, dtype=np.float64)
+        # children[i] is the view (tree[2i], tree[2i+1])
+        self.children = self.tree.reshape(-1, 2)
+
+    @property
+    def total(self) -> float:
+        return float(self.tree[1])
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        return self.tree[self.leaf_offset + np.asarray(indices)]
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray) -> None:
+        nodes = self.leaf_offset + np.asarray(indices, dtype=np.int64)
+        self.tree[nodes] = priorities
+        # Repeated parents are recomputed from the same finished children, so duplicates are harmless
+        for _ in range(self.depth):
+            nodes //= 2
+            self.tree[nodes] = self.children[nodes].sum(axis=1)
+
+    def set(self, index: int, priority: float) -> None:
+        """Scalar update() for a single insert, without array overhead"""
+        tree = self.tree
+        node = self.leaf_offset + index
+        tree[node] = priority
+        node //= 2
+        while node:
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+            node //= 2
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """Leaf index whose cumulative priority range contains each value in [0, total)"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left_sums = self.children[nodes, 0]
+            go_right = values >= left_sums
+            values -= left_sums * go_right
+            nodes = 2 * nodes + go_right
+        return nodes - self.leaf_offset
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """ReplayBuffer that samples experiences in proportion to their TD error.
+
+    Sampling probability is p_i^alpha / sum(p^alpha) with p_i = |TD error| +
+    epsilon, drawn stratified over the sum tree. New experiences get the
+    highest priority seen so far so each is replayed at least once soon after
+    it arrives. importance_weights() corrects the resulting bias with
+    (N * P(i))^-beta, normalized by the batch maximum, and beta is annealed to
+    1 over `beta_steps` samples. Priorities live in memory only: a
+    memory-mapped buffer reopened after a restart starts all stored
+    experiences at priority 1.
+    """
+
+    def __init__(self, capacity: int, state_size: int, path: Optional[str] = None, seed: Optional[int] = None,
+                 alpha: float = None, beta: float = None, beta_steps: int = None, epsilon: float = None):
+        super().__init__(capacity, state_size, path=path, seed=seed)
+        self.alpha = alpha if alpha is not None else settings.priority_alpha
+        self.beta_start = beta if beta is not None else settings.priority_beta
+        self.beta_steps = beta_steps if beta_steps is not None else settings.priority_beta_steps
+        self.epsilon = epsilon if epsilon is not None else settings.priority_epsilon
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.samples = 0
+        if len(self):
+            self.tree.update(np.arange(len(self)), np.full(len(self), self.max_priority ** self.alpha))
+
+    @property
+    def beta(self) -> float:
+        progress = min(1.0, self.samples / self.beta_steps) if self.beta_steps else 1.0
+        return self.beta_start + (1.0 - self.beta_start) * progress
+
+    def add(self, experience: Tuple) -> None:
+        position = self.position
+        super().add(experience)
+        self.tree.set(position, self.max_priority ** self.alpha)
+
+    push = add
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        """One draw from each of `batch_size` equal slices of the total priority"""
+        self.samples += 1
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        # Float rounding can walk past the last stored leaf when values sit at the very top of the range
+        return np.minimum(self.tree.find(values), len(self) - 1)
+
+    def importance_weights(self, indices: np.ndarray) -> torch.Tensor:
+        probabilities = self.tree.get(indices) / self.tree.total
+        weights = (len(self) * probabilities) ** -self.beta
+        weights /= weights.max()
+        return torch.from_numpy(weights.astype(np.float32))
+
+    def sample_with_weights(self, batch_size: int) -> Tuple[np.ndarray, ReplayBatch, torch.Tensor]:
+        indices = self.sample_indices(batch_size)
+        return indices, self.get(indices), self.importance_weights(indices)
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray) -> None:
+        """Set priorities from the absolute TD errors of a trained batch"""
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        # A batch can hold the same index twice; the tree keeps the last value written
+        self.tree.update(indices, priorities ** self.alpha)
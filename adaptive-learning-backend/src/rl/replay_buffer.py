@@ -1,18 +1,108 @@
+import json
+import os
+from typing import Optional, Tuple
+import numpy as np
+import torch
+
+ReplayBatch = Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]
+
+_FIELDS = {
+    "states": np.float32,
+    "actions": np.int64,
+    "rewards": np.float32,
+    "next_states": np.float32,
+    "dones": np.float32
+}
+
+
 class ReplayBuffer:
-    def __init__(self, capacity):
+    """Experience replay in preallocated contiguous arrays, used as a ring.
+
+    Inserting overwrites the oldest slot in O(1). Sampling draws indices with
+    replacement and gathers them into preallocated batch arrays, which are
+    returned as tensors sharing their memory (torch.from_numpy), so a sample
+    allocates nothing. Those tensors are overwritten by the next sample.
+
+    With `path`, the arrays are memory-mapped .npy files in that directory and
+    the buffer survives restarts; a directory written with another capacity or
+    state size is replaced.
+    """
+
+    def __init__(self, capacity: int, state_size: int, path: Optional[str] = None, seed: Optional[int] = None):
         self.capacity = capacity
-        self.buffer = []
-        self.position = 0
+        self.state_size = state_size
+        self.path = path
+        self.rng = np.random.default_rng(seed)
+        shapes = {"states": (capacity, state_size), "next_states": (capacity, state_size)}
+        if path is None:
+            self._arrays = {name: np.zeros(shapes.get(name, (capacity,)), dtype=dtype) for name, dtype in _FIELDS.items()}
+            # [position, size]
+            self._cursor = np.zeros(2, dtype=np.int64)
+        else:
+            os.makedirs(path, exist_ok=True)
+            reuse = self._layout_matches()
+            mode = "r+" if reuse else "w+"
+            self._arrays = {
+                name: np.lib.format.open_memmap(os.path.join(path, f"{name}.npy"), mode=mode, dtype=dtype, shape=None if reuse else shapes.get(name, (capacity,)))
+                for name, dtype in _FIELDS.items()
+            }
+            self._cursor = np.lib.format.open_memmap(os.path.join(path, "cursor.npy"), mode=mode, dtype=np.int64, shape=None if reuse else (2,))
+            with open(os.path.join(path, "layout.json"), "w") as f:
+                json.dump({"capacity": capacity, "stateSize": state_size}, f)
+        self._batch_size = 0
+        self._batch = {}
+
+    def _layout_matches(self) -> bool:
+        try:
+            with open(os.path.join(self.path, "layout.json")) as f:
+                layout = json.load(f)
+        except (OSError, ValueError):
+            return False
+        files_exist = all(os.path.exists(os.path.join(self.path, f"{name}.npy")) for name in list(_FIELDS) + ["cursor"])
+        return files_exist and layout == {"capacity": self.capacity, "stateSize": self.state_size}
+
+    @property
+    def position(self) -> int:
+        return int(self._cursor[0])
+
+    def add(self, experience: Tuple) -> None:
+        """Store a (state, action, reward, next_state, done) experience"""
+        state, action, reward, next_state, done = experience
+        position = int(self._cursor[0])
+        self._arrays["states"][position] = state
+        self._arrays["actions"][position] = action
+        self._arrays["rewards"][position] = reward
+        self._arrays["next_states"][position] = next_state
+        self._arrays["dones"][position] = done
+        self._cursor[0] = (position + 1) % self.capacity
+        self._cursor[1] = min(int(self._cursor[1]) + 1, self.capacity)
+
+    # Name used by the earlier list-based buffer
+    push = add
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        return self.rng.integers(0, len(self), size=batch_size)
+
+    def get(self, indices: np.ndarray) -> ReplayBatch:
+        """(states, actions, rewards, next_states, dones) tensors for `indices`, valid until the next call"""
+        if len(indices) != self._batch_size:
+            self._batch_size = len(indices)
+            self._batch = {name: np.empty((self._batch_size,) + array.shape[1:], dtype=array.dtype) for name, array in self._arrays.items()}
+        for name, array in self._arrays.items():
+            np.take(array, indices, axis=0, out=self._batch[name])
+        return tuple(torch.from_numpy(self._batch[name]) for name in _FIELDS)
+
+    def sample(self, batch_size: int) -> ReplayBatch:
+        return self.get(self.sample_indices(batch_size))
 
-    def push(self, experience):
-        if len(self.buffer) < self.capacity:
-            self.buffer.append(None)  # Placeholder for the experience
-        self.buffer[self.position] = experience
-        self.position = (self.position + 1) % self.capacity
+    def flush(self) -> None:
+        """Write a memory-mapped buffer to disk (no-op in memory)"""
+        if self.path is not None:
+            for array in list(self._arrays.values()) + [self._cursor]:
+                array.flush()
 
-    def sample(self, batch_size):
-        import random
-        return random.sample(self.buffer, batch_size)
+    def size(self) -> int:
+        return int(self._cursor[1])
 
-    def __len__(self):
-        return len(self.buffer)
\ No newline at end of file
+    def __len__(self) -> int:
+        return int(self._cursor[1])
@@ -0,0 +1,312 @@
+"""One policy shared by every uvicorn worker process.
+
+One worker wins the trainer role (claim_trainer_role, an exclusive flock).
+It owns the torch agent and, through SharedPolicyPublisher, mirrors each
+published policy into a memory-mapped segment. It also receives the other
+workers' experiences over a Unix datagram socket. Every other worker maps
+the segment read-only as a SharedPolicy, so there is no copy per process.
+Those workers never import torch (the app only imports it when building a
+trainer agent), and their experiences are sent to the trainer with
+ExperienceSender.
+
+Segment layout (little-endian, at `path`):
+    int64 header[16]: magic, format, layer count, policy version, active
+                      slot, slot 0 generation, slot 1 generation, slot bytes,
+                      epsilon (as float64 bits)
+    int64 shapes[64]: (in, out) of each layer
+    two slots:        float32 weights (in, out) then bias (out), per layer
+
+The trainer writes the inactive slot and then flips `active slot`, so a new
+version appears atomically. Each slot's generation is odd while it is being
+written. A reader retries a forward pass whose slot generation changed
+under it, the way a seqlock works.
+"""
+import asyncio
+import fcntl
+import os
+import random
+import socket
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from src.rl.numpy_policy import NumpyPolicy, linear_layer_arrays
+
+SEGMENT_MAGIC = 0x51504F4C  # "QPOL"
+SEGMENT_FORMAT_VERSION = 1
+HEADER_SLOTS = 16
+MAX_LAYERS = 32
+SLOTS_OFFSET = (HEADER_SLOTS + 2 * MAX_LAYERS) * 8
+
+MAGIC, FORMAT, LAYER_COUNT, VERSION, ACTIVE_SLOT, GENERATION_0, GENERATION_1, SLOT_BYTES, EPSILON = range(9)
+
+# Lock files held for the life of the process, by segment path, once this worker becomes the trainer
+_trainer_locks: Dict[str, Any] = {}
+
+
+def claim_trainer_role(path: str) -> bool:
+    """True for exactly one process per segment path; the others serve from the segment"""
+    if path in _trainer_locks:
+        return True
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    lock_file = open(f"{path}.lock", "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _trainer_locks[path] = lock_file
+    return True
+
+
+def _slot_layout(shapes: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Byte offset within a slot of each layer's weight and bias"""
+    offsets, offset = [], 0
+    for fan_in, fan_out in shapes:
+        offsets.append((offset, offset + fan_in * fan_out * 4))
+        offset += (fan_in * fan_out + fan_out) * 4
+    return offsets
+
+
+def _slot_bytes(shapes: List[Tuple[int, int]]) -> int:
+    return sum((fan_in * fan_out + fan_out) * 4 for fan_in, fan_out in shapes)
+
+
+class SharedPolicyWriter:
+    """Trainer side of the segment: publish() copies a policy into the inactive slot and flips to it"""
+
+    def __init__(self, path: str, shapes: List[Tuple[int, int]]):
+        if len(shapes) > MAX_LAYERS:
+            raise ValueError(f"A shared policy holds at most {MAX_LAYERS} layers")
+        self.path = path
+        self.shapes = [(int(fan_in), int(fan_out)) for fan_in, fan_out in shapes]
+        self.slot_bytes = _slot_bytes(self.shapes)
+        size = SLOTS_OFFSET + 2 * self.slot_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Resized in place rather than replaced, so readers that mapped it earlier stay attached
+        with open(path, "a+b") as f:
+            f.truncate(size)
+        self._segment = np.memmap(path, dtype=np.uint8, mode="r+", shape=(size,))
+        self._header = self._segment[:HEADER_SLOTS * 8].view(np.int64)
+        self._epsilon = self._header[EPSILON:EPSILON + 1].view(np.float64)
+        self._header[MAGIC] = 0
+        self._segment[HEADER_SLOTS * 8:SLOTS_OFFSET].view(np.int64)[:2 * len(self.shapes)] = np.array(self.shapes).ravel()
+        self._header[FORMAT] = SEGMENT_FORMAT_VERSION
+        self._header[LAYER_COUNT] = len(self.shapes)
+        self._header[SLOT_BYTES] = self.slot_bytes
+        self._header[VERSION] = 0
+        self._header[ACTIVE_SLOT] = 0
+        self._header[GENERATION_0] = 0
+        self._header[GENERATION_1] = 0
+        self.publishes = 0
+
+    def publish(self, layers: List[Tuple[np.ndarray, np.ndarray]], version: int, epsilon: float) -> None:
+        slot = 1 - int(self._header[ACTIVE_SLOT]) if self._header[MAGIC] == SEGMENT_MAGIC else 0
+        generation = GENERATION_0 + slot
+        self._header[generation] += 1
+        base = SLOTS_OFFSET + slot * self.slot_bytes
+        for (fan_in, fan_out), (weight_offset, bias_offset), (weight, bias) in zip(self.shapes, _slot_layout(self.shapes), layers):
+            self._segment[base + weight_offset:base + bias_offset].view(np.float32)[:] = np.asarray(weight, dtype=np.float32).ravel()
+            self._segment[base + bias_offset:base + bias_offset + fan_out * 4].view(np.float32)[:] = bias
+        self._header[generation] += 1
+        self._epsilon[0] = epsilon
+        self._header[ACTIVE_SLOT] = slot
+        self._header[VERSION] = version
+        # Set last, so a reader never attaches to a half-initialized segment
+        self._header[MAGIC] = SEGMENT_MAGIC
+        self.publishes += 1
+
+    def publish_agent(self, agent) -> None:
+        """AdaptiveQNetwork publish hook"""
+        self.publish(linear_layer_arrays(agent.policy_network), agent.policy_version, agent.epsilon)
+
+
+class SharedPolicy(NumpyPolicy):
+    """NumpyPolicy whose layers are read-only views of the segment, following each new version.
+
+    Until the trainer has written the segment, every action is exploratory.
+    """
+
+    def __init__(self, path: str, state_size: int, action_size: int):
+        self.path = path
+        self.layers = []
+        self.state_size = state_size
+        self.action_size = action_size
+        self.policy_version = 0
+        self._segment: Optional[np.memmap] = None
+        self._header: Optional[np.ndarray] = None
+        self._slot = 0
+        self.swaps = 0
+        self.retries = 0
+
+    def _attach(self) -> bool:
+        if self._segment is not None:
+            return True
+        try:
+            segment = np.memmap(self.path, dtype=np.uint8, mode="r")
+        except (OSError, ValueError):
+            return False
+        header = segment[:HEADER_SLOTS * 8].view(np.int64)
+        if len(segment) < SLOTS_OFFSET or header[MAGIC] != SEGMENT_MAGIC or header[FORMAT] != SEGMENT_FORMAT_VERSION:
+            return False
+        self._segment, self._header = segment, header
+        return True
+
+    def _refresh(self) -> None:
+        """Point the layers at the active slot"""
+        header = self._header
+        count = int(header[LAYER_COUNT])
+        shapes = self._segment[HEADER_SLOTS * 8:SLOTS_OFFSET].view(np.int64)[:2 * count].reshape(count, 2).tolist()
+        self._slot = int(header[ACTIVE_SLOT])
+        base = SLOTS_OFFSET + self._slot * int(header[SLOT_BYTES])
+        layers = []
+        for (fan_in, fan_out), (weight_offset, bias_offset) in zip(shapes, _slot_layout(shapes)):
+            weight = self._segment[base + weight_offset:base + bias_offset].view(np.float32).reshape(fan_in, fan_out)
+            bias = self._segment[base + bias_offset:base + bias_offset + fan_out * 4].view(np.float32)
+            layers.append((weight, bias))
+        if (shapes[0][0], shapes[-1][1]) != (self.state_size, self.action_size):
+            raise ValueError(f"Shared policy {self.path} is {shapes[0][0]}x{shapes[-1][1]}, expected {self.state_size}x{self.action_size}")
+        self.layers = layers
+        self.policy_version = int(header[VERSION])
+        self.swaps += 1
+
+    @property
+    def epsilon(self) -> float:
+        """The trainer's epsilon, so every worker explores at the same rate"""
+        if not self._attach():
+            return 1.0
+        return float(self._header[EPSILON:EPSILON + 1].view(np.float64)[0])
+
+    def q_values(self, states: np.ndarray) -> np.ndarray:
+        if not self._attach():
+            raise RuntimeError(f"Shared policy segment {self.path} is not initialized yet")
+        header = self._header
+        while True:
+            if header[VERSION] != self.policy_version or not self.layers:
+                self._refresh()
+            generation = header[GENERATION_0 + self._slot]
+            if generation % 2 == 0:
+                q_values = NumpyPolicy.q_values(self, states)
+                if header[GENERATION_0 + self._slot] == generation:
+                    return q_values
+            # The trainer is rewriting the slot these views point at
+            self.retries += 1
+            self.layers = []
+
+    def predict_actions(self, states: np.ndarray) -> List[int]:
+        if not self._attach():
+            return [random.randrange(self.action_size) for _ in range(len(states))]
+        return NumpyPolicy.predict_actions(self, states)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"attached": self._segment is not None, "policyVersion": self.policy_version, "swaps": self.swaps, "retries": self.retries}
+
+
+def _encode(experience: Tuple) -> bytes:
+    state, action, reward, next_state, done = experience
+    return np.concatenate(([action, reward, float(done)], np.asarray(state, dtype=np.float32), np.asarray(next_state, dtype=np.float32))).astype(np.float32).tobytes()
+
+
+def _decode(data: bytes) -> Tuple:
+    values = np.frombuffer(data, dtype=np.float32)
+    state_size = (len(values) - 3) // 2
+    return (values[3:3 + state_size].copy(), int(values[0]), float(values[1]), values[3 + state_size:].copy(), bool(values[2]))
+
+
+class ExperienceSender:
+    """Serving-worker side of the experience channel, with the submit()/stats() of BackgroundTrainer.
+
+    Sends never block: if the trainer is not listening or its socket buffer
+    is full, the experience is dropped and counted.
+    """
+
+    def __init__(self, path: str, policy: SharedPolicy = None):
+        self.address = f"{path}.sock"
+        self.policy = policy
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self.submitted = 0
+        self.dropped = 0
+
+    def submit(self, experience: Tuple) -> bool:
+        try:
+            self._socket.sendto(_encode(experience), self.address)
+        except OSError:
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        return True
+
+    def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        self._socket.close()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"role": "server", "submitted": self.submitted, "dropped": self.dropped}
+        if self.policy is not None:
+            stats["policy"] = self.policy.stats()
+        return stats
+
+
+class SharedPolicyPublisher:
+    """Trainer side: mirrors every published policy to the segment and feeds remote experiences to the trainer"""
+
+    def __init__(self, path: str, agent, trainer):
+        self.path = path
+        self.agent = agent
+        self.trainer = trainer
+        self.writer = SharedPolicyWriter(path, [weight.shape for weight, _ in linear_layer_arrays(agent.policy_network)])
+        self.writer.publish_agent(agent)
+        agent.publish_hooks.append(self.writer.publish_agent)
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.received = 0
+
+    def _receive(self) -> None:
+        while not self._stop.is_set():
+            try:
+                data = self._socket.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.received += 1
+            self.trainer.submit(_decode(data))
+
+    def start(self) -> None:
+        """Listen for the serving workers' experiences"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        address = f"{self.path}.sock"
+        # Left behind by a previous trainer; this process holds the trainer lock now
+        if os.path.exists(address):
+            os.remove(address)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(address)
+        self._socket.settimeout(0.5)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._receive, name="rl-experience-receiver", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            await asyncio.to_thread(self._thread.join, 1.0)
+            self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "role": "trainer",
+            "policyVersion": self.agent.policy_version,
+            "publishes": self.writer.publishes,
+            "experiencesReceived": self.received
+        }
@@ -1,9 +1,90 @@
-from typing import List
+from typing import Any, List, Optional, Sequence
 import numpy as np
 
+STUDENT_FEATURES = 10
+QUESTION_FEATURES = 10
+DIFFICULTY_SCORES = {"easy": 1.0, "medium": 0.5}
+
+
+def _field(source: Any, name: str, default: Any) -> Any:
+    """`name` from a request dict or a LearningState/QuestionData model; `default` when missing or None"""
+    value = source.get(name) if isinstance(source, dict) else getattr(source, name, None)
+    return default if value is None else value
+
+
 class StateBuilder:
-    def __init__(self, max_length: int):
+    """Turns a student's LearningState and the current QuestionData into the Q-network's state vector.
+
+    extract_features() writes the raw features of N (state, question) pairs
+    into rows of a preallocated (N, 20) float32 array, and normalize()
+    standardizes each row in place; build_batch() does both, reusing the
+    same array (valid until the next call) unless given `out`. build_state()
+    is the single-request form and returns its own copy.
+    """
+
+    def __init__(self, max_length: int, seed: Optional[int] = None):
         self.max_length = max_length
+        self.rng = np.random.default_rng(seed)
+        self._batch = np.empty((0, max_length), dtype=np.float32)
+
+    # Features 9 and 13 are uniform noise, kept so the layout matches existing checkpoints and transition logs
+    def _student_row(self, state: Any, noise: float) -> List[float]:
+        recent = _field(state, "recentPerformance", [])
+        return [
+            _field(state, "classLevel", 5) / 12.0,
+            _field(state, "consecutiveCorrect", 0) / 10.0,
+            _field(state, "consecutiveWrong", 0) / 10.0,
+            1.0 if _field(state, "isInAdaptiveMode", False) else 0.0,
+            len(recent) / 10.0,
+            sum(recent) / max(len(recent), 1),
+            _field(state, "timeSpent", 0) / 300.0,  # Normalize to 5 min
+            _field(state, "hintsUsed", 0) / 5.0,
+            DIFFICULTY_SCORES.get(_field(state, "currentDifficulty", None), 0.0),
+            noise
+        ]
+
+    def _question_row(self, question: Any, noise: float) -> List[float]:
+        return [
+            DIFFICULTY_SCORES.get(_field(question, "difficulty", None), 0.0),
+            len(_field(question, "options", [])) / 4.0,
+            len(_field(question, "conceptTags", [])) / 5.0,
+            noise,
+            0.5, 0.5, 0.5, 0.5, 0.5, 0.5  # Padding
+        ]
+
+    def extract_features(self, states: Sequence[Any], questions: Sequence[Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Raw (N, 20) features of each (state, question) pair"""
+        count = len(states)
+        if out is None:
+            if len(self._batch) < count:
+                self._batch = np.empty((count, self.max_length), dtype=np.float32)
+            out = self._batch
+        out = out[:count]
+        width = min(self.max_length, STUDENT_FEATURES + QUESTION_FEATURES)
+        noise = self.rng.random((count, 2)).tolist()
+        rows = [(self._student_row(state, student_noise) + self._question_row(question, question_noise))[:width]
+                for state, question, (student_noise, question_noise) in zip(states, questions, noise)]
+        out[:, :width] = rows
+        if width < self.max_length:
+            out[:, width:] = 0.0
+        return out
+
+    def normalize(self, batch: np.ndarray) -> np.ndarray:
+        """Standardize each row in place over its features (not the padding), as build_state_vector does"""
+        width = min(self.max_length, STUDENT_FEATURES + QUESTION_FEATURES)
+        features = batch[:, :width]
+        # Reductions spelled out; ndarray.mean/std add several microseconds of overhead per call
+        features -= (np.add.reduce(features, axis=1) / width)[:, None]
+        std = np.sqrt(np.einsum("ij,ij->i", features, features) / width)
+        std += 1e-8
+        features /= std[:, None]
+        return batch
+
+    def build_batch(self, states: Sequence[Any], questions: Sequence[Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        return self.normalize(self.extract_features(states, questions, out))
+
+    def build_state(self, state: Any, question: Any) -> np.ndarray:
+        return self.build_batch([state], [question])[0].copy()
 
     def build_state_vector(self, student_features: List[float], question_features: List[float]) -> np.ndarray:
         state_vector = np.concatenate((student_features, question_features))
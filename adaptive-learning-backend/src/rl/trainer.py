@@ -1,11 +1,10 @@
-from typing import Tuple, List
 import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from collections import deque
 import random
 import os
+from src.rl.replay_buffer import ReplayBuffer
 
 class QNetwork(nn.Module):
     def __init__(self, input_dim: int, output_dim: int):
@@ -25,25 +24,12 @@ class QNetwork(nn.Module):
         x = self.relu(self.fc3(x))
         return self.output(x)
 
-class ReplayBuffer:
-    def __init__(self, max_size: int):
-        self.buffer = deque(maxlen=max_size)
-
-    def add(self, experience: Tuple):
-        self.buffer.append(experience)
-
-    def sample(self, batch_size: int) -> List[Tuple]:
-        return random.sample(self.buffer, batch_size)
-
-    def size(self) -> int:
-        return len(self.buffer)
-
 class AdaptiveQNetwork:
     def __init__(self, input_dim: int, output_dim: int, learning_rate: float):
         self.q_network = QNetwork(input_dim, output_dim)
         self.target_network = QNetwork(input_dim, output_dim)
         self.optimizer = optim.Adam(self.q_network.parameters(), lr=learning_rate)
-        self.replay_buffer = ReplayBuffer(max_size=10000)
+        self.replay_buffer = ReplayBuffer(10000, input_dim)
         self.epsilon = 1.0
         self.epsilon_decay = 0.995
         self.epsilon_min = 0.01
@@ -63,16 +49,9 @@ class AdaptiveQNetwork:
         if self.replay_buffer.size() < self.batch_size:
             return
 
-        batch = self.replay_buffer.sample(self.batch_size)
-        states, actions, rewards, next_states, dones = zip(*batch)
-
-        states_tensor = torch.FloatTensor(states)
-        actions_tensor = torch.LongTensor(actions).unsqueeze(1)
-        rewards_tensor = torch.FloatTensor(rewards)
-        next_states_tensor = torch.FloatTensor(next_states)
-        dones_tensor = torch.FloatTensor(dones)
+        states_tensor, actions_tensor, rewards_tensor, next_states_tensor, dones_tensor = self.replay_buffer.sample(self.batch_size)
 
-        q_values = self.q_network(states_tensor).gather(1, actions_tensor)
+        q_values = self.q_network(states_tensor).gather(1, actions_tensor.unsqueeze(1))
         next_q_values = self.target_network(next_states_tensor).max(1)[0]
         target_q_values = rewards_tensor + (self.gamma * next_q_values * (1 - dones_tensor))
 
@@ -97,6 +76,7 @@ class AdaptiveQNetwork:
             self.q_network.load_state_dict(torch.load(filepath))
             self.target_network.load_state_dict(torch.load(filepath))
 
+# Has no environment to step; to train outside live traffic, replay logged transitions with src.rl.offline_trainer
 def train_loop(agent: AdaptiveQNetwork, num_episodes: int):
     for episode in range(num_episodes):
         state = ...  # Initialize state
@@ -0,0 +1,134 @@
+import time
+from collections import deque
+from typing import Any, Dict
+from src.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Failure- and latency-aware circuit breaker for one upstream endpoint type.
+
+    Outcomes of the last `window_size` calls are kept. Once at least
+    `min_calls` are recorded, the circuit opens when the failure rate or the
+    rate of calls slower than `slow_call_seconds` reaches its threshold. While
+    open every call is rejected immediately; after `open_seconds` up to
+    `half_open_probes` calls are let through, and their outcome either closes
+    the circuit or opens it again.
+    """
+
+    def __init__(self, name: str, window_size: int = None, min_calls: int = None, failure_rate_threshold: float = None,
+                 slow_call_seconds: float = None, slow_call_rate_threshold: float = None, open_seconds: float = None,
+                 half_open_probes: int = 1, clock=time.monotonic):
+        self.name = name
+        self.window_size = window_size if window_size is not None else settings.circuit_window_size
+        self.min_calls = min_calls if min_calls is not None else settings.circuit_min_calls
+        self.failure_rate_threshold = failure_rate_threshold if failure_rate_threshold is not None else settings.circuit_failure_rate
+        self.slow_call_seconds = slow_call_seconds if slow_call_seconds is not None else settings.circuit_slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold if slow_call_rate_threshold is not None else settings.circuit_slow_call_rate
+        self.open_seconds = open_seconds if open_seconds is not None else settings.circuit_open_seconds
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+        self.state = CLOSED
+        # (failed, slow, latency) per call, newest last
+        self._window: deque = deque(maxlen=self.window_size)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.times_opened = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now; counts as a probe while half-open"""
+        if self.state == OPEN:
+            if self.clock() - self._opened_at < self.open_seconds:
+                self.short_circuited += 1
+                return False
+            print(f"🟡 Circuit '{self.name}' half-open, probing upstream")
+            self.state = HALF_OPEN
+            self._probes_in_flight = 0
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_probes:
+                self.short_circuited += 1
+                return False
+            self._probes_in_flight += 1
+        return True
+
+    def check(self) -> None:
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_in())
+
+    def record(self, failed: bool, latency: float) -> None:
+        """Record the outcome of a call that allow() let through"""
+        self.calls += 1
+        if failed:
+            self.failures += 1
+        slow = latency >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if failed or slow:
+                self._open()
+            else:
+                print(f"🟢 Circuit '{self.name}' closed after successful probe")
+                self.state = CLOSED
+                self._window.clear()
+            return
+        self._window.append((failed, slow, latency))
+        if self.state == CLOSED and len(self._window) >= self.min_calls:
+            if self.failure_rate() >= self.failure_rate_threshold or self.slow_call_rate() >= self.slow_call_rate_threshold:
+                self._open()
+
+    def release(self) -> None:
+        """Give back a half-open probe slot for a call whose outcome says nothing about upstream health"""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _open(self) -> None:
+        print(f"🔴 Circuit '{self.name}' opened (failure rate {self.failure_rate():.0%}, slow rate {self.slow_call_rate():.0%})")
+        self.state = OPEN
+        self._opened_at = self.clock()
+        self._probes_in_flight = 0
+        self.times_opened += 1
+
+    def failure_rate(self) -> float:
+        if not self._window:
+            return 0.0
+        return sum(1 for failed, _, _ in self._window if failed) / len(self._window)
+
+    def slow_call_rate(self) -> float:
+        if not self._window:
+            return 0.0
+        return sum(1 for _, slow, _ in self._window if slow) / len(self._window)
+
+    def retry_in(self) -> float:
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (self.clock() - self._opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = [latency for _, _, latency in self._window]
+        return {
+            "state": self.state,
+            "failureRate": round(self.failure_rate(), 3),
+            "slowCallRate": round(self.slow_call_rate(), 3),
+            "avgLatencySeconds": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+            "windowCalls": len(self._window),
+            "calls": self.calls,
+            "failures": self.failures,
+            "shortCircuited": self.short_circuited,
+            "timesOpened": self.times_opened,
+            "retryInSeconds": round(self.retry_in(), 1)
+        }
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from src.config import settings
+
+# How long workers back off while interactive calls are queued or the explanation circuit is not closed
+DEFER_SECONDS = 1.0
+
+# Most of the shared Gemini quota stays with interactive calls, whatever max_per_minute is configured
+MAX_QUOTA_SHARE = 0.5
+
+# (question, correct answer, student answer, concept tags) - the arguments of generate_explanation
+PrefetchArgs = Tuple[str, str, str, List[str]]
+
+
+class ExplanationPrefetcher:
+    """Speculatively generates explanations for the wrong options of served questions.
+
+    Served questions are queued as (question, wrong option) pairs keyed like
+    the explanation cache, so a student picking a wrong answer later finds the
+    explanation already cached. Prefetching runs at low priority: the newest
+    pairs go first and the oldest are dropped beyond `max_pending`, calls are
+    limited to `max_per_minute` (at most half of `gemini_rpm`), and workers back off while interactive calls
+    wait on the shared rate limiter or the explanation circuit is not closed.
+    """
+
+    def __init__(self, gemini_service, enabled: bool = None, max_pending: int = None, max_per_minute: float = None,
+                 concurrency: int = None, clock=time.monotonic):
+        self.gemini_service = gemini_service
+        self.enabled = enabled if enabled is not None else settings.explanation_prefetch_enabled
+        self.max_pending = max_pending if max_pending is not None else settings.explanation_prefetch_max_pending
+        requested_rpm = max_per_minute if max_per_minute is not None else settings.gemini_rpm * settings.explanation_prefetch_rpm_share
+        self.max_per_minute = min(requested_rpm, settings.gemini_rpm * MAX_QUOTA_SHARE)
+        self.concurrency = concurrency if concurrency is not None else settings.explanation_prefetch_concurrency
+        self.clock = clock
+        self._pending: "OrderedDict[str, PrefetchArgs]" = OrderedDict()
+        self._in_progress = 0
+        # Budget bucket holding at most one call per worker, refilled at max_per_minute
+        self._budget = float(self.concurrency)
+        self._budget_updated = clock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.queued = 0
+        self.dropped = 0
+        self.prefetched = 0
+        self.already_cached = 0
+        self.failed = 0
+        self.deferred = 0
+
+    def enqueue(self, questions: Iterable[Dict[str, Any]]) -> int:
+        """Queue every wrong option of `questions`; returns the number of pairs queued"""
+        if not self.enabled:
+            return 0
+        added = 0
+        for question in questions:
+            text = question.get("question", "")
+            options = question.get("options", [])
+            concept_tags = question.get("conceptTags", [])
+            correct_option = next((opt for opt in options if opt.get("correct")), None)
+            if not text or correct_option is None:
+                continue
+            correct_answer = correct_option.get("text", "Unknown")
+            for option in options:
+                if option is correct_option:
+                    continue
+                args = (text, correct_answer, option.get("text", "Unknown"), concept_tags)
+                key = self.gemini_service.explanation_cache_key(*args)
+                if key in self._pending or key in self.gemini_service.explanation_cache:
+                    continue
+                self._pending[key] = args
+                added += 1
+                while len(self._pending) > self.max_pending:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+        self.queued += added
+        if added and self._wakeup is not None:
+            self._wakeup.set()
+        return added
+
+    def _budget_wait(self) -> float:
+        """Seconds until a prefetch call fits in the per-minute budget (0 if it does now)"""
+        now = self.clock()
+        self._budget = min(float(self.concurrency), self._budget + (now - self._budget_updated) * self.max_per_minute / 60.0)
+        self._budget_updated = now
+        if self._budget >= 1:
+            return 0.0
+        return (1 - self._budget) * 60.0 / self.max_per_minute
+
+    def _interactive_busy(self) -> bool:
+        """Whether prefetching now would compete with interactive calls"""
+        rate_limiter = getattr(self.gemini_service.client, "rate_limiter", None)
+        if rate_limiter is not None and rate_limiter.waiting > 0:
+            return True
+        return self.gemini_service.breakers["explanation"].state != "closed"
+
+    async def prefetch_next(self) -> bool:
+        """Prefetch the newest pending pair if the budget allows; returns False when deferred or idle"""
+        if not self._pending:
+            return False
+        if self._budget_wait() > 0 or self._interactive_busy():
+            self.deferred += 1
+            return False
+        self._budget -= 1
+        _, args = self._pending.popitem(last=True)
+        self._in_progress += 1
+        try:
+            if await self.gemini_service.prefetch_explanation(*args):
+                self.prefetched += 1
+            else:
+                self.already_cached += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"Explanation prefetch failed: {type(e).__name__}: {str(e)}")
+        finally:
+            self._in_progress -= 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if not await self.prefetch_next() and self._pending:
+                await asyncio.sleep(self._budget_wait() or DEFER_SECONDS)
+
+    def start(self) -> None:
+        """Launch the prefetch workers on the running event loop (no-op when disabled)"""
+        if not self.enabled or any(not task.done() for task in self._tasks):
+            return
+        self._wakeup = asyncio.Event()
+        if self._pending:
+            self._wakeup.set()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._wakeup = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "running": any(not task.done() for task in self._tasks),
+            "pending": len(self._pending),
+            "inProgress": self._in_progress,
+            "maxPerMinute": self.max_per_minute,
+            "queued": self.queued,
+            "dropped": self.dropped,
+            "prefetched": self.prefetched,
+            "alreadyCached": self.already_cached,
+            "failed": self.failed,
+            "deferred": self.deferred
+        }
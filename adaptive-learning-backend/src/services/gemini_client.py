@@ -0,0 +1,181 @@
+import asyncio
+import json
+import random
+import time
+from typing import AsyncIterator, Optional
+import httpx
+from src.config import settings
+from src.services.circuit_breaker import CircuitBreaker, OPEN
+from src.services.llm_backends import LLMBackend
+from src.services.rate_limiter import estimate_tokens, get_gemini_rate_limiter
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_shared_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide keep-alive connection pool, creating it on first use"""
+    global _shared_http_client
+    if _shared_http_client is None or _shared_http_client.is_closed:
+        _shared_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.gemini_timeout_seconds),
+            limits=httpx.Limits(
+                max_connections=settings.gemini_max_connections,
+                max_keepalive_connections=settings.gemini_max_keepalive_connections,
+                keepalive_expiry=settings.gemini_keepalive_expiry_seconds
+            )
+        )
+    return _shared_http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared connection pool (called on app shutdown)"""
+    global _shared_http_client
+    if _shared_http_client is not None and not _shared_http_client.is_closed:
+        await _shared_http_client.aclose()
+    _shared_http_client = None
+
+
+class GeminiClient(LLMBackend):
+    """Async transport for the Gemini generateContent REST endpoint"""
+
+    def __init__(self, url: str, max_retries: int = None, retry_base_delay: float = None, http_client: Optional[httpx.AsyncClient] = None, rate_limiter=None,
+                 retry_max_delay: float = None):
+        self.url = url
+        self.max_retries = max_retries if max_retries is not None else settings.gemini_max_retries
+        self.retry_base_delay = retry_base_delay if retry_base_delay is not None else settings.gemini_retry_base_delay
+        self.retry_max_delay = retry_max_delay if retry_max_delay is not None else settings.gemini_retry_max_delay
+        self._http_client = http_client
+        self._rate_limiter = rate_limiter
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        return self._http_client if self._http_client is not None else get_http_client()
+
+    @property
+    def rate_limiter(self):
+        return self._rate_limiter if self._rate_limiter is not None else get_gemini_rate_limiter()
+
+    async def generate_content(self, prompt: str, timeout: float = None, max_retries: int = None, breaker: Optional[CircuitBreaker] = None) -> str:
+        """Send a prompt and return the text of the first candidate.
+
+        Every attempt first takes a slot from the shared rate limiter. Retries
+        429/5xx responses and transport errors with exponential backoff without
+        blocking the event loop. With a `breaker`, each attempt is checked
+        against and recorded in it, and CircuitOpenError is raised instead of
+        calling (or waiting to retry) an upstream whose circuit is open.
+        """
+        payload = {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }]
+        }
+        attempts = max(1, max_retries if max_retries is not None else self.max_retries)
+        request_timeout = timeout if timeout is not None else settings.gemini_timeout_seconds
+        prompt_tokens = estimate_tokens(prompt)
+
+        for attempt in range(attempts):
+            if breaker is not None:
+                breaker.check()
+            recorded = False
+            try:
+                await self.rate_limiter.acquire(prompt_tokens)
+                started = time.perf_counter()
+                response = await self.http_client.post(self.url, json=payload, timeout=request_timeout)
+                response.raise_for_status()
+                result = response.json()
+                text = result['candidates'][0]['content']['parts'][0]['text'].strip()
+            except httpx.HTTPStatusError as e:
+                retryable = e.response.status_code in RETRYABLE_STATUS_CODES
+                recorded = self._record(breaker, retryable, started)
+                if not retryable or attempt == attempts - 1 or (breaker is not None and breaker.state == OPEN):
+                    raise
+                wait_time = self._backoff_delay(attempt, e.response)
+                print(f"⚠️ Gemini returned {e.response.status_code}. Waiting {wait_time:.1f}s before retry {attempt + 1}/{attempts}...")
+            except httpx.TransportError as e:
+                recorded = self._record(breaker, True, started)
+                if attempt == attempts - 1 or (breaker is not None and breaker.state == OPEN):
+                    raise
+                wait_time = self._backoff_delay(attempt)
+                print(f"⚠️ Gemini transport error ({type(e).__name__}). Waiting {wait_time:.1f}s before retry {attempt + 1}/{attempts}...")
+            else:
+                recorded = self._record(breaker, False, started)
+                return text
+            finally:
+                # Cancelled, or a malformed body: nothing was learned about availability
+                if not recorded and breaker is not None:
+                    breaker.release()
+            await asyncio.sleep(wait_time)
+
+    @staticmethod
+    def _record(breaker: Optional[CircuitBreaker], failed: bool, started: float) -> bool:
+        """Record the outcome in `breaker`; True once it holds no probe slot for this call"""
+        if breaker is not None:
+            breaker.record(failed, time.perf_counter() - started)
+        return True
+
+    @property
+    def stream_url(self) -> str:
+        """streamGenerateContent endpoint matching `url`, with server-sent events enabled"""
+        url = self.url.replace(":generateContent", ":streamGenerateContent")
+        return url + ("&" if "?" in url else "?") + "alt=sse"
+
+    async def stream_content(self, prompt: str, timeout: float = None, breaker: Optional[CircuitBreaker] = None) -> AsyncIterator[str]:
+        """Yield text fragments as Gemini streams them back.
+
+        Streams are not retried: once text has been handed to the caller a retry
+        would duplicate it, so errors propagate and the caller falls back. With a
+        `breaker`, the outcome and time to the response headers are recorded.
+        """
+        payload = {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }]
+        }
+        request_timeout = timeout if timeout is not None else settings.gemini_timeout_seconds
+        if breaker is not None:
+            breaker.check()
+        recorded = False
+        try:
+            await self.rate_limiter.acquire(estimate_tokens(prompt))
+            started = time.perf_counter()
+            async with self.http_client.stream("POST", self.stream_url, json=payload, timeout=request_timeout) as response:
+                response.raise_for_status()
+                recorded = self._record(breaker, False, started)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if not data:
+                        continue
+                    chunk = json.loads(data)
+                    for candidate in chunk.get("candidates", [])[:1]:
+                        for part in candidate.get("content", {}).get("parts", []):
+                            if part.get("text"):
+                                yield part["text"]
+        except httpx.HTTPStatusError as e:
+            if not recorded:
+                recorded = self._record(breaker, e.response.status_code in RETRYABLE_STATUS_CODES, started)
+            raise
+        except httpx.TransportError:
+            if not recorded:
+                recorded = self._record(breaker, True, started)
+            raise
+        finally:
+            # Cancelled before the headers arrived: give the probe slot back
+            if not recorded and breaker is not None:
+                breaker.release()
+
+    def _backoff_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Exponential backoff with jitter, honouring a Retry-After header when present; never above retry_max_delay"""
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(max(0.0, float(retry_after)), self.retry_max_delay)
+                except ValueError:
+                    pass
+        delay = self.retry_base_delay * (2 ** attempt)
+        return min(delay + random.uniform(0, delay * 0.1), self.retry_max_delay)
@@ -1,19 +1,48 @@
 from fastapi import HTTPException
-import requests
 from src.config import settings
-import json
 import random
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator
 from src.data.question_bank import get_fallback_question
+from src.services.llm_backends import create_llm_backend, gemini_url
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.services.question_fingerprints import dedupe_questions
+from src.services.prompt_templates import (
+    PROMPTS, GRADE_DESCRIPTIONS, DEFAULT_GRADE_DESCRIPTION, QUESTION_NAME_OPTIONS, QUESTION_OBJECT_OPTIONS,
+    BATCH_NAME_OPTIONS, BATCH_OBJECT_OPTIONS, question_template_name, render_mix_lines
+)
+from src.services.llm_output import IncrementalJSONArrayParser, extract_json_value, parse_questions, validate_question
+from src.services.response_cache import LRUTTLCache, make_cache_key
+from src.services.response_store import ResponseStore, create_response_store
+from src.services.single_flight import SingleFlight
+
+DIFFICULTY_ORDER = ["easy", "medium", "hard"]
+
+# Initial batch request plus one salvage request for elements that failed validation
+MAX_BATCH_REQUESTS = 2
 
 class GeminiService:
     def __init__(self):
         self.api_key = settings.gemini_api_key
-        # Use gemini-2.0-flash (stable, proven, good free tier)
-        self.base_url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={self.api_key}"
-        self.explanation_cache = {}  # Cache for explanations
-        self.last_request_time = 0  # Track last API call for rate limiting
+        # Use gemini-2.0-flash (stable, proven, good free tier); the base URL can point at a local stub
+        self.base_url = gemini_url(api_key=self.api_key)
+        self.client = create_llm_backend(settings.llm_backend, self.base_url)
+        # Bounded caches: explanations by normalized question, and surplus questions from oversized batch responses
+        self.explanation_cache = LRUTTLCache(
+            max_entries=settings.explanation_cache_max_entries,
+            max_bytes=settings.explanation_cache_max_bytes,
+            ttl_seconds=settings.explanation_cache_ttl_seconds
+        )
+        self.question_cache = LRUTTLCache(
+            max_entries=settings.question_cache_max_entries,
+            max_bytes=settings.question_cache_max_bytes,
+            ttl_seconds=settings.question_cache_ttl_seconds
+        )
+        self.explanation_flights = SingleFlight()
+        # Optional persistent store shared across workers and restarts (None when disabled)
+        self.response_store = create_response_store()
+        # One breaker per endpoint type, so a failing prompt shape does not block the others
+        self.breakers = {name: CircuitBreaker(name) for name in ("explanation", "question", "batch", "mix", "stream")}
 
     def get_explanation(self, question_id: str) -> dict:
         """Get explanation for a question"""
@@ -29,80 +58,23 @@ class GeminiService:
         """Generate contextual explanation using Gemini REST API"""
         try:
             # Check cache first
-            cache_key = f"{question}:{correct_answer}"
-            if cache_key in self.explanation_cache:
+            cache_key = self.explanation_cache_key(question, correct_answer, student_answer, concept_tags)
+            cached_explanation = self.explanation_cache.get(cache_key)
+            if cached_explanation is not None:
                 print(f"Using cached explanation for: {question}")
-                return self.explanation_cache[cache_key]
-            
-            concepts_str = ", ".join(concept_tags) if concept_tags else "this topic"
-            
-            prompt = f"""You are a friendly, encouraging tutor helping a student who just answered incorrectly.
-
-QUESTION: {question}
-STUDENT CHOSE: {student_answer}
-CORRECT ANSWER: {correct_answer}
-TOPIC: {concepts_str}
-
-Generate a personalized, engaging explanation that is HIGHLY RELEVANT to this specific question. Be dynamic and creative!
-
-Provide exactly this JSON format:
-{{
-    "encouragement": "Write 1 warm, specific encouragement referencing their attempt",
-    "explanation": "Write 2-3 sentences explaining WHY '{correct_answer}' is correct for THIS specific question. Be educational and clear.",
-    "example": "Give a vivid, relatable real-world example or analogy that directly relates to '{correct_answer}' and helps visualize or understand it better. Make it memorable!",
-    "tip": "Share 1 practical tip or memory trick specifically for remembering or understanding this concept"
-}}
-
-CRITICAL: Make the example HIGHLY SPECIFIC and RELEVANT to the question. No generic phrases like "Think about real-life situations" - give an ACTUAL concrete example!
-
-Example for "What do we breathe?":
-- Good: "Every time you take a breath, you're pulling in air which contains oxygen - the same oxygen that keeps a candle burning! Your body uses oxygen just like fire does, to create energy."
-- Bad: "Think about how this applies to real-life situations you encounter every day!"
-
-Now generate for the actual question above:"""
-            
-            print(f"Calling Gemini REST API for explanation...")
+                return cached_explanation
             
-            payload = {
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }]
-            }
-            
-            response = requests.post(self.base_url, json=payload, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            response_text = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            print(f"Gemini response: {response_text[:200]}...")
-            
-            # Extract JSON from response
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            
-            explanation_data = json.loads(response_text)
-            print(f"Parsed explanation successfully: {list(explanation_data.keys())}")
-            
-            # Validate that we got relevant content
-            if "real-life situations you encounter every day" in explanation_data.get("example", ""):
-                print("WARNING: Got generic example, regenerating...")
-                raise ValueError("Generic example detected")
-            
-            # Cache the result
-            self.explanation_cache[cache_key] = explanation_data
-            
-            return explanation_data
+            # Identical requests already in flight share one upstream call
+            return await self.explanation_flights.do(
+                cache_key,
+                lambda: self._request_explanation(question, correct_answer, student_answer, concept_tags, cache_key)
+            )
             
         except Exception as e:
             print(f"ERROR generating explanation with Gemini: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            if not isinstance(e, CircuitOpenError):
+                import traceback
+                traceback.print_exc()
             
             # Better fallback that's at least somewhat relevant
             concepts_str = ", ".join(concept_tags) if concept_tags else "this topic"
@@ -113,460 +85,335 @@ Now generate for the actual question above:"""
                 "tip": f"Pro tip: Focus on the key concept of {concepts_str} and how '{correct_answer}' relates to it directly."
             }
 
+    @staticmethod
+    def explanation_cache_key(question: str, correct_answer: str, student_answer: str, concept_tags: List[str]) -> str:
+        return make_cache_key("explanation", question, concept_tags, correct_answer, student_answer)
+
+    async def prefetch_explanation(self, question: str, correct_answer: str, student_answer: str, concept_tags: List[str]) -> bool:
+        """Warm the explanation cache for one answer; returns False if it was already cached.
+
+        Unlike generate_explanation, errors propagate instead of producing a fallback.
+        """
+        cache_key = self.explanation_cache_key(question, correct_answer, student_answer, concept_tags)
+        if cache_key in self.explanation_cache:
+            return False
+        await self.explanation_flights.do(
+            cache_key,
+            lambda: self._request_explanation(question, correct_answer, student_answer, concept_tags, cache_key)
+        )
+        return True
+
+    async def _request_explanation(self, question: str, correct_answer: str, student_answer: str, concept_tags: List[str], cache_key: str) -> Dict[str, str]:
+        """Call Gemini for an explanation, validate it and store it in the cache"""
+        store_key = None
+        if self.response_store is not None:
+            store_key = ResponseStore.make_key("explanation", PROMPTS.version("explanation"), cache_key)
+            stored_explanation = await self.response_store.get(store_key)
+            if stored_explanation is not None:
+                print(f"Using stored explanation for: {question}")
+                self.explanation_cache.set(cache_key, stored_explanation)
+                return stored_explanation
+        
+        concepts_str = ", ".join(concept_tags) if concept_tags else "this topic"
+        
+        prompt = PROMPTS.render(
+            "explanation",
+            question=question,
+            student_answer=student_answer,
+            correct_answer=correct_answer,
+            concepts=concepts_str
+        )
+        
+        print(f"Calling Gemini REST API for explanation...")
+        
+        response_text = await self.client.generate_content(prompt, timeout=10, max_retries=1, breaker=self.breakers["explanation"])
+        print(f"Gemini response: {response_text[:200]}...")
+        
+        explanation_data = extract_json_value(response_text, expected_type=dict)
+        print(f"Parsed explanation successfully: {list(explanation_data.keys())}")
+        
+        # Validate that we got relevant content
+        if "real-life situations you encounter every day" in explanation_data.get("example", ""):
+            print("WARNING: Got generic example, regenerating...")
+            raise ValueError("Generic example detected")
+        
+        # Cache the result
+        self.explanation_cache.set(cache_key, explanation_data)
+        if store_key is not None:
+            await self.response_store.set(store_key, explanation_data)
+        
+        return explanation_data
+
     async def generate_question(self, topic: str, difficulty: str, class_level: int = 5, subject_type: str = 'math') -> dict:
         """Generate a question using Gemini REST API"""
         try:
-            # Use explicit subject type instead of detection
-            is_math_topic = (subject_type == 'math')
-            
-            # Adjust difficulty description based on class level
-            grade_descriptions = {
-                1: "very basic, suitable for first graders (ages 6-7)",
-                2: "basic, suitable for second graders (ages 7-8)",
-                3: "intermediate, suitable for third graders (ages 8-9)",
-                4: "moderately challenging, suitable for fourth graders (ages 9-10)",
-                5: "challenging, suitable for fifth graders (ages 10-11)"
-            }
-            
-            grade_desc = grade_descriptions.get(class_level, "age-appropriate for elementary students")
-            
-            # SEPARATE PROMPTS FOR MATH AND SCIENCE
-            if is_math_topic:
-                # MATH-SPECIFIC QUESTION STYLES
-                question_style_instructions = {
-                    "easy": """
-QUESTION FORMAT FOR EASY MATH:
-- Use DIRECT, STRAIGHTFORWARD arithmetic format
-- For multiplication: Single-digit × single-digit (use VARIED numbers from 2-9) OR Double-digit with simple numbers (one number 10-20, other 2-9)
-- For addition: Simple direct addition (numbers from 5-50)
-- For subtraction: Simple direct subtraction (numbers from 5-50)
-- For division: Simple division with whole number results
-- Keep it simple and clear - NO word problems, NO complex scenarios
-- Just the basic arithmetic operation being tested directly
-- IMPORTANT: Choose RANDOM numbers each time, never repeat the same numbers
-- ONLY MATH - NO science concepts mixed in!""",
-                    
-                    "medium": """
-QUESTION FORMAT FOR MEDIUM MATH:
-- Use SIMPLE CONTEXTUAL WORD PROBLEMS with easy arithmetic
-- Simple word problems with EASY single-digit operations
-- Use creative scenarios: children collecting items, arranging objects, sharing things
-- Keep numbers SIMPLE: single digits (2-9) for multiplication
-- Use DIFFERENT numbers each time - avoid repeating combinations
-- Use relatable, everyday scenarios
-- One-step problems with context
-- IMPORTANT: Create UNIQUE scenarios, not generic "bags with items" - be creative!
-- ONLY MATH - NO science concepts mixed in!""",
-                    
-                    "hard": """
-QUESTION FORMAT FOR HARD MATH:
-- Use WORD PROBLEMS with slightly harder arithmetic
-- Word problems with moderate operations
-- For multiplication: One number single-digit (5-9), other small double-digit (10-20), results under 150
-- Use VARIED scenarios: shops, farms, schools, parties, sports
-- Use realistic scenarios that a child can visualize
-- ONE-STEP problems only, not multi-step
-- IMPORTANT: Use DIFFERENT number combinations each time - vary both numbers and context
-- ONLY MATH - NO science concepts mixed in!"""
-                }
-            else:
-                # SCIENCE-SPECIFIC QUESTION STYLES
-                question_style_instructions = {
-                    "easy": """
-QUESTION FORMAT FOR EASY SCIENCE:
-- Simple factual questions about basic science concepts
-- Focus on: plants, animals, weather, human body, water, air, earth, sun, moon
-- Direct questions like "What do plants need to grow?" or "Where do fish live?"
-- NO MATH, NO NUMBERS, NO CALCULATIONS
-- Keep it simple and clear - just testing basic science knowledge
-- Use age-appropriate vocabulary
-- Focus on observable facts and everyday science""",
-                    
-                    "medium": """
-QUESTION FORMAT FOR MEDIUM SCIENCE:
-- Scenario-based questions about science concepts
-- Topics: plants, animals, weather, ecosystems, life cycles, simple machines, states of matter
-- Use relatable scenarios: "A plant in the garden...", "When you see clouds..."
-- Questions that require simple reasoning and understanding
-- NO MATH, NO NUMBERS, NO CALCULATIONS
-- One-step reasoning problems
-- Connect to real-world observations""",
-                    
-                    "hard": """
-QUESTION FORMAT FOR HARD SCIENCE:
-- Questions requiring deeper understanding and reasoning
-- Topics: food chains, adaptation, habitats, photosynthesis, water cycle, energy, simple experiments
-- Scenarios that require cause-and-effect thinking
-- "Why" and "How" questions that test understanding
-- NO MATH, NO NUMBERS, NO CALCULATIONS
-- Use realistic scenarios children can understand
-- Test conceptual understanding, not memorization"""
-                }
-            
-            style_guide = question_style_instructions.get(difficulty, question_style_instructions["medium"])
-            
             # Add randomization to ensure unique questions each time
-            import time
-            import random as rand
             random_seed = int(time.time() * 1000) % 10000
-            unique_id = f"{random_seed}-{rand.randint(1000, 9999)}"
-            
-            # Generate diverse number ranges and scenarios
-            sample_numbers = rand.sample(range(2, 20), 4)
-            sample_names = rand.choice([
-                ["Sarah", "Tom", "Maria", "Alex"],
-                ["Emma", "Jack", "Lily", "Noah"],
-                ["Sophia", "Oliver", "Ava", "Liam"]
-            ])
-            sample_objects = rand.choice([
-                ["apples", "oranges", "bananas", "mangoes"],
-                ["pencils", "erasers", "crayons", "markers"],
-                ["cookies", "candies", "cupcakes", "donuts"],
-                ["books", "toys", "balls", "cards"]
-            ])
-            
-            # Build appropriate prompt based on subject type and difficulty
-            if is_math_topic:
-                if difficulty == 'easy':
-                    # EASY = NO word problems, just direct arithmetic
-                    subject_guidance = f"""MATH SUBJECT REQUIREMENTS FOR EASY:
-- This is a DIRECT ARITHMETIC question about {topic}
-- Use ONLY the arithmetic operation - NO stories, NO scenarios, NO context
-- Example format: "What is 5 × 3?" or "Calculate 12 + 8"
-- Use VARIED numbers: {sample_numbers[0]}, {sample_numbers[1]}, {sample_numbers[2]}, {sample_numbers[3]} (choose different ones)
-- All answer options should be NUMBERS
-- ABSOLUTELY NO WORD PROBLEMS - just the math operation
-- DO NOT mix in science concepts - keep it pure math!
-
-HINT REQUIREMENT FOR EASY MATH:
-- Provide a tip or strategy (e.g., "Break it down: 12 = 10 + 2")
-- Keep hints SHORT and CLEAR (1-2 sentences max)"""
-                else:
-                    # MEDIUM/HARD = Word problems allowed
-                    subject_guidance = f"""MATH SUBJECT REQUIREMENTS:
-- This is a MATH question about {topic}
-- Use NUMBERS and ARITHMETIC OPERATIONS in a word problem
-- Use VARIED numbers: {sample_numbers[0]}, {sample_numbers[1]}, {sample_numbers[2]}, {sample_numbers[3]} (choose different ones)
-- Use DIFFERENT names: {sample_names[0]}, {sample_names[1]}, {sample_names[2]}, or create new ones
-- Use DIFFERENT objects/items: {sample_objects[0]}, {sample_objects[1]}, {sample_objects[2]}, or invent new ones
-- Create UNIQUE scenarios (not just "bags with apples" or "tables with chairs")
-- All answer options should be NUMBERS
-- DO NOT mix in science concepts - keep it pure math!
-
-HINT REQUIREMENT FOR MATH:
-- For word problems: show how to convert to simple arithmetic (e.g., "5 bags with 3 apples each" → "Think: 5 × 3 = ?")
-- Keep hints SHORT and CLEAR (1-2 sentences max)"""
-            else:
-                subject_guidance = f"""SCIENCE SUBJECT REQUIREMENTS:
-- This is a PURE SCIENCE question about {topic}
-- Focus on scientific concepts, facts, and understanding
-- NO MATH, NO NUMBERS, NO CALCULATIONS at all!
-- Use science vocabulary appropriate for Class {class_level}
-- Answer options should be science concepts/facts, NOT numbers
-- Make it about real-world science observations
-- DO NOT mix in math operations - keep it pure science!
-
-HINT REQUIREMENT FOR SCIENCE:
-- Give a memory aid or key concept hint
-- Help them recall the scientific principle
-- Connect to real-world examples they can observe
-- Keep hints SHORT and CLEAR (1-2 sentences max)"""
-            
-            prompt = f"""Generate a UNIQUE and CREATIVE multiple-choice question about {topic} at {difficulty} difficulty level for a Class {class_level} student ({grade_desc}).
-
-UNIQUENESS REQUIREMENT - CRITICAL:
-- Make this question COMPLETELY DIFFERENT from typical examples shown
-- Create UNIQUE scenarios
-- Unique ID for this question: {unique_id}
-- DO NOT repeat the example questions shown in the format guide - CREATE NEW ONES!
-            
-CRITICAL REQUIREMENTS:
-- The question MUST be directly about {topic} only
-- Stay 100% focused on {topic} concepts
-- Generate DIVERSE questions - avoid repetitive patterns
-
-{subject_guidance}
-
-{style_guide}
-
-Format the response as a JSON object with this structure:
-{{
-    "id": <random_number>,
-    "question": "<question_text>",
-    "options": [
-        {{"text": "<option1>", "correct": true}},
-        {{"text": "<option2>", "correct": false}},
-        {{"text": "<option3>", "correct": false}},
-        {{"text": "<option4>", "correct": false}}
-    ],
-    "difficulty": "{difficulty}",
-    "explanation": "<brief_explanation>",
-    "hint": "<simplified_hint_that_helps_solve>",
-    "conceptTags": ["{topic}"]
-}}
-
-Make sure:
-- Follow the question format style for {difficulty} difficulty EXACTLY as described above
-- The question is DIRECTLY about {topic} - no unrelated topics
-- {"PURE MATH with numbers and operations - NO science concepts!" if is_math_topic else "PURE SCIENCE with concepts - NO math or numbers!"}
-- The question is appropriate for a Class {class_level} student
-- Use vocabulary and concepts suitable for their grade level
-- Exactly ONE option is marked as correct
-- All options are plausible but clearly distinguishable
-- The explanation is helpful, encouraging, and uses simple language
-- The hint simplifies the problem without giving away the answer
-"""
-            
-            payload = {
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }]
-            }
-            
-            response = requests.post(self.base_url, json=payload, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            response_text = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            
-            # Try to extract JSON from response
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
+            unique_id = f"{random_seed}-{random.randint(1000, 9999)}"
+            
+            # Subject and difficulty guidance are baked into the precompiled template
+            prompt = PROMPTS.render(
+                question_template_name("question", subject_type, difficulty),
+                topic=topic,
+                difficulty=difficulty,
+                class_level=class_level,
+                grade_desc=GRADE_DESCRIPTIONS.get(class_level, DEFAULT_GRADE_DESCRIPTION),
+                unique_id=unique_id,
+                # Generate diverse number ranges and scenarios
+                numbers=random.sample(range(2, 20), 4),
+                names=random.choice(QUESTION_NAME_OPTIONS),
+                objects=random.choice(QUESTION_OBJECT_OPTIONS)
+            )
+            
+            response_text = await self.client.generate_content(prompt, timeout=10, max_retries=1, breaker=self.breakers["question"])
+            
+            questions, _ = parse_questions(response_text, difficulty)
+            if not questions:
+                print("Generated question failed validation, generating fallback question")
+                return self._generate_fallback_question(topic, difficulty, subject_type)
+            return questions[0]
             
-            question_data = json.loads(response_text)
-            return question_data
-            
-        except json.JSONDecodeError as e:
-            # Fallback: generate a simple question
-            print(f"JSON decode error: {e}, generating fallback question")
-            return self._generate_fallback_question(topic, difficulty, subject_type)
         except Exception as err:
             print(f"Error generating question: {err}")
             return self._generate_fallback_question(topic, difficulty, subject_type)
     
     async def generate_question_batch(self, topic: str, difficulty: str, count: int = 3, class_level: int = 5, subject_type: str = 'math') -> List[dict]:
         """Generate multiple practice questions at once for better performance"""
-        try:
-            # Use explicit subject type instead of detection
-            is_math_topic = (subject_type == 'math')
-            
-            # Adjust difficulty description based on class level
-            grade_descriptions = {
-                1: "very basic, suitable for first graders (ages 6-7)",
-                2: "basic, suitable for second graders (ages 7-8)",
-                3: "intermediate, suitable for third graders (ages 8-9)",
-                4: "moderately challenging, suitable for fourth graders (ages 9-10)",
-                5: "challenging, suitable for fifth graders (ages 10-11)"
-            }
-            
-            grade_desc = grade_descriptions.get(class_level, "age-appropriate for elementary students")
-            
-            # SEPARATE PROMPTS FOR MATH AND SCIENCE
-            if is_math_topic:
-                # MATH-SPECIFIC QUESTION STYLES
-                question_style_instructions = {
-                    "easy": "MATH: Use DIRECT arithmetic. For multiplication: single-digit × single-digit (RANDOM numbers 2-9) OR double-digit (one number 10-20, other 2-9). NO word problems. Use DIFFERENT numbers each time. ONLY MATH - NO science!",
-                    "medium": "MATH: Use SIMPLE word problems with EASY single-digit operations. Both numbers 2-9 for multiplication. Create UNIQUE scenarios - vary context, names, objects. Use DIFFERENT number combinations. ONLY MATH - NO science!",
-                    "hard": "MATH: Use word problems with moderate multiplication. One number 5-9, other 10-20. Results under 150. ONE-STEP problems. Create VARIED scenarios and DIFFERENT numbers. ONLY MATH - NO science!"
-                }
-            else:
-                # SCIENCE-SPECIFIC QUESTION STYLES
-                question_style_instructions = {
-                    "easy": "SCIENCE: Simple factual questions about basic science concepts (plants, animals, weather, human body, water, air). Direct questions. NO MATH, NO NUMBERS, NO CALCULATIONS. Just testing science knowledge.",
-                    "medium": "SCIENCE: Scenario-based questions about science (ecosystems, life cycles, simple machines, states of matter). Use relatable scenarios. Simple reasoning. NO MATH, NO NUMBERS. Connect to real-world observations.",
-                    "hard": "SCIENCE: Questions requiring deeper understanding (food chains, adaptation, photosynthesis, water cycle, energy). Cause-and-effect thinking. 'Why' and 'How' questions. NO MATH, NO NUMBERS. Test conceptual understanding."
-                }
-            
-            style_guide = question_style_instructions.get(difficulty, question_style_instructions["medium"])
-            
-            # Add strong randomization for batch generation
-            import time
-            import random as rand
-            batch_id = f"{int(time.time() * 1000)}-{rand.randint(1000, 9999)}"
-            
+        # Serve questions left over from an earlier oversized response before calling the API
+        requested_count = count
+        question_cache_key = make_cache_key("questions", topic, None, difficulty, class_level, subject_type)
+        cached_questions = self.question_cache.pop(question_cache_key) or []
+        if len(cached_questions) >= requested_count:
+            if len(cached_questions) > requested_count:
+                self.question_cache.set(question_cache_key, cached_questions[requested_count:])
+            print(f"Using {requested_count} cached questions for topic: {topic}")
+            return cached_questions[:requested_count]
+        
+        questions = list(cached_questions)
+        questions.extend(await self._take_stored_questions(topic, difficulty, class_level, subject_type, requested_count - len(questions)))
+        # Keep every valid, distinct question; if some were malformed or repeats, request only the missing count
+        for _ in range(MAX_BATCH_REQUESTS):
+            missing = requested_count - len(questions)
+            if missing <= 0:
+                break
+            try:
+                new_questions = await self._request_question_batch(topic, difficulty, missing, class_level, subject_type)
+                # Repeats within the response (or of earlier rounds) count as rejected too
+                questions, duplicates = dedupe_questions(questions + new_questions)
+                if duplicates:
+                    print(f"Dropped {duplicates} duplicate question(s) from batch")
+            except CircuitOpenError as e:
+                # Fail fast to the local question bank while Gemini is unhealthy
+                print(f"⚡ {e} - using fallback questions")
+                break
+            except Exception as e:
+                print(f"ERROR generating question batch: {type(e).__name__}: {str(e)}")
+                import traceback
+                traceback.print_exc()
+                break
+        
+        missing = requested_count - len(questions)
+        if missing > 0:
+            # Fallback: generate diverse questions one by one
+            print(f"Falling back to individual question generation for {missing} question(s)")
+            questions.extend(self._generate_fallback_question(topic, difficulty, subject_type) for _ in range(missing))
+        
+        self._stash_surplus_questions(topic, difficulty, class_level, subject_type, questions[requested_count:])
+        return questions[:requested_count]
+    
+    async def _request_question_batch(self, topic: str, difficulty: str, count: int, class_level: int, subject_type: str) -> List[dict]:
+        """Call Gemini for `count` questions of one difficulty and return the valid ones"""
+        # Add strong randomization for batch generation
+        batch_id = f"{int(time.time() * 1000)}-{random.randint(1000, 9999)}"
+        
+        prompt = PROMPTS.render(
+            question_template_name("batch", subject_type, difficulty),
+            topic=topic,
+            difficulty=difficulty,
+            count=count,
+            class_level=class_level,
+            grade_desc=GRADE_DESCRIPTIONS.get(class_level, DEFAULT_GRADE_DESCRIPTION),
+            batch_id=batch_id,
             # Generate diverse suggestions for variety
-            number_sets = [rand.sample(range(2, 15), 5) for _ in range(count)]
-            name_options = [
-                ["Sarah", "Tom", "Maria", "Alex", "Emily"],
-                ["Jack", "Lily", "Noah", "Emma", "Oliver"],
-                ["Sophia", "Liam", "Ava", "Lucas", "Mia"],
-                ["Ben", "Zoe", "Ryan", "Chloe", "Max"]
-            ]
-            object_options = [
-                ["apples", "oranges", "bananas", "grapes", "mangoes"],
-                ["pencils", "erasers", "books", "notebooks", "pens"],
-                ["cookies", "candies", "cupcakes", "brownies", "donuts"],
-                ["toys", "balls", "cards", "puzzles", "games"],
-                ["flowers", "trees", "plants", "seeds", "leaves"]
-            ]
-            
-            # Build appropriate prompt based on subject type and difficulty
-            if is_math_topic:
-                if difficulty == 'easy':
-                    # EASY = NO word problems, just direct arithmetic
-                    subject_guidance = f"""MATH SUBJECT REQUIREMENTS FOR BATCH (EASY):
-- These are DIRECT ARITHMETIC questions about {topic}
-- Use ONLY the arithmetic operation - NO stories, NO scenarios, NO context
-- Example format: "What is 5 × 3?" or "Calculate 12 + 8"
-- Suggested number sets: {number_sets}
-- DO NOT repeat numbers across questions
-- All answer options should be NUMBERS
-- ABSOLUTELY NO WORD PROBLEMS - just the math operation
-- DO NOT mix in science concepts - keep it pure math!
-
-HINT REQUIREMENT FOR EASY MATH QUESTIONS:
-- Provide a tip or strategy (e.g., "Break it down: 12 = 10 + 2")
-- Keep hints SHORT and CLEAR (1-2 sentences max)"""
-                else:
-                    # MEDIUM/HARD = Word problems allowed
-                    subject_guidance = f"""MATH SUBJECT REQUIREMENTS FOR BATCH:
-- These are MATH questions about {topic}
-- Use NUMBERS and ARITHMETIC OPERATIONS in word problems
-- Suggested number sets: {number_sets}
-- Suggested names: {rand.choice(name_options)}
-- Suggested objects: {rand.choice(object_options)}
-- DO NOT repeat numbers, names, objects, or scenarios across questions
-- All answer options should be NUMBERS
-- DO NOT mix in science concepts - keep it pure math!
-
-HINT REQUIREMENT FOR MATH QUESTIONS:
-- For word problems: show how to convert to simple arithmetic (e.g., "5 bags with 3 apples each" → "Think: 5 × 3 = ?")
-- Keep hints SHORT and CLEAR (1-2 sentences max)"""
-            else:
-                subject_guidance = f"""SCIENCE SUBJECT REQUIREMENTS FOR BATCH:
-- These are PURE SCIENCE questions about {topic}
-- Focus on scientific concepts, facts, and understanding
-- NO MATH, NO NUMBERS, NO CALCULATIONS at all!
-- Use science vocabulary appropriate for Class {class_level}
-- Answer options should be science concepts/facts, NOT numbers
-- Make questions about real-world science observations
-- DO NOT mix in math operations - keep it pure science!
-
-HINT REQUIREMENT FOR SCIENCE QUESTIONS:
-- Give a memory aid or key concept hint
-- Help them recall the scientific principle
-- Connect to real-world examples they can observe
-- Keep hints SHORT and CLEAR (1-2 sentences max)"""
-            
-            prompt = f"""Generate {count} COMPLETELY DIFFERENT and UNIQUE multiple-choice questions about "{topic}" at {difficulty} difficulty level for Class {class_level} students ({grade_desc}).
-
-CRITICAL UNIQUENESS REQUIREMENTS:
-- Each question MUST be COMPLETELY DIFFERENT from the others
-- Use DIFFERENT contexts for each question
-- Batch ID: {batch_id}
-- CREATE UNIQUE SCENARIOS - NOT JUST THE EXAMPLES!
-
-{subject_guidance}
-
-QUESTION FORMAT REQUIREMENT:
-{style_guide}
+            number_sets=[random.sample(range(2, 15), 5) for _ in range(count)],
+            names=random.choice(BATCH_NAME_OPTIONS),
+            objects=random.choice(BATCH_OBJECT_OPTIONS)
+        )
+        
+        print(f"Generating {count} practice questions for topic: {topic}")
+        
+        # Rate limiting (free tier: 15 RPM) and retries with exponential backoff
+        # are handled by the async client
+        response_text = await self.client.generate_content(prompt, timeout=15, breaker=self.breakers["batch"])
+        print(f"Gemini response length: {len(response_text)} chars")
+        
+        questions, rejected = parse_questions(response_text, difficulty)
+        print(f"Successfully generated {len(questions)} questions ({rejected} rejected)")
+        await self._store_questions(topic, difficulty, class_level, subject_type, questions)
+        return questions
+    
+    async def generate_question_mix(self, topic: str, mix: Dict[str, int], class_level: int = 5, subject_type: str = 'math') -> List[dict]:
+        """Generate questions for several difficulties from a single prompt.
 
-Each question should be in this JSON format:
-[{{
-    "id": <unique_number>,
-    "question": "<question_text>",
-    "options": [
-        {{"text": "<option1>", "correct": true}},
-        {{"text": "<option2>", "correct": false}},
-        {{"text": "<option3>", "correct": false}},
-        {{"text": "<option4>", "correct": false}}
-    ],
-    "difficulty": "{difficulty}",
-    "explanation": "<brief_explanation>",
-    "hint": "<simplified_hint_that_helps_solve>",
-    "conceptTags": ["{topic}"]
-}}]
+        `mix` maps difficulty to count, e.g. {"easy": 2, "medium": 2, "hard": 1}.
+        Questions come back ordered easy -> medium -> hard and tagged with their
+        difficulty. If the response is short for a difficulty, only that
+        shortfall is requested again through generate_question_batch.
+        """
+        mix = {difficulty: count for difficulty, count in mix.items() if count > 0}
+        ordered_difficulties = sorted(mix, key=lambda d: DIFFICULTY_ORDER.index(d) if d in DIFFICULTY_ORDER else len(DIFFICULTY_ORDER))
+        
+        # Start from questions left over by earlier oversized responses
+        by_difficulty = {}
+        for difficulty in ordered_difficulties:
+            cached_questions = self.question_cache.pop(make_cache_key("questions", topic, None, difficulty, class_level, subject_type)) or []
+            cached_questions.extend(await self._take_stored_questions(topic, difficulty, class_level, subject_type, mix[difficulty] - len(cached_questions)))
+            by_difficulty[difficulty] = cached_questions
+        needed = {difficulty: mix[difficulty] - len(by_difficulty[difficulty]) for difficulty in ordered_difficulties if len(by_difficulty[difficulty]) < mix[difficulty]}
+        
+        # A single difficulty needs no mixed prompt; the refill step below covers it
+        if len(needed) > 1:
+            await self._request_question_mix(topic, needed, by_difficulty, class_level, subject_type)
+        
+        all_questions = []
+        for difficulty in ordered_difficulties:
+            questions = by_difficulty[difficulty]
+            self._stash_surplus_questions(topic, difficulty, class_level, subject_type, questions[mix[difficulty]:])
+            questions = questions[:mix[difficulty]]
+            missing = mix[difficulty] - len(questions)
+            if missing > 0:
+                print(f"Mixed response short by {missing} {difficulty} question(s), refilling")
+                questions.extend(await self.generate_question_batch(topic, difficulty, missing, class_level, subject_type))
+            all_questions.extend(dict(question, difficulty=difficulty) for question in questions[:mix[difficulty]])
+        return all_questions
+    
+    def _build_question_mix_prompt(self, topic: str, mix: Dict[str, int], class_level: int, subject_type: str) -> str:
+        """Prompt asking for every difficulty in `mix` as one JSON array, easiest first"""
+        total = sum(mix.values())
+        return PROMPTS.render(
+            "mix/math" if subject_type == 'math' else "mix/science",
+            topic=topic,
+            total=total,
+            class_level=class_level,
+            grade_desc=GRADE_DESCRIPTIONS.get(class_level, DEFAULT_GRADE_DESCRIPTION),
+            mix_lines=render_mix_lines(subject_type, mix),
+            batch_id=f"{int(time.time() * 1000)}-{random.randint(1000, 9999)}",
+            number_sets=[random.sample(range(2, 15), 5) for _ in range(total)],
+            names=random.choice(BATCH_NAME_OPTIONS),
+            objects=random.choice(BATCH_OBJECT_OPTIONS)
+        )
 
-Requirements:
-- Generate EXACTLY {count} different questions ALL about {topic}
-- {"PURE MATH with numbers and operations - NO science concepts!" if is_math_topic else "PURE SCIENCE with concepts - NO math or numbers!"}
-- Each question appropriate for Class {class_level} students - use simple language and grade-appropriate concepts
-- Use vocabulary suitable for their grade level
-- Questions should be challenging but achievable for their age
-- Each question must have exactly ONE correct answer
-- Make questions engaging and varied in style
-- Explanations should be encouraging and use simple language
-- Each question MUST have a helpful hint that simplifies without revealing the answer
-- ALL questions must stay on the topic of {topic} - no unrelated content
+    async def _request_question_mix(self, topic: str, mix: Dict[str, int], by_difficulty: Dict[str, List[dict]], class_level: int, subject_type: str) -> None:
+        """Issue one mixed-difficulty prompt and append the parsed questions to `by_difficulty`"""
+        try:
+            prompt = self._build_question_mix_prompt(topic, mix, class_level, subject_type)
+            print(f"Generating {sum(mix.values())} mixed-difficulty questions {mix} for topic: {topic}")
+            response_text = await self.client.generate_content(prompt, timeout=20, breaker=self.breakers["mix"])
+            questions, rejected = parse_questions(response_text)
+            print(f"Parsed {len(questions)} mixed questions ({rejected} rejected)")
+            
+            # Questions without a recognisable difficulty fill the earliest level still short
+            untagged = []
+            generated = {difficulty: [] for difficulty in by_difficulty}
+            for question in questions:
+                difficulty = question.get("difficulty")
+                if difficulty in by_difficulty:
+                    generated[difficulty].append(question)
+                else:
+                    untagged.append(question)
+            for difficulty in mix:
+                while untagged and len(by_difficulty[difficulty]) + len(generated[difficulty]) < mix[difficulty]:
+                    generated[difficulty].append(dict(untagged.pop(0), difficulty=difficulty))
+            for difficulty, new_questions in generated.items():
+                by_difficulty[difficulty].extend(new_questions)
+                await self._store_questions(topic, difficulty, class_level, subject_type, new_questions)
+        except Exception as e:
+            print(f"ERROR generating question mix: {type(e).__name__}: {str(e)}")
+    
+    async def stream_question_mix(self, topic: str, mix: Dict[str, int], class_level: int = 5, subject_type: str = 'math') -> AsyncIterator[dict]:
+        """Yield mixed-difficulty questions one by one as Gemini streams them.
 
-Return ONLY the JSON array, no additional text.
-"""
-            
-            print(f"Generating {count} practice questions for topic: {topic}")
-            
-            payload = {
-                "contents": [{
-                    "parts": [{"text": prompt}]
-                }]
-            }
-            
-            # Add delay between requests to avoid rate limiting (free tier: 15 RPM)
-            current_time = time.time()
-            time_since_last = current_time - self.last_request_time
-            if time_since_last < 4:  # Wait at least 4 seconds between requests
-                sleep_time = 4 - time_since_last
-                print(f"⏳ Rate limit protection: waiting {sleep_time:.1f}s...")
-                time.sleep(sleep_time)
-            self.last_request_time = time.time()
-            
-            # Retry logic with longer exponential backoff
-            max_retries = 3
-            retry_delay = 10  # Start with 10s (was 2s)
-            response = None
-            
-            for attempt in range(max_retries):
-                try:
-                    response = requests.post(self.base_url, json=payload, timeout=15)
-                    response.raise_for_status()
-                    break  # Success
-                except requests.exceptions.HTTPError as e:
-                    if e.response.status_code == 429:  # Rate limit
-                        if attempt < max_retries - 1:
-                            # Exponential backoff with longer delays
-                            wait_time = retry_delay * (2 ** attempt)
-                            print(f"⚠️ Rate limited. Waiting {wait_time}s before retry {attempt + 1}/{max_retries}...")
-                            time.sleep(wait_time)
-                        else:
-                            print(f"❌ Rate limit exceeded after {max_retries} attempts. Using fallback questions.")
-                            raise
-                    else:
-                        raise
-            
-            result = response.json()
-            response_text = result['candidates'][0]['content']['parts'][0]['text'].strip()
-            print(f"Gemini response length: {len(response_text)} chars")
-            
-            # Extract JSON from response
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            
-            questions = json.loads(response_text)
-            
-            if not isinstance(questions, list):
-                questions = [questions]
-            
-            print(f"Successfully generated {len(questions)} questions")
-            return questions[:count]
-            
+        Uses streamGenerateContent and parses the JSON array incrementally, so the
+        first question is available after roughly one question's generation time.
+        Whatever the stream does not deliver is filled per difficulty afterwards.
+        """
+        mix = {difficulty: count for difficulty, count in mix.items() if count > 0}
+        delivered = {difficulty: 0 for difficulty in mix}
+        streamed = {difficulty: [] for difficulty in mix}
+        try:
+            prompt = self._build_question_mix_prompt(topic, mix, class_level, subject_type)
+            print(f"Streaming {sum(mix.values())} mixed-difficulty questions {mix} for topic: {topic}")
+            parser = IncrementalJSONArrayParser()
+            async for fragment in self.client.stream_content(prompt, timeout=30, breaker=self.breakers["stream"]):
+                for element in parser.feed(fragment):
+                    question = validate_question(element)
+                    if question is None:
+                        continue
+                    difficulty = question.get("difficulty")
+                    if difficulty not in mix or delivered[difficulty] >= mix[difficulty]:
+                        # Unknown or already satisfied level: use the earliest level still short
+                        difficulty = next((d for d in mix if delivered[d] < mix[d]), None)
+                    if difficulty is None:
+                        continue
+                    delivered[difficulty] += 1
+                    question = dict(question, difficulty=difficulty)
+                    streamed[difficulty].append(question)
+                    yield question
+                if parser.finished:
+                    break
         except Exception as e:
-            print(f"ERROR generating question batch: {type(e).__name__}: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            # Fallback: generate diverse questions one by one
-            print(f"Falling back to individual question generation")
-            return [self._generate_fallback_question(topic, difficulty, subject_type) for _ in range(count)]
+            print(f"ERROR streaming question mix: {type(e).__name__}: {str(e)}")
+        
+        for difficulty, questions in streamed.items():
+            await self._store_questions(topic, difficulty, class_level, subject_type, questions)
+        
+        for difficulty in mix:
+            missing = mix[difficulty] - delivered[difficulty]
+            if missing > 0:
+                print(f"Stream short by {missing} {difficulty} question(s), refilling")
+                for question in await self.generate_question_batch(topic, difficulty, missing, class_level, subject_type):
+                    yield dict(question, difficulty=difficulty)
+    
+    def breaker_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+    
+    def _question_store_key(self, topic: str, difficulty: str, class_level: int, subject_type: str) -> str:
+        # Questions for one level come from the batch and the mix prompts, so either changing invalidates them
+        version = PROMPTS.version(question_template_name("batch", subject_type, difficulty), "mix/math" if subject_type == 'math' else "mix/science")
+        return ResponseStore.make_key("questions", version, make_cache_key("questions", topic, None, difficulty, class_level, subject_type))
+    
+    async def _take_stored_questions(self, topic: str, difficulty: str, class_level: int, subject_type: str, count: int) -> List[dict]:
+        """Sample up to `count` previously generated questions, once enough are stored to give variety.
+
+        A `response_store_generate_fraction` share of requests still generates,
+        so the bank keeps growing and rotating instead of freezing at its first
+        `response_store_min_questions` questions until the TTL expires.
+        """
+        if self.response_store is None or count <= 0:
+            return []
+        stored = await self.response_store.get(self._question_store_key(topic, difficulty, class_level, subject_type)) or []
+        if len(stored) < settings.response_store_min_questions or random.random() < settings.response_store_generate_fraction:
+            return []
+        print(f"Using {min(count, len(stored))} stored {difficulty} questions for topic: {topic}")
+        return random.sample(stored, min(count, len(stored)))
+    
+    async def _store_questions(self, topic: str, difficulty: str, class_level: int, subject_type: str, questions: List[dict]) -> None:
+        """Add freshly generated questions to the persistent bank for these parameters, newest kept"""
+        if self.response_store is None or not questions:
+            return
+        key = self._question_store_key(topic, difficulty, class_level, subject_type)
+        stored = await self.response_store.get(key, count=False) or []
+        # Concurrent writers may drop each other's additions; the bank only needs to grow eventually
+        merged, _ = dedupe_questions(stored + questions)
+        await self.response_store.set(key, merged[-settings.response_store_max_questions:])
+    
+    def _stash_surplus_questions(self, topic: str, difficulty: str, class_level: int, subject_type: str, questions: List[dict]) -> None:
+        """Keep extra questions for the next request with the same parameters"""
+        if not questions:
+            return
+        surplus_key = make_cache_key("questions", topic, None, difficulty, class_level, subject_type)
+        existing = self.question_cache.pop(surplus_key) or []
+        self.question_cache.set(surplus_key, existing + questions)
     
     def _generate_fallback_question(self, topic: str, difficulty: str, subject_type: str = 'math') -> dict:
         """Generate a fallback question using the comprehensive question bank"""
@@ -0,0 +1,168 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import math
+import random
+import re
+from typing import AsyncIterator, Callable, Dict, List, Optional, Union
+import httpx
+from src.config import settings
+from src.data.question_bank import QuestionGenerator
+
+# Markers of the prompt templates in prompt_templates.py, used to shape canned answers
+_MIX_LINE = re.compile(r'EXACTLY (\d+) question\(s\) with "difficulty": "(\w+)"')
+_BATCH = re.compile(r'Generate (\d+) COMPLETELY DIFFERENT and UNIQUE multiple-choice questions about "(.+?)"(?: at (\w+) difficulty)?')
+_SINGLE = re.compile(r"multiple-choice question about (.+?) at (\w+) difficulty")
+_CORRECT_ANSWER = re.compile(r"CORRECT ANSWER: (.*)")
+
+
+class LLMBackend(ABC):
+    """Interface every text-generation backend implements.
+
+    GeminiClient is the real REST implementation; FakeLLMBackend answers in
+    process. Pointing GeminiClient at a StubGeminiServer (settings.gemini_base_url)
+    exercises the real HTTP path without spending quota.
+    """
+
+    @abstractmethod
+    async def generate_content(self, prompt: str, timeout: float = None, max_retries: int = None, breaker=None) -> str:
+        """Text of the first candidate for `prompt`"""
+
+    @abstractmethod
+    def stream_content(self, prompt: str, timeout: float = None, breaker=None) -> AsyncIterator[str]:
+        """Text fragments for `prompt` as they are generated"""
+
+
+def parse_latency(spec: Union[str, float, int]) -> Callable[[random.Random], float]:
+    """Latency distribution from a spec, in seconds.
+
+    "0.2" is fixed, "uniform:0.1,0.5", "normal:0.3,0.05" (clipped at 0) and
+    "lognormal:0.3,0.5" (median 0.3s, sigma 0.5) are sampled per request.
+    """
+    if isinstance(spec, (int, float)):
+        return lambda rng: float(spec)
+    kind, _, args = str(spec).partition(":")
+    if not args:
+        value = float(kind)
+        return lambda rng: value
+    first, second = (float(part) for part in args.split(","))
+    if kind == "uniform":
+        return lambda rng: rng.uniform(first, second)
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(first, second))
+    if kind == "lognormal":
+        mu = math.log(first)
+        return lambda rng: rng.lognormvariate(mu, second)
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def canned_response(prompt: str, generator: QuestionGenerator) -> str:
+    """Plausible Gemini output for one of our prompts, built from the local question bank"""
+    subject_type = "math" if "MATH SUBJECT REQUIREMENTS" in prompt else "science"
+    if "STUDENT CHOSE:" in prompt:
+        match = _CORRECT_ANSWER.search(prompt)
+        answer = match.group(1).strip() if match else "the correct answer"
+        payload = {
+            "encouragement": "Nice effort - you were close!",
+            "explanation": f"'{answer}' is correct because it follows directly from the question.",
+            "example": f"Imagine sorting real objects to check that '{answer}' works.",
+            "tip": "Check your answer by working backwards."
+        }
+    else:
+        mix_lines = _MIX_LINE.findall(prompt)
+        batch = _BATCH.search(prompt)
+        single = _SINGLE.search(prompt)
+        if mix_lines and batch:
+            topic = batch.group(2)
+            payload = [question for count, difficulty in mix_lines
+                       for question in generator.generate_many(topic, difficulty, int(count), subject_type)]
+        elif batch:
+            payload = generator.generate_many(batch.group(2), batch.group(3) or "medium", int(batch.group(1)), subject_type)
+        elif single:
+            payload = generator.generate(single.group(1), single.group(2), subject_type)
+        else:
+            payload = {"text": "ok"}
+    return "```json\n" + json.dumps(payload, indent=2, ensure_ascii=False) + "\n```"
+
+
+def split_for_streaming(text: str, chunk_chars: int = 80) -> List[str]:
+    return [text[start:start + chunk_chars] for start in range(0, len(text), chunk_chars)] or [""]
+
+
+class FakeLLMBackend(LLMBackend):
+    """In-process backend with configurable latency, error rate and responses.
+
+    `responses` may be a list of canned strings (served in rotation) or a
+    function of the prompt; by default answers are generated from the local
+    question bank in the shape each prompt asks for. Errors are raised as the
+    same httpx errors GeminiClient raises, so callers and circuit breakers
+    behave as they would against the real API.
+    """
+
+    def __init__(self, latency: Union[str, float] = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 responses: Optional[Union[List[str], Callable[[str], str]]] = None, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.responses = responses
+        self.generator = QuestionGenerator(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def _respond(self, prompt: str) -> str:
+        if callable(self.responses):
+            return self.responses(prompt)
+        if self.responses:
+            return self.responses[(self.calls - 1) % len(self.responses)]
+        return canned_response(prompt, self.generator)
+
+    async def _call(self, prompt: str, breaker) -> str:
+        if breaker is not None:
+            breaker.check()
+        recorded = False
+        try:
+            self.calls += 1
+            latency = self.sample_latency(self.rng)
+            await asyncio.sleep(latency)
+            failed = self.rng.random() < self.error_rate
+            if breaker is not None:
+                breaker.record(failed, latency)
+            recorded = True
+        finally:
+            # Cancelled mid-call, as GeminiClient does: give the half-open probe slot back
+            if not recorded and breaker is not None:
+                breaker.release()
+        if failed:
+            self.errors += 1
+            request = httpx.Request("POST", "http://fake-llm/generateContent")
+            raise httpx.HTTPStatusError(f"Fake LLM error {self.error_status}", request=request,
+                                        response=httpx.Response(self.error_status, request=request))
+        return self._respond(prompt)
+
+    async def generate_content(self, prompt: str, timeout: float = None, max_retries: int = None, breaker=None) -> str:
+        return (await self._call(prompt, breaker)).strip()
+
+    async def stream_content(self, prompt: str, timeout: float = None, breaker=None) -> AsyncIterator[str]:
+        for chunk in split_for_streaming(await self._call(prompt, breaker)):
+            yield chunk
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "errors": self.errors}
+
+
+def gemini_url(base_url: str = None, model: str = None, api_key: str = None) -> str:
+    """generateContent URL for a model under a Gemini-compatible base URL"""
+    base_url = (base_url or settings.gemini_base_url).rstrip("/")
+    model = model or settings.gemini_model
+    api_key = api_key if api_key is not None else settings.gemini_api_key
+    return f"{base_url}/models/{model}:generateContent?key={api_key}"
+
+
+def create_llm_backend(name: str = None, url: str = None) -> LLMBackend:
+    """Backend selected by settings.llm_backend: "gemini" (REST, real or stub server) or "fake" """
+    name = name or settings.llm_backend
+    if name == "fake":
+        return FakeLLMBackend(latency=settings.fake_llm_latency, error_rate=settings.fake_llm_error_rate)
+    from src.services.gemini_client import GeminiClient
+    return GeminiClient(url or gemini_url())
@@ -0,0 +1,286 @@
+import json
+import random
+from typing import Any, List, Optional, Tuple
+
+_FENCE = "```"
+_OPENERS = "{["
+_CLOSERS = "}]"
+
+
+def _payload_start(text: str) -> int:
+    """Index where the JSON payload may begin: inside the first code fence if there is one"""
+    fence = text.find(_FENCE)
+    if fence == -1:
+        return 0
+    newline = text.find("\n", fence)
+    return fence + len(_FENCE) if newline == -1 else newline + 1
+
+
+def _drop_trailing_comma(chars: List[str]) -> None:
+    """Remove a ',' (and whitespace after it) at the end of the buffer, e.g. before a closer"""
+    end = len(chars)
+    while end and chars[end - 1].isspace():
+        end -= 1
+    if end and chars[end - 1] == ",":
+        del chars[end - 1:]
+
+
+class IncrementalJSONArrayParser:
+    """Parse the elements of a top-level JSON array as its text arrives in chunks.
+
+    Anything before the opening bracket (prose, a ```json fence) is skipped and
+    trailing commas are tolerated. Each element is decoded as soon as its
+    closing brace or bracket is seen, so callers can act on the first question
+    before the rest of the array exists. Elements that fail to decode are
+    counted and skipped.
+    """
+
+    def __init__(self):
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._element: List[str] = []
+        self.malformed = 0
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume more text; returns the elements completed by this chunk"""
+        completed = []
+        element = self._element
+        for char in chunk:
+            if self._finished:
+                break
+            if not self._started:
+                if char == "[":
+                    self._started = True
+                continue
+            if self._in_string:
+                element.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+                element.append(char)
+            elif char in _OPENERS:
+                self._depth += 1
+                element.append(char)
+            elif char in _CLOSERS:
+                if self._depth == 0:
+                    # Closing bracket of the top-level array
+                    self._finished = True
+                    self._emit(completed)
+                    break
+                self._depth -= 1
+                _drop_trailing_comma(element)
+                element.append(char)
+                if self._depth == 0:
+                    self._emit(completed)
+            elif char == "," and self._depth == 0:
+                self._emit(completed)
+            elif self._depth > 0 or not char.isspace():
+                element.append(char)
+        return completed
+
+    def _emit(self, completed: List[Any]) -> None:
+        text = "".join(self._element).strip()
+        self._element.clear()
+        if not text:
+            return
+        try:
+            completed.append(json.loads(text))
+        except json.JSONDecodeError:
+            self.malformed += 1
+
+
+# Openers tried before giving up, so a bracket in leading prose ("see [1]") does not hide the payload
+MAX_CANDIDATES = 4
+
+
+def _candidate_starts(text: str):
+    """Yield the positions of the first few '{' or '[' after the payload start"""
+    index = _payload_start(text)
+    for _ in range(MAX_CANDIDATES):
+        found = [position for position in (text.find("{", index), text.find("[", index)) if position != -1]
+        if not found:
+            return
+        index = min(found)
+        yield index
+        index += 1
+
+
+def _decode_span(text: str, start: int) -> Any:
+    """Fast path: decode from the opener at `start` to the last matching closer, or None"""
+    closer = _CLOSERS[_OPENERS.index(text[start])]
+    end = text.rfind(closer)
+    if end <= start:
+        return None
+    try:
+        return json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+
+def _scan_value(text: str, start: int) -> Any:
+    """Decode the single value opening at `start`, dropping trailing commas; raises ValueError"""
+    chars: List[str] = []
+    depth = 0
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        chars.append(char)
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _OPENERS:
+            depth += 1
+        elif char in _CLOSERS:
+            chars.pop()
+            _drop_trailing_comma(chars)
+            chars.append(char)
+            depth -= 1
+            if depth == 0:
+                try:
+                    return json.loads("".join(chars))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Malformed JSON in model response: {e}") from e
+    raise ValueError("No complete JSON value in model response")
+
+
+def _decode_at(text: str, start: int) -> Any:
+    value = _decode_span(text, start)
+    return value if value is not None else _scan_value(text, start)
+
+
+def extract_json_value(text: str, expected_type: Optional[type] = None) -> Any:
+    """Decode the first JSON object or array in a model response.
+
+    Tolerates code fences, prose before or after the payload and trailing
+    commas. Well-formed payloads are handed straight to json.loads; the
+    character scan only runs when that fails. With `expected_type`, values of
+    another type are skipped. Raises ValueError when nothing suitable decodes.
+    """
+    error = ValueError("No complete JSON value in model response")
+    for start in _candidate_starts(text):
+        try:
+            value = _decode_at(text, start)
+        except ValueError as e:
+            error = e
+            continue
+        if expected_type is None or isinstance(value, expected_type):
+            return value
+        error = ValueError(f"Expected {expected_type.__name__} in model response, got {type(value).__name__}")
+    raise error
+
+
+def _as_bool(value: Any) -> Optional[bool]:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    return None
+
+
+def validate_question(data: Any, difficulty: Optional[str] = None) -> Optional[dict]:
+    """Normalize one generated question to the QuestionData shape, or return None if unusable.
+
+    Requires question text and at least two options with exactly one correct.
+    Missing ids are assigned; `difficulty`, when given, overrides the model's tag.
+    """
+    if not isinstance(data, dict):
+        return None
+    question_text = data.get("question")
+    if not isinstance(question_text, str) or not question_text.strip():
+        return None
+    options = data.get("options")
+    if not isinstance(options, list) or len(options) < 2:
+        return None
+
+    normalized_options = []
+    for option in options:
+        if not isinstance(option, dict) or option.get("text") is None:
+            return None
+        correct = _as_bool(option.get("correct", False))
+        if correct is None:
+            return None
+        normalized_option = dict(option, text=str(option["text"]), correct=correct)
+        normalized_options.append(normalized_option)
+    if sum(option["correct"] for option in normalized_options) != 1:
+        return None
+
+    question_id = data.get("id")
+    if isinstance(question_id, bool) or not isinstance(question_id, int):
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            question_id = random.randint(100000, 999999)
+
+    concept_tags = data.get("conceptTags")
+    normalized = dict(data)
+    normalized.update({
+        "id": question_id,
+        "question": question_text.strip(),
+        "options": normalized_options,
+        "conceptTags": [str(tag) for tag in concept_tags] if isinstance(concept_tags, list) else []
+    })
+    if difficulty:
+        normalized["difficulty"] = difficulty
+    elif data.get("difficulty"):
+        normalized["difficulty"] = str(data["difficulty"]).strip().lower()
+    return normalized
+
+
+def _parse_questions_at(text: str, start: int, difficulty: Optional[str]) -> Tuple[List[dict], int]:
+    if text[start] == "[":
+        elements = _decode_span(text, start)
+        rejected = 0
+        if not isinstance(elements, list):
+            # Decode element by element so one bad question does not lose the rest
+            parser = IncrementalJSONArrayParser()
+            elements = parser.feed(text[start:])
+            rejected = parser.malformed
+    else:
+        try:
+            elements = [_decode_at(text, start)]
+            rejected = 0
+        except ValueError:
+            return [], 1
+
+    questions = []
+    for element in elements:
+        question = validate_question(element, difficulty)
+        if question is None:
+            rejected += 1
+        else:
+            questions.append(question)
+    return questions, rejected
+
+
+def parse_questions(text: str, difficulty: Optional[str] = None) -> Tuple[List[dict], int]:
+    """Salvage every valid question from a model response.
+
+    Accepts a JSON array or a single object. Returns the valid, normalized
+    questions and how many elements were rejected.
+    """
+    rejected = 1
+    for start in _candidate_starts(text):
+        questions, rejected = _parse_questions_at(text, start, difficulty)
+        if questions:
+            return questions, rejected
+    return [], rejected
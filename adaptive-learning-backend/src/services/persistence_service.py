@@ -10,7 +10,9 @@ class PersistenceService:
         self.db = self.client[settings.mongodb_db]
         self.mastery_collection = self.db["mastery_levels"]
         self.model_collection = self.db["model_states"]
+        self.checkpoint_collection = self.db["model_checkpoints"]
         self.users_collection = self.db["users"]
+        self.response_collection = self.db["gemini_responses"]
 
     async def save_mastery_level(self, student_id, mastery_data):
         await self.mastery_collection.update_one(
@@ -34,6 +36,45 @@ class PersistenceService:
         model_data = await self.model_collection.find_one({"model_id": model_id})
         return model_data['state'] if model_data else None
 
+    async def save_model_checkpoint(self, model_id, version, blob, metadata):
+        await self.checkpoint_collection.update_one(
+            {"model_id": model_id, "version": version},
+            {"$set": {"blob": blob, **metadata}},
+            upsert=True
+        )
+
+    async def load_model_checkpoint(self, model_id, version):
+        checkpoint = await self.checkpoint_collection.find_one({"model_id": model_id, "version": version})
+        return bytes(checkpoint["blob"]) if checkpoint else None
+
+    async def list_model_checkpoints(self, model_id):
+        cursor = self.checkpoint_collection.find({"model_id": model_id}, {"version": 1}).sort("version", 1)
+        return [document["version"] async for document in cursor]
+
+    async def delete_model_checkpoint(self, model_id, version):
+        await self.checkpoint_collection.delete_one({"model_id": model_id, "version": version})
+
+    async def ensure_checkpoint_indexes(self):
+        await self.checkpoint_collection.create_index([("model_id", 1), ("version", 1)], unique=True)
+
+    async def save_response(self, key, value, expires_at):
+        await self.response_collection.update_one(
+            {"key": key},
+            {"$set": {"value": value, "expires_at": expires_at}},
+            upsert=True
+        )
+
+    async def load_response(self, key):
+        return await self.response_collection.find_one({"key": key})
+
+    async def delete_response(self, key):
+        await self.response_collection.delete_one({"key": key})
+
+    async def ensure_response_indexes(self):
+        await self.response_collection.create_index("key", unique=True)
+        # MongoDB removes documents once expires_at has passed
+        await self.response_collection.create_index("expires_at", expireAfterSeconds=0)
+
     def close(self):
         self.client.close()
 
@@ -0,0 +1,539 @@
+import hashlib
+import string
+from typing import Any, Dict, List
+from src.services.rate_limiter import estimate_tokens
+
+# Grade-level wording shared by all question prompts
+GRADE_DESCRIPTIONS = {
+    1: "very basic, suitable for first graders (ages 6-7)",
+    2: "basic, suitable for second graders (ages 7-8)",
+    3: "intermediate, suitable for third graders (ages 8-9)",
+    4: "moderately challenging, suitable for fourth graders (ages 9-10)",
+    5: "challenging, suitable for fifth graders (ages 10-11)"
+}
+DEFAULT_GRADE_DESCRIPTION = "age-appropriate for elementary students"
+
+SUBJECTS = ["math", "science"]
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+# Detailed per-difficulty style guides used by the single-question prompt
+QUESTION_STYLE_INSTRUCTIONS = {
+    "math": {
+        "easy": """
+QUESTION FORMAT FOR EASY MATH:
+- Use DIRECT, STRAIGHTFORWARD arithmetic format
+- For multiplication: Single-digit × single-digit (use VARIED numbers from 2-9) OR Double-digit with simple numbers (one number 10-20, other 2-9)
+- For addition: Simple direct addition (numbers from 5-50)
+- For subtraction: Simple direct subtraction (numbers from 5-50)
+- For division: Simple division with whole number results
+- Keep it simple and clear - NO word problems, NO complex scenarios
+- Just the basic arithmetic operation being tested directly
+- IMPORTANT: Choose RANDOM numbers each time, never repeat the same numbers
+- ONLY MATH - NO science concepts mixed in!""",
+
+        "medium": """
+QUESTION FORMAT FOR MEDIUM MATH:
+- Use SIMPLE CONTEXTUAL WORD PROBLEMS with easy arithmetic
+- Simple word problems with EASY single-digit operations
+- Use creative scenarios: children collecting items, arranging objects, sharing things
+- Keep numbers SIMPLE: single digits (2-9) for multiplication
+- Use DIFFERENT numbers each time - avoid repeating combinations
+- Use relatable, everyday scenarios
+- One-step problems with context
+- IMPORTANT: Create UNIQUE scenarios, not generic "bags with items" - be creative!
+- ONLY MATH - NO science concepts mixed in!""",
+
+        "hard": """
+QUESTION FORMAT FOR HARD MATH:
+- Use WORD PROBLEMS with slightly harder arithmetic
+- Word problems with moderate operations
+- For multiplication: One number single-digit (5-9), other small double-digit (10-20), results under 150
+- Use VARIED scenarios: shops, farms, schools, parties, sports
+- Use realistic scenarios that a child can visualize
+- ONE-STEP problems only, not multi-step
+- IMPORTANT: Use DIFFERENT number combinations each time - vary both numbers and context
+- ONLY MATH - NO science concepts mixed in!"""
+    },
+    "science": {
+        "easy": """
+QUESTION FORMAT FOR EASY SCIENCE:
+- Simple factual questions about basic science concepts
+- Focus on: plants, animals, weather, human body, water, air, earth, sun, moon
+- Direct questions like "What do plants need to grow?" or "Where do fish live?"
+- NO MATH, NO NUMBERS, NO CALCULATIONS
+- Keep it simple and clear - just testing basic science knowledge
+- Use age-appropriate vocabulary
+- Focus on observable facts and everyday science""",
+
+        "medium": """
+QUESTION FORMAT FOR MEDIUM SCIENCE:
+- Scenario-based questions about science concepts
+- Topics: plants, animals, weather, ecosystems, life cycles, simple machines, states of matter
+- Use relatable scenarios: "A plant in the garden...", "When you see clouds..."
+- Questions that require simple reasoning and understanding
+- NO MATH, NO NUMBERS, NO CALCULATIONS
+- One-step reasoning problems
+- Connect to real-world observations""",
+
+        "hard": """
+QUESTION FORMAT FOR HARD SCIENCE:
+- Questions requiring deeper understanding and reasoning
+- Topics: food chains, adaptation, habitats, photosynthesis, water cycle, energy, simple experiments
+- Scenarios that require cause-and-effect thinking
+- "Why" and "How" questions that test understanding
+- NO MATH, NO NUMBERS, NO CALCULATIONS
+- Use realistic scenarios children can understand
+- Test conceptual understanding, not memorization"""
+    }
+}
+
+# Compact per-difficulty style guides used by the batch and mixed-difficulty prompts
+BATCH_STYLE_INSTRUCTIONS = {
+    "math": {
+        "easy": "MATH: Use DIRECT arithmetic. For multiplication: single-digit × single-digit (RANDOM numbers 2-9) OR double-digit (one number 10-20, other 2-9). NO word problems. Use DIFFERENT numbers each time. ONLY MATH - NO science!",
+        "medium": "MATH: Use SIMPLE word problems with EASY single-digit operations. Both numbers 2-9 for multiplication. Create UNIQUE scenarios - vary context, names, objects. Use DIFFERENT number combinations. ONLY MATH - NO science!",
+        "hard": "MATH: Use word problems with moderate multiplication. One number 5-9, other 10-20. Results under 150. ONE-STEP problems. Create VARIED scenarios and DIFFERENT numbers. ONLY MATH - NO science!"
+    },
+    "science": {
+        "easy": "SCIENCE: Simple factual questions about basic science concepts (plants, animals, weather, human body, water, air). Direct questions. NO MATH, NO NUMBERS, NO CALCULATIONS. Just testing science knowledge.",
+        "medium": "SCIENCE: Scenario-based questions about science (ecosystems, life cycles, simple machines, states of matter). Use relatable scenarios. Simple reasoning. NO MATH, NO NUMBERS. Connect to real-world observations.",
+        "hard": "SCIENCE: Questions requiring deeper understanding (food chains, adaptation, photosynthesis, water cycle, energy). Cause-and-effect thinking. 'Why' and 'How' questions. NO MATH, NO NUMBERS. Test conceptual understanding."
+    }
+}
+
+# Suggestion lists that push word problems towards varied names and objects
+QUESTION_NAME_OPTIONS = [
+    ["Sarah", "Tom", "Maria", "Alex"],
+    ["Emma", "Jack", "Lily", "Noah"],
+    ["Sophia", "Oliver", "Ava", "Liam"]
+]
+QUESTION_OBJECT_OPTIONS = [
+    ["apples", "oranges", "bananas", "mangoes"],
+    ["pencils", "erasers", "crayons", "markers"],
+    ["cookies", "candies", "cupcakes", "donuts"],
+    ["books", "toys", "balls", "cards"]
+]
+BATCH_NAME_OPTIONS = [
+    ["Sarah", "Tom", "Maria", "Alex", "Emily"],
+    ["Jack", "Lily", "Noah", "Emma", "Oliver"],
+    ["Sophia", "Liam", "Ava", "Lucas", "Mia"],
+    ["Ben", "Zoe", "Ryan", "Chloe", "Max"]
+]
+BATCH_OBJECT_OPTIONS = [
+    ["apples", "oranges", "bananas", "grapes", "mangoes"],
+    ["pencils", "erasers", "books", "notebooks", "pens"],
+    ["cookies", "candies", "cupcakes", "brownies", "donuts"],
+    ["toys", "balls", "cards", "puzzles", "games"],
+    ["flowers", "trees", "plants", "seeds", "leaves"]
+]
+
+SUBJECT_RULES = {
+    "math": "PURE MATH with numbers and operations - NO science concepts!",
+    "science": "PURE SCIENCE with concepts - NO math or numbers!"
+}
+
+# Templates below use str.format syntax; literal JSON braces are doubled.
+# Static pieces (style guides, subject rules) are spliced in at import, so
+# rendering only substitutes the per-request values.
+
+EXPLANATION_TEMPLATE = """You are a friendly, encouraging tutor helping a student who just answered incorrectly.
+
+QUESTION: {question}
+STUDENT CHOSE: {student_answer}
+CORRECT ANSWER: {correct_answer}
+TOPIC: {concepts}
+
+Generate a personalized, engaging explanation that is HIGHLY RELEVANT to this specific question. Be dynamic and creative!
+
+Provide exactly this JSON format:
+{{
+    "encouragement": "Write 1 warm, specific encouragement referencing their attempt",
+    "explanation": "Write 2-3 sentences explaining WHY '{correct_answer}' is correct for THIS specific question. Be educational and clear.",
+    "example": "Give a vivid, relatable real-world example or analogy that directly relates to '{correct_answer}' and helps visualize or understand it better. Make it memorable!",
+    "tip": "Share 1 practical tip or memory trick specifically for remembering or understanding this concept"
+}}
+
+CRITICAL: Make the example HIGHLY SPECIFIC and RELEVANT to the question. No generic phrases like "Think about real-life situations" - give an ACTUAL concrete example!
+
+Example for "What do we breathe?":
+- Good: "Every time you take a breath, you're pulling in air which contains oxygen - the same oxygen that keeps a candle burning! Your body uses oxygen just like fire does, to create energy."
+- Bad: "Think about how this applies to real-life situations you encounter every day!"
+
+Now generate for the actual question above:"""
+
+QUESTION_GUIDANCE = {
+    # EASY = NO word problems, just direct arithmetic
+    ("math", "easy"): """MATH SUBJECT REQUIREMENTS FOR EASY:
+- This is a DIRECT ARITHMETIC question about {topic}
+- Use ONLY the arithmetic operation - NO stories, NO scenarios, NO context
+- Example format: "What is 5 × 3?" or "Calculate 12 + 8"
+- Use VARIED numbers: {numbers[0]}, {numbers[1]}, {numbers[2]}, {numbers[3]} (choose different ones)
+- All answer options should be NUMBERS
+- ABSOLUTELY NO WORD PROBLEMS - just the math operation
+- DO NOT mix in science concepts - keep it pure math!
+
+HINT REQUIREMENT FOR EASY MATH:
+- Provide a tip or strategy (e.g., "Break it down: 12 = 10 + 2")
+- Keep hints SHORT and CLEAR (1-2 sentences max)""",
+    # MEDIUM/HARD = Word problems allowed
+    ("math", "word"): """MATH SUBJECT REQUIREMENTS:
+- This is a MATH question about {topic}
+- Use NUMBERS and ARITHMETIC OPERATIONS in a word problem
+- Use VARIED numbers: {numbers[0]}, {numbers[1]}, {numbers[2]}, {numbers[3]} (choose different ones)
+- Use DIFFERENT names: {names[0]}, {names[1]}, {names[2]}, or create new ones
+- Use DIFFERENT objects/items: {objects[0]}, {objects[1]}, {objects[2]}, or invent new ones
+- Create UNIQUE scenarios (not just "bags with apples" or "tables with chairs")
+- All answer options should be NUMBERS
+- DO NOT mix in science concepts - keep it pure math!
+
+HINT REQUIREMENT FOR MATH:
+- For word problems: show how to convert to simple arithmetic (e.g., "5 bags with 3 apples each" → "Think: 5 × 3 = ?")
+- Keep hints SHORT and CLEAR (1-2 sentences max)""",
+    ("science", "any"): """SCIENCE SUBJECT REQUIREMENTS:
+- This is a PURE SCIENCE question about {topic}
+- Focus on scientific concepts, facts, and understanding
+- NO MATH, NO NUMBERS, NO CALCULATIONS at all!
+- Use science vocabulary appropriate for Class {class_level}
+- Answer options should be science concepts/facts, NOT numbers
+- Make it about real-world science observations
+- DO NOT mix in math operations - keep it pure science!
+
+HINT REQUIREMENT FOR SCIENCE:
+- Give a memory aid or key concept hint
+- Help them recall the scientific principle
+- Connect to real-world examples they can observe
+- Keep hints SHORT and CLEAR (1-2 sentences max)"""
+}
+
+QUESTION_TEMPLATE = """Generate a UNIQUE and CREATIVE multiple-choice question about {topic} at {difficulty} difficulty level for a Class {class_level} student ({grade_desc}).
+
+UNIQUENESS REQUIREMENT - CRITICAL:
+- Make this question COMPLETELY DIFFERENT from typical examples shown
+- Create UNIQUE scenarios
+- Unique ID for this question: {unique_id}
+- DO NOT repeat the example questions shown in the format guide - CREATE NEW ONES!
+
+CRITICAL REQUIREMENTS:
+- The question MUST be directly about {topic} only
+- Stay 100% focused on {topic} concepts
+- Generate DIVERSE questions - avoid repetitive patterns
+
+<<subject_guidance>>
+
+<<style_guide>>
+
+Format the response as a JSON object with this structure:
+{{
+    "id": <random_number>,
+    "question": "<question_text>",
+    "options": [
+        {{"text": "<option1>", "correct": true}},
+        {{"text": "<option2>", "correct": false}},
+        {{"text": "<option3>", "correct": false}},
+        {{"text": "<option4>", "correct": false}}
+    ],
+    "difficulty": "{difficulty}",
+    "explanation": "<brief_explanation>",
+    "hint": "<simplified_hint_that_helps_solve>",
+    "conceptTags": ["{topic}"]
+}}
+
+Make sure:
+- Follow the question format style for {difficulty} difficulty EXACTLY as described above
+- The question is DIRECTLY about {topic} - no unrelated topics
+- <<subject_rule>>
+- The question is appropriate for a Class {class_level} student
+- Use vocabulary and concepts suitable for their grade level
+- Exactly ONE option is marked as correct
+- All options are plausible but clearly distinguishable
+- The explanation is helpful, encouraging, and uses simple language
+- The hint simplifies the problem without giving away the answer
+"""
+
+BATCH_GUIDANCE = {
+    ("math", "easy"): """MATH SUBJECT REQUIREMENTS FOR BATCH (EASY):
+- These are DIRECT ARITHMETIC questions about {topic}
+- Use ONLY the arithmetic operation - NO stories, NO scenarios, NO context
+- Example format: "What is 5 × 3?" or "Calculate 12 + 8"
+- Suggested number sets: {number_sets}
+- DO NOT repeat numbers across questions
+- All answer options should be NUMBERS
+- ABSOLUTELY NO WORD PROBLEMS - just the math operation
+- DO NOT mix in science concepts - keep it pure math!
+
+HINT REQUIREMENT FOR EASY MATH QUESTIONS:
+- Provide a tip or strategy (e.g., "Break it down: 12 = 10 + 2")
+- Keep hints SHORT and CLEAR (1-2 sentences max)""",
+    ("math", "word"): """MATH SUBJECT REQUIREMENTS FOR BATCH:
+- These are MATH questions about {topic}
+- Use NUMBERS and ARITHMETIC OPERATIONS in word problems
+- Suggested number sets: {number_sets}
+- Suggested names: {names}
+- Suggested objects: {objects}
+- DO NOT repeat numbers, names, objects, or scenarios across questions
+- All answer options should be NUMBERS
+- DO NOT mix in science concepts - keep it pure math!
+
+HINT REQUIREMENT FOR MATH QUESTIONS:
+- For word problems: show how to convert to simple arithmetic (e.g., "5 bags with 3 apples each" → "Think: 5 × 3 = ?")
+- Keep hints SHORT and CLEAR (1-2 sentences max)""",
+    ("science", "any"): """SCIENCE SUBJECT REQUIREMENTS FOR BATCH:
+- These are PURE SCIENCE questions about {topic}
+- Focus on scientific concepts, facts, and understanding
+- NO MATH, NO NUMBERS, NO CALCULATIONS at all!
+- Use science vocabulary appropriate for Class {class_level}
+- Answer options should be science concepts/facts, NOT numbers
+- Make questions about real-world science observations
+- DO NOT mix in math operations - keep it pure science!
+
+HINT REQUIREMENT FOR SCIENCE QUESTIONS:
+- Give a memory aid or key concept hint
+- Help them recall the scientific principle
+- Connect to real-world examples they can observe
+- Keep hints SHORT and CLEAR (1-2 sentences max)"""
+}
+
+BATCH_TEMPLATE = """Generate {count} COMPLETELY DIFFERENT and UNIQUE multiple-choice questions about "{topic}" at {difficulty} difficulty level for Class {class_level} students ({grade_desc}).
+
+CRITICAL UNIQUENESS REQUIREMENTS:
+- Each question MUST be COMPLETELY DIFFERENT from the others
+- Use DIFFERENT contexts for each question
+- Batch ID: {batch_id}
+- CREATE UNIQUE SCENARIOS - NOT JUST THE EXAMPLES!
+
+<<subject_guidance>>
+
+QUESTION FORMAT REQUIREMENT:
+<<style_guide>>
+
+Each question should be in this JSON format:
+[{{
+    "id": <unique_number>,
+    "question": "<question_text>",
+    "options": [
+        {{"text": "<option1>", "correct": true}},
+        {{"text": "<option2>", "correct": false}},
+        {{"text": "<option3>", "correct": false}},
+        {{"text": "<option4>", "correct": false}}
+    ],
+    "difficulty": "{difficulty}",
+    "explanation": "<brief_explanation>",
+    "hint": "<simplified_hint_that_helps_solve>",
+    "conceptTags": ["{topic}"]
+}}]
+
+Requirements:
+- Generate EXACTLY {count} different questions ALL about {topic}
+- <<subject_rule>>
+- Each question appropriate for Class {class_level} students - use simple language and grade-appropriate concepts
+- Use vocabulary suitable for their grade level
+- Questions should be challenging but achievable for their age
+- Each question must have exactly ONE correct answer
+- Make questions engaging and varied in style
+- Explanations should be encouraging and use simple language
+- Each question MUST have a helpful hint that simplifies without revealing the answer
+- ALL questions must stay on the topic of {topic} - no unrelated content
+
+Return ONLY the JSON array, no additional text.
+"""
+
+MIX_GUIDANCE = {
+    "math": """MATH SUBJECT REQUIREMENTS FOR BATCH:
+- These are MATH questions about {topic}
+- EASY questions are DIRECT ARITHMETIC only (e.g. "What is 5 × 3?") - NO word problems
+- MEDIUM and HARD questions are word problems
+- Suggested number sets: {number_sets}
+- Suggested names: {names}
+- Suggested objects: {objects}
+- DO NOT repeat numbers, names, objects, or scenarios across questions
+- All answer options should be NUMBERS
+- DO NOT mix in science concepts - keep it pure math!
+
+HINT REQUIREMENT FOR MATH QUESTIONS:
+- For easy questions: provide a tip or strategy (e.g., "Break it down: 12 = 10 + 2")
+- For word problems: show how to convert to simple arithmetic (e.g., "5 bags with 3 apples each" → "Think: 5 × 3 = ?")
+- Keep hints SHORT and CLEAR (1-2 sentences max)""",
+    "science": """SCIENCE SUBJECT REQUIREMENTS FOR BATCH:
+- These are PURE SCIENCE questions about {topic}
+- Focus on scientific concepts, facts, and understanding
+- NO MATH, NO NUMBERS, NO CALCULATIONS at all!
+- Use science vocabulary appropriate for Class {class_level}
+- Answer options should be science concepts/facts, NOT numbers
+- DO NOT mix in math operations - keep it pure science!
+
+HINT REQUIREMENT FOR SCIENCE QUESTIONS:
+- Give a memory aid or key concept hint
+- Connect to real-world examples they can observe
+- Keep hints SHORT and CLEAR (1-2 sentences max)"""
+}
+
+MIX_TEMPLATE = """Generate {total} COMPLETELY DIFFERENT and UNIQUE multiple-choice questions about "{topic}" for Class {class_level} students ({grade_desc}).
+
+DIFFICULTY MIX - follow it EXACTLY:
+{mix_lines}
+
+CRITICAL UNIQUENESS REQUIREMENTS:
+- Each question MUST be COMPLETELY DIFFERENT from the others
+- Use DIFFERENT contexts for each question
+- Batch ID: {batch_id}
+
+<<subject_guidance>>
+
+Each question should be in this JSON format:
+[{{
+    "id": <unique_number>,
+    "question": "<question_text>",
+    "options": [
+        {{"text": "<option1>", "correct": true}},
+        {{"text": "<option2>", "correct": false}},
+        {{"text": "<option3>", "correct": false}},
+        {{"text": "<option4>", "correct": false}}
+    ],
+    "difficulty": "<easy|medium|hard>",
+    "explanation": "<brief_explanation>",
+    "hint": "<simplified_hint_that_helps_solve>",
+    "conceptTags": ["{topic}"]
+}}]
+
+Requirements:
+- Generate EXACTLY {total} questions ALL about {topic}, ordered from easiest to hardest
+- Set each question's "difficulty" field to the level it was written for
+- Each question must have exactly ONE correct answer
+- Each question MUST have a helpful hint that simplifies without revealing the answer
+
+Return ONLY the JSON array, no additional text.
+"""
+
+# One line of the mix prompt per difficulty; only the count is filled per request
+MIX_LINE_TEMPLATE = '- EXACTLY {{count}} question(s) with "difficulty": "{difficulty}" - {style}'
+
+
+class PromptTemplate:
+    """A prompt compiled once at import; rendering is a single str.format_map call.
+
+    Tracks how large the rendered prompts are, since prompt tokens drive both
+    latency and cost of each Gemini call.
+    """
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        # Content hash of the template; stored responses are keyed by it, so editing a prompt invalidates them
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        formatter = string.Formatter()
+        parsed = list(formatter.parse(text))
+        self.fields = sorted({field.split("[")[0].split(".")[0] for _, field, _, _ in parsed if field})
+        static_text = "".join(literal for literal, _, _, _ in parsed)
+        self.static_chars = len(static_text)
+        self.static_tokens = estimate_tokens(static_text)
+        self.renders = 0
+        self.total_chars = 0
+        self.total_tokens = 0
+        self.max_chars = 0
+
+    def render(self, **values: Any) -> str:
+        prompt = self.text.format_map(values)
+        size = len(prompt)
+        self.renders += 1
+        self.total_chars += size
+        self.total_tokens += estimate_tokens(prompt)
+        if size > self.max_chars:
+            self.max_chars = size
+        return prompt
+
+    def stats(self) -> Dict[str, Any]:
+        renders = self.renders or 1
+        return {
+            "renders": self.renders,
+            "staticChars": self.static_chars,
+            "staticTokens": self.static_tokens,
+            "avgChars": round(self.total_chars / renders),
+            "maxChars": self.max_chars,
+            "avgTokens": round(self.total_tokens / renders)
+        }
+
+
+class PromptRegistry:
+    """Named prompt templates, built once at import"""
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, name: str, text: str) -> PromptTemplate:
+        template = PromptTemplate(name, text)
+        self._templates[name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, **values: Any) -> str:
+        return self._templates[name].render(**values)
+
+    def version(self, *names: str) -> str:
+        """Version of one template, or a combined version that changes when any of `names` does"""
+        if len(names) == 1:
+            return self._templates[names[0]].version
+        combined = ":".join(self._templates[name].version for name in names)
+        return hashlib.sha256(combined.encode("utf-8")).hexdigest()[:12]
+
+    def names(self) -> List[str]:
+        return list(self._templates)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: template.stats() for name, template in self._templates.items()}
+
+
+def style_difficulty(difficulty: str) -> str:
+    """Difficulty whose style guide applies; unknown levels use the medium guide"""
+    return difficulty if difficulty in DIFFICULTIES else "medium"
+
+
+def question_template_name(kind: str, subject_type: str, difficulty: str) -> str:
+    subject = "math" if subject_type == "math" else "science"
+    return f"{kind}/{subject}/{style_difficulty(difficulty)}"
+
+
+def _guidance(table: Dict, subject: str, difficulty: str) -> str:
+    if subject == "science":
+        return table[("science", "any")]
+    return table[("math", "easy" if difficulty == "easy" else "word")]
+
+
+def _build_registry() -> PromptRegistry:
+    registry = PromptRegistry()
+    registry.register("explanation", EXPLANATION_TEMPLATE)
+    for subject in SUBJECTS:
+        for difficulty in DIFFICULTIES:
+            registry.register(f"question/{subject}/{difficulty}", QUESTION_TEMPLATE
+                              .replace("<<subject_guidance>>", _guidance(QUESTION_GUIDANCE, subject, difficulty))
+                              .replace("<<style_guide>>", QUESTION_STYLE_INSTRUCTIONS[subject][difficulty])
+                              .replace("<<subject_rule>>", SUBJECT_RULES[subject]))
+            registry.register(f"batch/{subject}/{difficulty}", BATCH_TEMPLATE
+                              .replace("<<subject_guidance>>", _guidance(BATCH_GUIDANCE, subject, difficulty))
+                              .replace("<<style_guide>>", BATCH_STYLE_INSTRUCTIONS[subject][difficulty])
+                              .replace("<<subject_rule>>", SUBJECT_RULES[subject]))
+        registry.register(f"mix/{subject}", MIX_TEMPLATE.replace("<<subject_guidance>>", MIX_GUIDANCE[subject]))
+    return registry
+
+
+PROMPTS = _build_registry()
+
+# Pre-rendered mix lines per subject and difficulty, leaving only {count}
+MIX_LINES = {
+    subject: {
+        difficulty: MIX_LINE_TEMPLATE.format(difficulty=difficulty, style=BATCH_STYLE_INSTRUCTIONS[subject][difficulty])
+        for difficulty in DIFFICULTIES
+    }
+    for subject in SUBJECTS
+}
+
+
+def render_mix_lines(subject_type: str, mix: Dict[str, int]) -> str:
+    subject = "math" if subject_type == "math" else "science"
+    lines = MIX_LINES[subject]
+    return "\n".join(
+        lines[difficulty].format(count=count) if difficulty in lines
+        else MIX_LINE_TEMPLATE.format(difficulty=difficulty, style=BATCH_STYLE_INSTRUCTIONS[subject]["medium"]).format(count=count)
+        for difficulty, count in mix.items()
+    )
@@ -0,0 +1,141 @@
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from src.config import settings
+from src.services.response_cache import normalize_text
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+# Scope used for questions generated into shared pools rather than served to a student
+GENERATED_SCOPE = "*"
+
+
+def _hash(kind: bytes, text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(kind + text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def question_fingerprints(question: Dict[str, Any]) -> Tuple[int, Optional[int]]:
+    """(normalized text hash, operand signature hash) for a question.
+
+    The operand signature is the sorted numbers in the question plus the correct
+    answer, so "What is 7 × 8?" and "Tom has 8 bags of 7 apples" collide. It is
+    None for questions without numbers (e.g. science).
+    """
+    text = str(question.get("question", ""))
+    text_hash = _hash(b"text:", _PUNCTUATION.sub("", normalize_text(text)))
+    numbers = _NUMBER.findall(text)
+    if not numbers:
+        return text_hash, None
+    correct = next((option.get("text") for option in question.get("options", []) if isinstance(option, dict) and option.get("correct")), "")
+    signature = ",".join(sorted(numbers, key=float)) + "=" + normalize_text(correct)
+    return text_hash, _hash(b"ops:", signature)
+
+
+class _Scope:
+    """Recent questions of one scope: text hash -> operand hash, plus operand hash refcounts"""
+
+    __slots__ = ("questions", "operands")
+
+    def __init__(self):
+        self.questions: "OrderedDict[int, Optional[int]]" = OrderedDict()
+        self.operands: Dict[int, int] = {}
+
+    def contains(self, text_hash: int, operand_hash: Optional[int]) -> bool:
+        return text_hash in self.questions or (operand_hash is not None and operand_hash in self.operands)
+
+    def add(self, text_hash: int, operand_hash: Optional[int], limit: int) -> None:
+        if text_hash in self.questions:
+            self.questions.move_to_end(text_hash)
+            return
+        self.questions[text_hash] = operand_hash
+        if operand_hash is not None:
+            self.operands[operand_hash] = self.operands.get(operand_hash, 0) + 1
+        while len(self.questions) > limit:
+            _, oldest_operand_hash = self.questions.popitem(last=False)
+            if oldest_operand_hash is not None:
+                remaining = self.operands.pop(oldest_operand_hash) - 1
+                if remaining:
+                    self.operands[oldest_operand_hash] = remaining
+
+
+def dedupe_questions(questions: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Drop questions repeating an earlier one in the same list; returns (unique, dropped)"""
+    seen = _Scope()
+    unique = []
+    for question in questions:
+        text_hash, operand_hash = question_fingerprints(question)
+        if not seen.contains(text_hash, operand_hash):
+            seen.add(text_hash, operand_hash, len(questions))
+            unique.append(question)
+    return unique, len(questions) - len(unique)
+
+
+class FingerprintIndex:
+    """Bounded memory of question fingerprints per (student, topic).
+
+    Each scope keeps its most recent `max_per_scope` questions and the least
+    recently used scopes are dropped beyond `max_scopes`. Lookups and inserts
+    are dict operations, so checking a question is O(1).
+    """
+
+    def __init__(self, max_scopes: int = None, max_per_scope: int = None):
+        self.max_scopes = max_scopes if max_scopes is not None else settings.fingerprint_max_scopes
+        self.max_per_scope = max_per_scope if max_per_scope is not None else settings.fingerprint_max_per_scope
+        self._scopes: "OrderedDict[Tuple[str, str], _Scope]" = OrderedDict()
+        self.checked = 0
+        self.rejected = 0
+
+    @staticmethod
+    def make_scope(student_id: Hashable, topic: str) -> Tuple[str, str]:
+        return (str(student_id), normalize_text(topic))
+
+    def _scope(self, student_id: Hashable, topic: str, create: bool) -> Optional[_Scope]:
+        key = self.make_scope(student_id, topic)
+        scope = self._scopes.get(key)
+        if scope is not None:
+            self._scopes.move_to_end(key)
+        elif create:
+            scope = self._scopes[key] = _Scope()
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+        return scope
+
+    def contains(self, student_id: Hashable, topic: str, question: Dict[str, Any]) -> bool:
+        scope = self._scope(student_id, topic, create=False)
+        return scope is not None and scope.contains(*question_fingerprints(question))
+
+    def add(self, student_id: Hashable, topic: str, question: Dict[str, Any]) -> None:
+        self._scope(student_id, topic, create=True).add(*question_fingerprints(question), self.max_per_scope)
+
+    def filter_new(self, student_id: Hashable, topic: str, questions: Iterable[Dict[str, Any]], record: bool = True) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Split questions into (new, duplicates), also catching repeats within `questions`.
+
+        New questions are recorded for the scope unless `record` is False.
+        """
+        scope = self._scope(student_id, topic, create=record)
+        batch = _Scope()
+        fresh, duplicates = [], []
+        for question in questions:
+            self.checked += 1
+            text_hash, operand_hash = question_fingerprints(question)
+            if (scope is not None and scope.contains(text_hash, operand_hash)) or batch.contains(text_hash, operand_hash):
+                self.rejected += 1
+                duplicates.append(question)
+                continue
+            batch.add(text_hash, operand_hash, self.max_per_scope)
+            fresh.append(question)
+            if record:
+                scope.add(text_hash, operand_hash, self.max_per_scope)
+        return fresh, duplicates
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "scopes": len(self._scopes),
+            "questions": sum(len(scope.questions) for scope in self._scopes.values()),
+            "maxScopes": self.max_scopes,
+            "maxPerScope": self.max_per_scope,
+            "checked": self.checked,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,226 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+from src.config import settings
+from src.services.question_fingerprints import FingerprintIndex, GENERATED_SCOPE
+
+# (topic, difficulty, class_level, subject_type) - the same parameters generate_question_batch takes
+PoolKey = Tuple[str, str, int, str]
+
+
+class QuestionPool:
+    """Inventory of pre-generated questions, refilled in the background.
+
+    Endpoints take questions from the pool instantly; live generation only runs
+    for the shortfall when a pool has run dry. Any pool below the low-water mark
+    is topped back up to the target depth by a background task.
+
+    Questions are fingerprinted: refills drop repeats of recently generated
+    questions, and when a student id is given that student is not served a
+    question they have already seen.
+    """
+
+    def __init__(self, gemini_service, low_water: int = None, target: int = None, max_keys: int = None, refill_interval: float = None, fingerprints: FingerprintIndex = None):
+        self.gemini_service = gemini_service
+        self.fingerprints = fingerprints if fingerprints is not None else FingerprintIndex()
+        self.low_water = low_water if low_water is not None else settings.question_pool_low_water
+        self.target = target if target is not None else settings.question_pool_target
+        self.max_keys = max_keys if max_keys is not None else settings.question_pool_max_keys
+        self.refill_interval = refill_interval if refill_interval is not None else settings.question_pool_refill_interval
+        self._pools: "OrderedDict[PoolKey, deque]" = OrderedDict()
+        self._stats: Dict[PoolKey, Dict[str, float]] = {}
+        self._refill_needed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def make_key(topic: str, difficulty: str, class_level: int, subject_type: str) -> PoolKey:
+        return (topic, difficulty, int(class_level), subject_type)
+
+    def register(self, topic: str, difficulty: str, class_level: int = 5, subject_type: str = 'math') -> PoolKey:
+        """Start tracking a pool so the background task keeps it stocked"""
+        key = self.make_key(topic, difficulty, class_level, subject_type)
+        if key in self._pools:
+            self._pools.move_to_end(key)
+        else:
+            self._pools[key] = deque()
+            self._stats[key] = {"served": 0, "liveGenerated": 0, "refills": 0, "duplicatesRejected": 0, "lastRefillSeconds": 0.0, "totalRefillSeconds": 0.0}
+            while len(self._pools) > self.max_keys:
+                stale, _ = self._pools.popitem(last=False)
+                self._stats.pop(stale, None)
+        return key
+
+    def depth(self, topic: str, difficulty: str, class_level: int = 5, subject_type: str = 'math') -> int:
+        pool = self._pools.get(self.make_key(topic, difficulty, class_level, subject_type))
+        return len(pool) if pool is not None else 0
+
+    async def take(self, topic: str, difficulty: str, count: int, class_level: int = 5, subject_type: str = 'math', student_id: Optional[str] = None) -> List[dict]:
+        """Return `count` questions, generating live only for what the pool cannot supply"""
+        return await self.take_mix(topic, {difficulty: count}, class_level, subject_type, student_id)
+
+    async def take_mix(self, topic: str, mix: Dict[str, int], class_level: int = 5, subject_type: str = 'math', student_id: Optional[str] = None) -> List[dict]:
+        """Return questions for a difficulty mix such as {"easy": 2, "medium": 2, "hard": 1}.
+
+        Shortfalls across all difficulties are generated live with one mixed call.
+        Live questions the student has already seen are replaced by requesting
+        only that many again, once; after that a repeat beats an empty slot.
+        Questions are returned in the order of `mix`.
+        """
+        by_difficulty, shortfall = self.take_available(topic, mix, class_level, subject_type, student_id)
+        repeats: Dict[str, List[dict]] = {difficulty: [] for difficulty in mix}
+        for _ in range(2):
+            if not shortfall:
+                break
+            print(f"Question pool empty for {topic} {shortfall}, generating live")
+            live_questions = await self.gemini_service.generate_question_mix(topic, shortfall, class_level, subject_type)
+            for difficulty in shortfall:
+                candidates = [question for question in live_questions if question.get("difficulty") == difficulty]
+                if student_id is not None:
+                    # Only what is served counts as seen; surplus candidates may still reach the student later
+                    candidates, duplicates = self.fingerprints.filter_new(student_id, topic, candidates, record=False)
+                    repeats[difficulty].extend(duplicates)
+                for question in candidates[:mix[difficulty] - len(by_difficulty[difficulty])]:
+                    by_difficulty[difficulty].append(question)
+                    if student_id is not None:
+                        self.fingerprints.add(student_id, topic, question)
+                    self.record_live(topic, difficulty, class_level, subject_type)
+            shortfall = {difficulty: mix[difficulty] - len(by_difficulty[difficulty]) for difficulty in mix if len(by_difficulty[difficulty]) < mix[difficulty]}
+        for difficulty, missing in shortfall.items():
+            by_difficulty[difficulty].extend(repeats[difficulty][:missing])
+        return [question for difficulty in mix for question in by_difficulty[difficulty]]
+
+    def take_available(self, topic: str, mix: Dict[str, int], class_level: int = 5, subject_type: str = 'math', student_id: Optional[str] = None) -> Tuple[Dict[str, List[dict]], Dict[str, int]]:
+        """Take what the pools hold for `mix` without generating anything.
+
+        Returns the questions per difficulty and the shortfall still to generate,
+        and wakes the refill task for any pool left below the low-water mark.
+        Pooled questions the student has already seen stay in the pool for others.
+        """
+        by_difficulty: Dict[str, List[dict]] = {}
+        shortfall: Dict[str, int] = {}
+        for difficulty, count in mix.items():
+            key = self.register(topic, difficulty, class_level, subject_type)
+            pool = self._pools[key]
+            taken = []
+            skipped = []
+            while pool and len(taken) < count:
+                question = pool.popleft()
+                if student_id is not None and self.fingerprints.contains(student_id, topic, question):
+                    skipped.append(question)
+                    continue
+                taken.append(question)
+                if student_id is not None:
+                    self.fingerprints.add(student_id, topic, question)
+            pool.extend(skipped)
+            self._stats[key]["duplicatesRejected"] += len(skipped)
+            by_difficulty[difficulty] = taken
+            self._stats[key]["served"] += len(taken)
+            if len(taken) < count:
+                shortfall[difficulty] = count - len(taken)
+
+        if self._refill_needed is not None and any(self.depth(topic, difficulty, class_level, subject_type) < self.low_water for difficulty in mix):
+            self._refill_needed.set()
+        return by_difficulty, shortfall
+
+    def record_live(self, topic: str, difficulty: str, class_level: int = 5, subject_type: str = 'math', count: int = 1) -> None:
+        """Count questions that had to be generated on the request path"""
+        stats = self._stats.get(self.make_key(topic, difficulty, class_level, subject_type))
+        if stats is not None:
+            stats["liveGenerated"] += count
+
+    async def refill(self, topic: str, class_level: int, subject_type: str, difficulties: List[str]) -> int:
+        """Top up the given difficulty pools of one topic with a single mixed call; returns questions added"""
+        mix = {}
+        for difficulty in difficulties:
+            pool = self._pools.get(self.make_key(topic, difficulty, class_level, subject_type))
+            if pool is not None and len(pool) < self.target:
+                mix[difficulty] = self.target - len(pool)
+        if not mix:
+            return 0
+        started = time.perf_counter()
+        questions = await self.gemini_service.generate_question_mix(topic, mix, class_level, subject_type)
+        elapsed = time.perf_counter() - started
+
+        added = 0
+        for difficulty in mix:
+            key = self.make_key(topic, difficulty, class_level, subject_type)
+            # The key may have been dropped while the batch was generating
+            pool = self._pools.get(key)
+            if pool is None:
+                continue
+            new_questions = [question for question in questions if question.get("difficulty") == difficulty]
+            # Drop repeats of questions generated recently for this topic
+            new_questions, duplicates = self.fingerprints.filter_new(GENERATED_SCOPE, topic, new_questions)
+            pool.extend(new_questions)
+            added += len(new_questions)
+            stats = self._stats[key]
+            stats["duplicatesRejected"] += len(duplicates)
+            stats["refills"] += 1
+            stats["lastRefillSeconds"] = elapsed
+            stats["totalRefillSeconds"] += elapsed
+        return added
+
+    async def refill_low_pools(self) -> int:
+        """Refill every pool below the low-water mark, one upstream call per topic"""
+        groups: Dict[Tuple[str, int, str], List[str]] = {}
+        for (topic, difficulty, class_level, subject_type), pool in list(self._pools.items()):
+            if len(pool) < self.low_water:
+                groups.setdefault((topic, class_level, subject_type), []).append(difficulty)
+        added = 0
+        for (topic, class_level, subject_type), difficulties in groups.items():
+            try:
+                added += await self.refill(topic, class_level, subject_type, difficulties)
+            except Exception as e:
+                print(f"ERROR refilling question pool {topic} {difficulties}: {type(e).__name__}: {str(e)}")
+        return added
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._refill_needed.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._refill_needed.clear()
+            await self.refill_low_pools()
+
+    def start(self) -> None:
+        """Launch the background refill task on the running event loop"""
+        if self._task is None or self._task.done():
+            self._refill_needed = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._refill_needed = None
+
+    def stats(self) -> Dict[str, Any]:
+        pools = []
+        for key, pool in self._pools.items():
+            stats = self._stats[key]
+            refills = stats["refills"]
+            pools.append({
+                "topic": key[0],
+                "difficulty": key[1],
+                "classLevel": key[2],
+                "subjectType": key[3],
+                "depth": len(pool),
+                "served": stats["served"],
+                "liveGenerated": stats["liveGenerated"],
+                "duplicatesRejected": stats["duplicatesRejected"],
+                "refills": refills,
+                "lastRefillSeconds": round(stats["lastRefillSeconds"], 3),
+                "avgRefillSeconds": round(stats["totalRefillSeconds"] / refills, 3) if refills else 0.0
+            })
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "lowWater": self.low_water,
+            "target": self.target,
+            "fingerprints": self.fingerprints.stats(),
+            "pools": pools
+        }
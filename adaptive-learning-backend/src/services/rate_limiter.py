@@ -0,0 +1,194 @@
+import asyncio
+import fcntl
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from src.config import settings
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for quota accounting (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def take_from_buckets(state: Dict[str, float], now: float, rpm: float, tpm: float, tokens: float) -> Tuple[Dict[str, float], float]:
+    """Refill the request and token buckets, then try to take one request and `tokens` tokens.
+
+    Both buckets hold at most one minute of quota. Returns the new state and the
+    number of seconds to wait before retrying (0 when the request was granted).
+    """
+    if not state:
+        state = {"requests": rpm, "tokens": tpm, "updated": now}
+    elapsed = max(0.0, now - state["updated"])
+    available_requests = min(rpm, state["requests"] + elapsed * rpm / 60.0)
+    available_tokens = min(tpm, state["tokens"] + elapsed * tpm / 60.0)
+    tokens = min(tokens, tpm)
+
+    if available_requests >= 1 and available_tokens >= tokens:
+        return {"requests": available_requests - 1, "tokens": available_tokens - tokens, "updated": now}, 0.0
+
+    wait = max(
+        (1 - available_requests) * 60.0 / rpm if available_requests < 1 else 0.0,
+        (tokens - available_tokens) * 60.0 / tpm if available_tokens < tokens else 0.0
+    )
+    return {"requests": available_requests, "tokens": available_tokens, "updated": now}, wait
+
+
+class InMemoryRateLimitBackend:
+    """Bucket state local to this process"""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._state: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    async def try_acquire(self, rpm: float, tpm: float, tokens: float) -> float:
+        with self._lock:
+            self._state, wait = take_from_buckets(self._state, self.clock(), rpm, tpm, tokens)
+        return wait
+
+
+class FileRateLimitBackend:
+    """Bucket state in a local file guarded by flock, shared by all workers on one host"""
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self.clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    async def try_acquire(self, rpm: float, tpm: float, tokens: float) -> float:
+        # flock blocks while another worker holds the file, so it runs off the event loop
+        return await asyncio.to_thread(self._take, rpm, tpm, tokens)
+
+    def _take(self, rpm: float, tpm: float, tokens: float) -> float:
+        with open(self.path, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                state = json.loads(raw) if raw else {}
+                state, wait = take_from_buckets(state, self.clock(), rpm, tpm, tokens)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return wait
+
+
+# Same algorithm as take_from_buckets, executed atomically inside Redis using the server clock
+_REDIS_TOKEN_BUCKET = """
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local tokens = math.min(tonumber(ARGV[3]), tpm)
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'requests', 'tokens', 'updated')
+local requests = tonumber(state[1]) or rpm
+local available = tonumber(state[2]) or tpm
+local updated = tonumber(state[3]) or now
+local elapsed = math.max(0, now - updated)
+requests = math.min(rpm, requests + elapsed * rpm / 60)
+available = math.min(tpm, available + elapsed * tpm / 60)
+local wait = 0
+if requests >= 1 and available >= tokens then
+    requests = requests - 1
+    available = available - tokens
+else
+    if requests < 1 then wait = (1 - requests) * 60 / rpm end
+    if available < tokens then wait = math.max(wait, (tokens - available) * 60 / tpm) end
+end
+redis.call('HSET', KEYS[1], 'requests', requests, 'tokens', available, 'updated', now)
+redis.call('EXPIRE', KEYS[1], 120)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend:
+    """Bucket state in Redis (via CacheService), shared by every worker and host"""
+
+    def __init__(self, cache_service, key: str = "gemini:rate_limit"):
+        self.key = key
+        self._script = cache_service.cache.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def try_acquire(self, rpm: float, tpm: float, tokens: float) -> float:
+        wait = await asyncio.to_thread(self._script, keys=[self.key], args=[rpm, tpm, tokens])
+        return float(wait)
+
+
+class GeminiRateLimiter:
+    """Async token-bucket limiter for requests-per-minute and tokens-per-minute quotas.
+
+    Waiters queue on an asyncio.Lock, which wakes them in arrival order, so a
+    caller is never starved by later arrivals.
+    """
+
+    def __init__(self, rpm: float, tpm: float, backend=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.backend = backend if backend is not None else InMemoryRateLimitBackend()
+        self._lock = asyncio.Lock()
+        self.granted = 0
+        self.delayed = 0
+        self.total_wait_seconds = 0.0
+        self.waiting = 0
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait until one request and `tokens` tokens fit in the quota; returns seconds waited"""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    wait = await self.backend.try_acquire(self.rpm, self.tpm, tokens)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - started
+        self.granted += 1
+        if waited > 0.001:
+            self.delayed += 1
+            self.total_wait_seconds += waited
+        return waited
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "backend": type(self.backend).__name__,
+            "granted": self.granted,
+            "delayed": self.delayed,
+            "waiting": self.waiting,
+            "total_wait_seconds": round(self.total_wait_seconds, 3)
+        }
+
+
+_gemini_rate_limiter: Optional[GeminiRateLimiter] = None
+
+
+def create_rate_limit_backend(name: str):
+    if name == "redis":
+        from src.services.cache_service import CacheService
+        return RedisRateLimitBackend(CacheService(settings.redis_host, settings.redis_port, settings.redis_db))
+    if name == "file":
+        return FileRateLimitBackend(settings.gemini_rate_limit_file)
+    return InMemoryRateLimitBackend()
+
+
+def get_gemini_rate_limiter() -> GeminiRateLimiter:
+    """Return the process-wide limiter shared by every GeminiService instance"""
+    global _gemini_rate_limiter
+    if _gemini_rate_limiter is None:
+        _gemini_rate_limiter = GeminiRateLimiter(
+            rpm=settings.gemini_rpm,
+            tpm=settings.gemini_tpm,
+            backend=create_rate_limit_backend(settings.gemini_rate_limit_backend)
+        )
+    return _gemini_rate_limiter
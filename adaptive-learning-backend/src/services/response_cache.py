@@ -0,0 +1,111 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt input"""
+    return _WHITESPACE.sub(" ", str(text)).strip().lower()
+
+
+def make_cache_key(namespace: str, text: str, concept_tags: Optional[Iterable[str]] = None, *parts: Any) -> str:
+    """Hash normalized text, sorted concept tags and any extra parts into a fixed-size key"""
+    digest = hashlib.sha256()
+    digest.update(normalize_text(text).encode("utf-8"))
+    for tag in sorted(normalize_text(tag) for tag in (concept_tags or [])):
+        digest.update(b"\x1ftag:" + tag.encode("utf-8"))
+    for part in parts:
+        digest.update(b"\x1f" + normalize_text(part).encode("utf-8"))
+    return f"{namespace}:{digest.hexdigest()}"
+
+
+class LRUTTLCache:
+    """In-memory cache bounded by entry count and approximate byte size, with per-entry TTL.
+
+    Least recently used entries are evicted first. Sizes are measured as the
+    length of the JSON encoding of each value.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 8 * 1024 * 1024, ttl_seconds: float = 3600, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, size, expires_at = entry
+        if expires_at <= self.clock():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        """Store a value; returns False if it is larger than the whole cache"""
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return False
+        if key in self._entries:
+            self._remove(key)
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (value, size, self.clock() + ttl)
+        self.current_bytes += size
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return True
+
+    def pop(self, key: str) -> Optional[Any]:
+        """Remove and return a live value (counts as a hit or miss like get)"""
+        value = self.get(key)
+        if value is not None:
+            self._remove(key)
+        return value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[2] > self.clock()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
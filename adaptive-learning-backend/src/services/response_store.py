@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from src.config import settings
+
+
+class SQLiteResponseBackend:
+    """Responses in an embedded SQLite file, shared by the workers on one host.
+
+    WAL mode lets readers in other processes proceed while one writes; a
+    writer may still wait up to the busy timeout for another worker's write,
+    so queries run in a thread rather than on the event loop.
+    """
+
+    def __init__(self, path: str, clock=time.time):
+        self.path = path
+        self.clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        await asyncio.to_thread(self._set, key, value, ttl_seconds)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= self.clock():
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        encoded = json.dumps(value, default=str)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                               (key, encoded, self.clock() + ttl_seconds))
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        """Delete expired rows, including those of outdated template versions; returns how many"""
+        with self._lock:
+            return self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (self.clock(),)).rowcount
+
+
+class RedisResponseBackend:
+    """Responses in Redis (via CacheService), shared by every worker and host; Redis expires them"""
+
+    def __init__(self, cache_service):
+        self.cache_service = cache_service
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self.cache_service.get_cache, key)
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        await asyncio.to_thread(self.cache_service.set_cache, key, value, max(1, int(ttl_seconds)))
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.cache_service.clear_cache, key)
+
+
+class MongoResponseBackend:
+    """Responses in a MongoDB collection (via PersistenceService), expired by a TTL index"""
+
+    def __init__(self, persistence_service):
+        self.persistence_service = persistence_service
+        self._indexed = False
+
+    async def get(self, key: str) -> Optional[Any]:
+        document = await self.persistence_service.load_response(key)
+        # The TTL monitor only runs once a minute, so check expiry on read too
+        if document is None or document["expires_at"].replace(tzinfo=timezone.utc) <= datetime.now(timezone.utc):
+            return None
+        return document["value"]
+
+    async def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        if not self._indexed:
+            await self.persistence_service.ensure_response_indexes()
+            self._indexed = True
+        await self.persistence_service.save_response(key, value, datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds))
+
+    async def delete(self, key: str) -> None:
+        await self.persistence_service.delete_response(key)
+
+
+class ResponseStore:
+    """Persistent, content-addressed read-through store for Gemini responses.
+
+    Keys combine the response kind, the version (content hash) of the prompt
+    template that produced it and a hash of the normalized prompt inputs, so
+    entries survive restarts and are shared between workers, while editing a
+    template only orphans the entries it produced; those then expire by TTL.
+    The store is best effort: backend errors are logged and count as misses.
+    """
+
+    def __init__(self, backend, ttl_seconds: float = None):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.response_store_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    @staticmethod
+    def make_key(kind: str, version: str, content_key: str) -> str:
+        """Store key for a response; `content_key` is a make_cache_key hash of the prompt inputs"""
+        return f"gemini:{kind}:{version}:{content_key.rsplit(':', 1)[-1]}"
+
+    async def get(self, key: str, count: bool = True) -> Optional[Any]:
+        """Stored value or None; `count` False keeps read-modify-write lookups out of the hit rate"""
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            print(f"Response store read failed: {type(e).__name__}: {str(e)}")
+            value = None
+        if count:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        try:
+            await self.backend.set(key, value, self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            print(f"Response store write failed: {type(e).__name__}: {str(e)}")
+            return False
+        self.writes += 1
+        return True
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self.backend.delete(key)
+        except Exception as e:
+            self.errors += 1
+            print(f"Response store delete failed: {type(e).__name__}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "errors": self.errors
+        }
+
+
+def create_response_store(name: str = None) -> Optional[ResponseStore]:
+    """Store selected by settings.response_store_backend: "sqlite", "redis", "mongo" or "none" """
+    name = name or settings.response_store_backend
+    if name == "sqlite":
+        return ResponseStore(SQLiteResponseBackend(settings.response_store_sqlite_path))
+    if name == "redis":
+        from src.services.cache_service import CacheService
+        return ResponseStore(RedisResponseBackend(CacheService(settings.redis_host, settings.redis_port, settings.redis_db)))
+    if name == "mongo":
+        from src.services.persistence_service import PersistenceService
+        return ResponseStore(MongoResponseBackend(PersistenceService()))
+    return None
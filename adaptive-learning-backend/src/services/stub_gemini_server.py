@@ -0,0 +1,172 @@
+"""Local HTTP server speaking the Gemini generateContent / streamGenerateContent protocol.
+
+Used for load tests and benchmarks without spending quota. Point the API at it
+with GEMINI_BASE_URL=http://127.0.0.1:8090/v1beta.
+
+    python -m src.services.stub_gemini_server --port 8090 --latency lognormal:0.8,0.4 --error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+from typing import Callable, Dict, List, Optional, Union
+from src.data.question_bank import QuestionGenerator
+from src.services.llm_backends import canned_response, parse_latency, split_for_streaming
+
+
+def _candidate(text: str) -> bytes:
+    return json.dumps({"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}).encode()
+
+
+class StubGeminiServer:
+    """Keep-alive HTTP/1.1 stub with configurable latency, error rate and responses.
+
+    `responses` works as for FakeLLMBackend: a rotation of canned strings, a
+    function of the prompt, or (by default) answers built from the local
+    question bank. Requests for streamGenerateContent get the answer as
+    server-sent events, with the latency spread across the chunks.
+    """
+
+    def __init__(self, latency: Union[str, float] = 0.0, error_rate: float = 0.0, error_status: int = 503,
+                 responses: Optional[Union[List[str], Callable[[str], str]]] = None, seed: Optional[int] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.rng = random.Random(seed)
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.responses = responses
+        self.generator = QuestionGenerator(seed)
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.errors = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1beta"
+
+    @property
+    def url(self) -> str:
+        """generateContent URL accepted by GeminiClient"""
+        return f"{self.base_url}/models/stub:generateContent?key=stub"
+
+    def _respond(self, prompt: str) -> str:
+        if callable(self.responses):
+            return self.responses(prompt)
+        if self.responses:
+            return self.responses[(self.requests - 1) % len(self.responses)]
+        return canned_response(prompt, self.generator)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                path = request_line.split(" ")[1] if " " in request_line else "/"
+                length = 0
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                body = await reader.readexactly(length) if length else b""
+                await self._serve(path, body, writer)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve(self, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        self.requests += 1
+        latency = self.sample_latency(self.rng)
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            await asyncio.sleep(latency)
+            error = json.dumps({"error": {"code": self.error_status, "message": "Stub error", "status": "UNAVAILABLE"}}).encode()
+            self._write(writer, self.error_status, "application/json", error)
+            await writer.drain()
+            return
+
+        try:
+            prompt = json.loads(body)["contents"][0]["parts"][0]["text"]
+        except (ValueError, KeyError, IndexError):
+            self._write(writer, 400, "application/json", b'{"error": {"code": 400, "message": "Bad request"}}')
+            await writer.drain()
+            return
+        text = self._respond(prompt)
+
+        if ":streamGenerateContent" not in path:
+            await asyncio.sleep(latency)
+            self._write(writer, 200, "application/json", _candidate(text))
+            await writer.drain()
+            return
+
+        chunks = split_for_streaming(text)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+        for chunk in chunks:
+            await asyncio.sleep(latency / len(chunks))
+            event = b"data: " + _candidate(chunk) + b"\r\n\r\n"
+            writer.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _write(writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes) -> None:
+        reason = "OK" if status == 200 else "Error"
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+
+    async def serve_forever(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start(self) -> str:
+        """Serve on a background thread; returns the generateContent URL"""
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        async def run():
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            async with self._server:
+                try:
+                    await self._server.serve_forever()
+                except asyncio.CancelledError:
+                    pass
+
+        threading.Thread(target=lambda: self._loop.run_until_complete(run()), daemon=True).start()
+        ready.wait()
+        return self.url
+
+    def stop(self) -> None:
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.requests, "errors": self.errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini-compatible stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", default="0.5", help='seconds, or "uniform:a,b", "normal:mean,std", "lognormal:median,sigma"')
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = StubGeminiServer(args.latency, args.error_rate, args.error_status, seed=args.seed, host=args.host, port=args.port)
+    print(f"Stub Gemini listening on {server.base_url} (set GEMINI_BASE_URL to this)")
+    asyncio.run(server.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
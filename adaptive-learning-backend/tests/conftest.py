@@ -0,0 +1,6 @@
+import os
+
+# Settings() requires these at import time; provide harmless defaults for the test run
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
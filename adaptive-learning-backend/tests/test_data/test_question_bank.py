@@ -0,0 +1,46 @@
+from src.data.question_bank import QuestionGenerator, get_fallback_question
+
+
+def correct_text(question):
+    (answer,) = [option["text"] for option in question["options"] if option["correct"]]
+    return answer
+
+
+def test_same_seed_gives_same_questions():
+    first = QuestionGenerator(seed=42).generate_many("Multiplication", "hard", 20)
+    second = QuestionGenerator(seed=42).generate_many("Multiplication", "hard", 20)
+    assert first == second
+    assert first != QuestionGenerator(seed=43).generate_many("Multiplication", "hard", 20)
+
+
+def test_answers_are_correct_and_distractors_distinct():
+    generator = QuestionGenerator(seed=1)
+    for difficulty in ("easy", "medium", "hard"):
+        for question in generator.generate_many("Multiplication", difficulty, 50):
+            texts = [option["text"] for option in question["options"]]
+            assert len(texts) == 4 and len(set(texts)) == 4
+            assert sum(option["correct"] for option in question["options"]) == 1
+        for question in generator.generate_many("Division", difficulty, 50):
+            assert question["difficulty"] == difficulty
+    easy = QuestionGenerator(seed=2).generate("Multiplication", "easy")
+    left, right = easy["question"][len("What is "):-1].split(" × ")
+    assert correct_text(easy) == str(int(left) * int(right))
+    division = QuestionGenerator(seed=3).generate("Division", "easy")
+    total, divisor = division["question"][len("What is "):-1].split(" ÷ ")
+    assert int(correct_text(division)) * int(divisor) == int(total)
+
+
+def test_no_repeats_within_a_session():
+    generator = QuestionGenerator(seed=7)
+    questions = generator.generate_many("Multiplication", "medium", 60)
+    signatures = {question["explanation"] for question in questions}
+    assert len(signatures) == 60
+
+
+def test_science_and_fallback_entry_point():
+    generator = QuestionGenerator(seed=5)
+    plant_questions = generator.generate_many("Plants Around Us", "easy", 4, subject_type="science")
+    assert len({question["question"] for question in plant_questions}) == 4
+    question = get_fallback_question("Water", "unknown", "science")
+    assert question["difficulty"] == "medium"
+    assert question["conceptTags"] == ["Water"]
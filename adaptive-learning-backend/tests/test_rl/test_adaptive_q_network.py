@@ -0,0 +1,37 @@
+import numpy as np
+import torch
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+
+
+def make_agent(**overrides):
+    options = dict(state_size=20, action_size=7, batch_size=8)
+    options.update(overrides)
+    agent = AdaptiveQNetwork(**options)
+    rng = np.random.default_rng(0)
+    for i in range(16):
+        agent.store_experience((rng.random(20), i % 7, float(i % 3) - 1.0, rng.random(20), i % 2 == 0))
+    return agent
+
+
+def test_train_takes_one_optimizer_step_per_minibatch():
+    agent = make_agent()
+    before = [p.detach().clone() for p in agent.q_network.parameters()]
+    loss = agent.train()
+    assert isinstance(loss, float)
+    assert agent.training_step == 1
+    # Adam keeps a per-parameter step count
+    assert all(state["step"].item() == 1 for state in agent.optimizer.state.values())
+    assert any(not torch.equal(old, new) for old, new in zip(before, agent.q_network.parameters()))
+    assert all(p.grad is None for p in agent.target_network.parameters())
+
+
+def test_target_network_syncs_on_cadence():
+    agent = make_agent(target_update_frequency=2)
+    agent.train()
+    assert not all(torch.equal(a, b) for a, b in zip(agent.q_network.parameters(), agent.target_network.parameters()))
+    agent.train()
+    assert all(torch.equal(a, b) for a, b in zip(agent.q_network.parameters(), agent.target_network.parameters()))
+
+
+def test_train_waits_for_a_full_minibatch():
+    assert AdaptiveQNetwork(state_size=20, action_size=7, batch_size=32).train() is None
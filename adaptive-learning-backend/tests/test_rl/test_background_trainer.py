@@ -0,0 +1,67 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+import torch
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.background_trainer import BackgroundTrainer
+
+
+def experience(rng):
+    return (rng.random(20), int(rng.integers(7)), float(rng.random()), rng.random(20), False)
+
+
+def test_run_once_trains_and_publishes_new_policy():
+    agent = AdaptiveQNetwork(state_size=20, action_size=7, batch_size=4)
+    trainer = BackgroundTrainer(agent, max_steps_per_round=3, max_queue=100)
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        assert trainer.submit(experience(rng))
+    policy_before = agent.policy_network
+
+    assert trainer.run_once() == 3
+    assert len(agent.replay_buffer) == 10
+    assert agent.policy_version == 1 and agent.policy_network is not policy_before
+    assert not agent.policy_network.training
+    for published, trained in zip(agent.policy_network.parameters(), agent.q_network.parameters()):
+        assert torch.equal(published, trained)
+    assert trainer.run_once() == 0   # nothing new arrived
+    assert trainer.stats()["trainSteps"] == 3
+
+
+def test_full_queue_drops_experiences():
+    trainer = BackgroundTrainer(AdaptiveQNetwork(state_size=20, action_size=7), max_queue=2)
+    rng = np.random.default_rng(1)
+    assert trainer.submit(experience(rng)) and trainer.submit(experience(rng))
+    assert not trainer.submit(experience(rng))
+    assert trainer.stats()["dropped"] == 1 and trainer.stats()["queueDepth"] == 2
+
+
+@pytest.mark.asyncio
+async def test_thread_trains_on_cadence_and_stops_cleanly():
+    agent = AdaptiveQNetwork(state_size=20, action_size=7, batch_size=4)
+    trainer = BackgroundTrainer(agent, train_interval=0.01)
+    rng = np.random.default_rng(2)
+    for _ in range(8):
+        trainer.submit(experience(rng))
+    trainer.start()
+    for _ in range(200):
+        if agent.policy_version:
+            break
+        await asyncio.sleep(0.01)
+    await trainer.stop()
+    assert agent.policy_version >= 1
+    assert trainer.stats()["running"] is False
+
+
+def test_transition_log_records_each_experience(tmp_path):
+    path = tmp_path / "transitions.ndjson"
+    trainer = BackgroundTrainer(AdaptiveQNetwork(state_size=20, action_size=7), transition_log_path=str(path))
+    rng = np.random.default_rng(3)
+    for _ in range(3):
+        trainer.submit(experience(rng))
+    trainer.run_once()
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(records) == 3 and trainer.stats()["logged"] == 3
+    assert set(records[0]) == {"state", "action", "reward", "next_state", "done"}
+    assert len(records[0]["state"]) == 20
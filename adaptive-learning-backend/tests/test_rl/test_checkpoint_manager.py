@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+import torch
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.checkpoint_manager import CheckpointManager, FileCheckpointBackend
+
+
+def trained_agent(steps=2):
+    agent = AdaptiveQNetwork(state_size=20, action_size=7, batch_size=4)
+    rng = np.random.default_rng(0)
+    for i in range(8):
+        agent.store_experience((rng.random(20), i % 7, 1.0, rng.random(20), False))
+    for _ in range(steps):
+        agent.train()
+    agent.epsilon = 0.42
+    return agent
+
+
+def make_manager(tmp_path, agent, keep=5):
+    return CheckpointManager(agent, FileCheckpointBackend(str(tmp_path / "models" / "dqn_model.pth")), interval_seconds=60, keep=keep)
+
+
+@pytest.mark.asyncio
+async def test_save_and_load_restores_weights_optimizer_and_epsilon(tmp_path):
+    agent = trained_agent()
+    assert await make_manager(tmp_path, agent).save() == 1
+
+    fresh = AdaptiveQNetwork(state_size=20, action_size=7, batch_size=4)
+    manager = make_manager(tmp_path, fresh)
+    assert await manager.load_latest() == 1
+    assert fresh.epsilon == 0.42
+    assert fresh.training_step == agent.training_step
+    assert fresh.policy_version == 1
+    for old, new in zip(agent.q_network.parameters(), fresh.policy_network.parameters()):
+        assert torch.equal(old, new)
+    assert fresh.optimizer.state_dict()["state"][0]["step"] == agent.optimizer.state_dict()["state"][0]["step"]
+
+
+@pytest.mark.asyncio
+async def test_save_skips_untrained_changes_and_prunes_old_versions(tmp_path):
+    agent = trained_agent(steps=1)
+    manager = make_manager(tmp_path, agent, keep=2)
+    assert await manager.save() == 1
+    assert await manager.save() is None
+    for expected in (2, 3):
+        agent.train()
+        assert await manager.save() == expected
+    assert await manager.backend.versions() == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_rollback_moves_current_pointer_back(tmp_path):
+    agent = trained_agent(steps=1)
+    manager = make_manager(tmp_path, agent)
+    await manager.save()
+    first_weights = [p.detach().clone() for p in agent.q_network.parameters()]
+    agent.train()
+    await manager.save()
+
+    assert await manager.rollback() == 1
+    assert all(torch.equal(a, b) for a, b in zip(first_weights, agent.policy_network.parameters()))
+    # A restart now comes back on the rolled-back version
+    restarted = make_manager(tmp_path, AdaptiveQNetwork(state_size=20, action_size=7, batch_size=4))
+    assert await restarted.load_latest() == 1
+    assert await manager.rollback() is None
+
+
+@pytest.mark.asyncio
+async def test_load_latest_falls_back_past_a_corrupt_checkpoint(tmp_path):
+    agent = trained_agent(steps=1)
+    manager = make_manager(tmp_path, agent)
+    await manager.save()
+    agent.train()
+    await manager.save()
+    with open(manager.backend._path(2), "wb") as f:
+        f.write(b"not a checkpoint")
+    fresh = make_manager(tmp_path, AdaptiveQNetwork(state_size=20, action_size=7, batch_size=4))
+    assert await fresh.load_latest() == 1
+    assert fresh.errors == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_writes_a_final_checkpoint(tmp_path):
+    manager = make_manager(tmp_path, trained_agent())
+    manager.start()
+    await manager.stop()
+    assert await manager.backend.versions() == [1]
+    assert manager.stats()["saves"] == 1
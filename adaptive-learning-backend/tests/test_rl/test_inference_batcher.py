@@ -0,0 +1,49 @@
+import asyncio
+import numpy as np
+import pytest
+import torch
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.inference_batcher import InferenceBatcher
+
+
+def greedy_agent():
+    agent = AdaptiveQNetwork(state_size=20, action_size=7)
+    agent.epsilon = 0.0
+    return agent
+
+
+def direct_actions(agent, states):
+    with torch.no_grad():
+        return agent.policy_network(torch.tensor(np.array(states), dtype=torch.float32)).argmax(dim=1).tolist()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_forward_pass():
+    agent = greedy_agent()
+    batcher = InferenceBatcher(agent, window_ms=20, max_batch=32)
+    states = list(np.random.default_rng(0).random((10, 20)))
+    actions = await asyncio.gather(*(batcher.select_action(state) for state in states))
+    assert actions == direct_actions(agent, states)
+    assert batcher.stats()["batches"] == 1 and batcher.stats()["maxBatchSeen"] == 10
+
+
+@pytest.mark.asyncio
+async def test_max_batch_flushes_without_waiting_for_the_window():
+    batcher = InferenceBatcher(greedy_agent(), window_ms=10000, max_batch=4)
+    states = np.random.default_rng(1).random((8, 20))
+    await asyncio.wait_for(asyncio.gather(*(batcher.select_action(state) for state in states)), timeout=1)
+    assert batcher.stats()["batches"] == 2
+
+
+@pytest.mark.asyncio
+async def test_exploration_and_zero_window():
+    agent = greedy_agent()
+    agent.epsilon = 1.0
+    batcher = InferenceBatcher(agent, window_ms=0)
+    assert 0 <= await batcher.select_action(np.zeros(20)) < 7
+    assert batcher.stats()["explored"] == 1 and batcher.stats()["batches"] == 0
+    agent.epsilon = 0.0
+    states = [np.ones(20), np.zeros(20)]
+    # Calls made in the same loop iteration are still batched
+    assert await asyncio.gather(*(batcher.select_action(state) for state in states)) == direct_actions(agent, states)
+    assert batcher.stats()["batches"] == 1
@@ -0,0 +1,37 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import torch
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.numpy_policy import NumpyPolicy
+
+
+def test_exported_policy_matches_torch(tmp_path):
+    agent = AdaptiveQNetwork(state_size=20, action_size=7)
+    path = str(tmp_path / "policy.npz")
+    agent.export_policy(path)
+    policy = NumpyPolicy.load(path)
+    states = np.random.default_rng(0).random((64, 20), dtype=np.float32)
+    with torch.inference_mode():
+        expected = agent.policy_network(torch.from_numpy(states)).numpy()
+    np.testing.assert_allclose(policy.q_values(states), expected, rtol=1e-5, atol=1e-5)
+    assert policy.predict_actions(states) == agent.predict_actions(states)
+    assert (policy.state_size, policy.action_size) == (20, 7)
+
+
+def test_select_action_is_greedy_without_epsilon():
+    policy = NumpyPolicy.random_init(20, 7, seed=1)
+    state = np.random.default_rng(1).random(20)
+    assert policy.select_action(state) == int(policy.q_values(state[None, :])[0].argmax())
+    assert [w.shape for w, _ in policy.layers] == [(20, 64), (64, 64), (64, 7)]
+
+
+def test_numpy_backend_does_not_import_torch():
+    env = dict(os.environ, RL_INFERENCE_BACKEND="numpy", RL_POLICY_PATH="missing-policy.npz",
+               SECRET_KEY="test", ALGORITHM="HS256", ACCESS_TOKEN_EXPIRE_MINUTES="30")
+    code = "import sys, src.main; print('torch' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "False"
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+import torch
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.checkpoint_manager import CheckpointManager, FileCheckpointBackend
+from src.rl.offline_trainer import NDJSONTransitionSource, NumpyTransitionSource, TransitionDataset, main, train_offline
+from src.rl.replay_buffer import ReplayBuffer
+from torch.utils.data import DataLoader
+
+
+def write_ndjson(path, count, state_size=4):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"state": [float(i)] * state_size, "action": i % 3, "reward": float(i),
+                                "next_state": [0.0] * state_size, "done": i % 2 == 0}) + "\n")
+
+
+def loaded_rewards(source, workers):
+    loader = DataLoader(TransitionDataset(source), batch_size=None, num_workers=workers)
+    return sorted(int(r) for chunk in loader for r in chunk["rewards"].tolist())
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_ndjson_chunks_cover_every_line_once(tmp_path, workers):
+    path = tmp_path / "transitions.ndjson"
+    write_ndjson(path, 1000)
+    source = NDJSONTransitionSource(str(path), chunk_size=37)
+    assert len(source.chunks()) > 10
+    assert loaded_rewards(source, workers) == list(range(1000))
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_replay_buffer_directory_is_a_numpy_source(tmp_path, workers):
+    buffer = ReplayBuffer(500, 4, path=str(tmp_path / "replay"))
+    for i in range(300):
+        buffer.add((np.full(4, i), i % 3, float(i), np.zeros(4), False))
+    buffer.flush()
+    source = NumpyTransitionSource(str(tmp_path / "replay"), chunk_size=64)
+    assert loaded_rewards(source, workers) == list(range(300))
+    chunk = source.read((0, 2))
+    assert chunk["actions"].dtype == np.int64 and chunk["states"].shape == (2, 4)
+
+
+def test_train_offline_fits_logged_rewards(tmp_path):
+    rng = np.random.default_rng(0)
+    states = rng.random((2048, 4), dtype=np.float32)
+    actions = rng.integers(0, 3, 2048)
+    # Terminal transitions whose reward depends only on the action
+    np.savez(tmp_path / "transitions.npz", states=states, actions=actions, rewards=actions.astype(np.float32),
+             next_states=states, dones=np.ones(2048, dtype=np.float32))
+    agent = AdaptiveQNetwork(state_size=4, action_size=3, learning_rate=0.01)
+    result = train_offline(agent, NumpyTransitionSource(str(tmp_path / "transitions.npz"), chunk_size=512),
+                           epochs=20, batch_size=256, num_workers=0)
+    assert result["samples"] == 20 * 2048 and result["steps"] == 20 * 8
+    assert result["lastLoss"] < 0.1
+    assert agent.policy_version == 1
+    assert set(agent.predict_actions(states[:64])) == {2}
+
+
+def test_cli_writes_a_checkpoint_the_api_can_load(tmp_path, monkeypatch):
+    path = tmp_path / "transitions.ndjson"
+    write_ndjson(path, 200, state_size=20)
+    model_path = tmp_path / "models" / "dqn_model.pth"
+    monkeypatch.setattr("src.rl.checkpoint_manager.settings.model_save_path", str(model_path))
+    result = main(["--ndjson", str(path), "--workers", "0", "--batch-size", "64", "--epsilon", "0.05",
+                   "--export-policy", str(tmp_path / "policy.npz")])
+    assert result["samples"] == 200 and result["checkpointVersion"] == 1
+
+    api_agent = AdaptiveQNetwork(state_size=20, action_size=7)
+    manager = CheckpointManager(api_agent, FileCheckpointBackend(str(model_path)))
+    assert asyncio.run(manager.load_latest()) == 1
+    assert api_agent.epsilon == 0.05
+    assert (tmp_path / "policy.npz").exists()
+
+
+def test_cli_resume_loads_and_saves_on_one_event_loop(tmp_path, monkeypatch):
+    loops = []
+
+    class LoopBoundManager:
+        # Like a Motor-backed manager, whose client cannot move between event loops
+        async def load_latest(self):
+            loops.append(asyncio.get_running_loop())
+            return 3
+
+        async def save(self, force=False):
+            loops.append(asyncio.get_running_loop())
+            return 4
+
+    monkeypatch.setattr("src.rl.checkpoint_manager.create_checkpoint_manager", lambda agent, name=None: LoopBoundManager())
+    path = tmp_path / "transitions.ndjson"
+    write_ndjson(path, 50, state_size=20)
+    result = main(["--ndjson", str(path), "--workers", "0", "--resume", "--checkpoint-backend", "mongo"])
+    assert result["checkpointVersion"] == 4
+    assert len(loops) == 2 and loops[0] is loops[1]
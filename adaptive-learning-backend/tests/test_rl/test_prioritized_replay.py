@@ -0,0 +1,68 @@
+import numpy as np
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.prioritized_replay import PrioritizedReplayBuffer, SumTree
+
+
+def experience(i, state_size=4):
+    return (np.full(state_size, i, dtype=np.float32), i % 3, float(i), np.zeros(state_size), False)
+
+
+def test_sum_tree_totals_and_lookup():
+    tree = SumTree(5)
+    tree.update(np.arange(5), np.array([1.0, 2.0, 3.0, 4.0, 0.0]))
+    assert tree.total == 10.0
+    assert tree.find(np.array([0.0, 0.99, 1.0, 2.5, 3.0, 9.99])).tolist() == [0, 0, 1, 1, 2, 3]
+    tree.update(np.array([3, 3]), np.array([7.0, 0.5]))
+    assert tree.total == 6.5
+
+
+def test_sampling_follows_priorities():
+    buffer = PrioritizedReplayBuffer(100, 4, seed=0, alpha=1.0, epsilon=0.0)
+    for i in range(100):
+        buffer.add(experience(i))
+    buffer.update_priorities(np.arange(100), np.where(np.arange(100) == 7, 99.0, 1.0))
+    counts = np.bincount(np.concatenate([buffer.sample_indices(32) for _ in range(200)]), minlength=100)
+    # Index 7 holds half of the total priority
+    assert 0.45 < counts[7] / counts.sum() < 0.55
+
+
+def test_new_experiences_get_max_priority_and_weights_are_normalized():
+    buffer = PrioritizedReplayBuffer(8, 4, seed=0, alpha=1.0, beta=0.5, epsilon=0.0)
+    for i in range(4):
+        buffer.add(experience(i))
+    buffer.update_priorities(np.array([0, 1]), np.array([5.0, 0.5]))
+    buffer.add(experience(4))
+    assert buffer.tree.get(np.array([4]))[0] == 5.0
+    weights = buffer.importance_weights(np.array([0, 1])).numpy()
+    assert weights.max() == 1.0
+    np.testing.assert_allclose(weights[0], (5.0 / 0.5) ** -0.5, rtol=1e-6)
+
+
+def test_ring_overwrite_replaces_priority():
+    buffer = PrioritizedReplayBuffer(4, 4, seed=0, alpha=1.0, epsilon=0.0)
+    for i in range(4):
+        buffer.add(experience(i))
+    buffer.update_priorities(np.arange(4), np.array([1.0, 1.0, 1.0, 1.0]))
+    buffer.max_priority = 3.0
+    buffer.add(experience(4))
+    assert buffer.tree.get(np.array([0]))[0] == 3.0
+    assert buffer.tree.total == 6.0
+
+
+def test_beta_anneals_to_one():
+    buffer = PrioritizedReplayBuffer(8, 4, seed=0, beta=0.4, beta_steps=10)
+    buffer.add(experience(0))
+    for _ in range(10):
+        buffer.sample_indices(2)
+    assert buffer.beta == 1.0
+
+
+def test_agent_trains_with_priorities():
+    agent = AdaptiveQNetwork(state_size=20, action_size=7, batch_size=8, prioritized_replay=True)
+    rng = np.random.default_rng(0)
+    for i in range(16):
+        agent.store_experience((rng.random(20), i % 7, float(i % 3) - 1.0, rng.random(20), i % 2 == 0))
+    assert isinstance(agent.train(), float)
+    priorities = agent.replay_buffer.tree.get(np.arange(16))
+    # Trained experiences now carry their TD error instead of the initial max priority
+    assert not np.all(priorities == 1.0)
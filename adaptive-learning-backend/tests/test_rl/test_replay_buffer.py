@@ -0,0 +1,44 @@
+import numpy as np
+import torch
+from src.rl.replay_buffer import ReplayBuffer
+
+
+def experience(i, state_size=4):
+    return (np.full(state_size, i, dtype=np.float64), i % 3, float(i), np.full(state_size, i + 1), i % 2 == 0)
+
+
+def test_ring_overwrites_oldest_and_keeps_capacity():
+    buffer = ReplayBuffer(capacity=3, state_size=4, seed=0)
+    for i in range(5):
+        buffer.add(experience(i))
+    assert len(buffer) == 3 and buffer.position == 2
+    states, actions, rewards, next_states, dones = buffer.get(np.array([0, 1, 2]))
+    assert rewards.tolist() == [3.0, 4.0, 2.0]
+    assert states[0].tolist() == [3.0] * 4 and next_states[0].tolist() == [4.0] * 4
+    assert actions.dtype == torch.int64 and dones.tolist() == [0.0, 1.0, 1.0]
+
+
+def test_sample_reuses_preallocated_batch_memory():
+    buffer = ReplayBuffer(capacity=100, state_size=4, seed=1)
+    for i in range(100):
+        buffer.push(experience(i))
+    first = buffer.sample(8)
+    second = buffer.sample(8)
+    assert first[0].shape == (8, 4) and first[0].dtype == torch.float32
+    assert first[0].data_ptr() == second[0].data_ptr()
+
+
+def test_memory_mapped_buffer_survives_restart(tmp_path):
+    path = str(tmp_path / "replay")
+    buffer = ReplayBuffer(capacity=10, state_size=4, path=path)
+    for i in range(4):
+        buffer.add(experience(i))
+    buffer.flush()
+    del buffer
+
+    reopened = ReplayBuffer(capacity=10, state_size=4, path=path)
+    assert len(reopened) == 4 and reopened.position == 4
+    assert reopened.get(np.array([3]))[2].tolist() == [3.0]
+
+    resized = ReplayBuffer(capacity=20, state_size=4, path=path)
+    assert len(resized) == 0
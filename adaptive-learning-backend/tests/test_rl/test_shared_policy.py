@@ -0,0 +1,118 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import numpy as np
+import pytest
+import torch
+from src.rl.adaptive_q_network import AdaptiveQNetwork
+from src.rl.shared_policy import GENERATION_0, ExperienceSender, SharedPolicy, SharedPolicyPublisher, SharedPolicyWriter, claim_trainer_role
+
+
+class RecordingTrainer:
+    def __init__(self):
+        self.experiences = []
+
+    def submit(self, experience):
+        self.experiences.append(experience)
+        return True
+
+
+def test_reader_follows_published_versions(tmp_path):
+    path = str(tmp_path / "policy.bin")
+    agent = AdaptiveQNetwork(state_size=20, action_size=7)
+    agent.epsilon = 0.25
+    publisher = SharedPolicyPublisher(path, agent, RecordingTrainer())
+    reader = SharedPolicy(path, 20, 7)
+    states = np.random.default_rng(0).random((16, 20), dtype=np.float32)
+    assert reader.predict_actions(states) == agent.predict_actions(states)
+    assert reader.epsilon == 0.25
+    assert reader.policy_version == 0
+
+    with torch.no_grad():
+        for parameter in agent.q_network.parameters():
+            parameter.add_(0.5)
+    agent.publish_policy()
+    with torch.inference_mode():
+        expected = agent.policy_network(torch.from_numpy(states)).numpy()
+    np.testing.assert_allclose(reader.q_values(states), expected, rtol=1e-5, atol=1e-5)
+    assert reader.policy_version == 1
+    assert publisher.writer.publishes == 2
+    # Layers are views of the mapped segment, not copies
+    assert not reader.layers[0][0].flags.owndata
+
+
+def test_reader_explores_until_the_segment_exists(tmp_path):
+    path = str(tmp_path / "policy.bin")
+    reader = SharedPolicy(path, 4, 3)
+    assert reader.epsilon == 1.0
+    assert all(0 <= action < 3 for action in reader.predict_actions(np.zeros((5, 4), dtype=np.float32)))
+    writer = SharedPolicyWriter(path, [(4, 3)])
+    writer.publish([(np.eye(4, 3, dtype=np.float32), np.zeros(3, dtype=np.float32))], version=7, epsilon=0.0)
+    assert reader.predict_actions(np.array([[0, 0, 1, 0]], dtype=np.float32)) == [2]
+    assert reader.stats()["policyVersion"] == 7
+
+
+def test_reader_waits_while_its_slot_is_being_written(tmp_path):
+    path = str(tmp_path / "policy.bin")
+    writer = SharedPolicyWriter(path, [(2, 2)])
+    writer.publish([(np.eye(2, dtype=np.float32), np.zeros(2, dtype=np.float32))], version=1, epsilon=0.0)
+    reader = SharedPolicy(path, 2, 2)
+    reader.q_values(np.ones((1, 2), dtype=np.float32))
+    # An odd generation means a write to the reader's slot is in progress
+    writer._header[GENERATION_0 + reader._slot] += 1
+    finish = threading.Timer(0.05, lambda: writer._header.__setitem__(GENERATION_0 + reader._slot, writer._header[GENERATION_0 + reader._slot] + 1))
+    finish.start()
+    np.testing.assert_allclose(reader.q_values(np.ones((1, 2), dtype=np.float32)), [[1.0, 1.0]])
+    finish.join()
+    assert reader.retries > 0
+
+
+@pytest.mark.asyncio
+async def test_serving_worker_experiences_reach_the_trainer(tmp_path):
+    path = str(tmp_path / "policy.bin")
+    trainer = RecordingTrainer()
+    publisher = SharedPolicyPublisher(path, AdaptiveQNetwork(state_size=4, action_size=3), trainer)
+    publisher.start()
+    sender = ExperienceSender(path)
+    try:
+        assert sender.submit((np.arange(4), 2, -0.5, np.ones(4), True))
+        for _ in range(100):
+            if trainer.experiences:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await sender.stop()
+        await publisher.stop()
+    state, action, reward, next_state, done = trainer.experiences[0]
+    assert (action, reward, done) == (2, -0.5, True)
+    assert state.tolist() == [0, 1, 2, 3] and next_state.tolist() == [1, 1, 1, 1]
+
+
+def test_sender_drops_without_a_trainer(tmp_path):
+    sender = ExperienceSender(str(tmp_path / "policy.bin"))
+    assert not sender.submit((np.zeros(4), 0, 0.0, np.zeros(4), False))
+    assert sender.stats()["dropped"] == 1
+
+
+def test_only_one_process_claims_the_trainer_role(tmp_path):
+    path = str(tmp_path / "policy.bin")
+    assert claim_trainer_role(path)
+    code = f"from src.rl.shared_policy import claim_trainer_role; print(claim_trainer_role({path!r}))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    assert result.stdout.strip() == "False", result.stderr
+
+
+def test_serving_worker_app_import_does_not_load_torch(tmp_path):
+    path = str(tmp_path / "policy.bin")
+    # This test process holds the trainer role, so the subprocess starts as a serving worker
+    assert claim_trainer_role(path)
+    env = dict(os.environ, RL_SHARED_POLICY="true", RL_SHARED_POLICY_PATH=path,
+               SECRET_KEY="test", ALGORITHM="HS256", ACCESS_TOKEN_EXPIRE_MINUTES="30")
+    code = "import sys, src.main; print(type(src.main.learning.adaptive_q_network).__name__, 'torch' in sys.modules)"
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "SharedPolicy False"
@@ -1,3 +1,5 @@
+from types import SimpleNamespace
+import numpy as np
 from src.rl.state_builder import StateBuilder
 
 def test_state_vector_construction():
@@ -32,4 +34,29 @@ def test_state_vector_padding():
     
     assert len(padded_vector) == 5  # Ensure the padded vector has the correct length
     assert padded_vector[:2] == state_vector  # Ensure original values are preserved
-    assert padded_vector[2:] == [0] * 3  # Ensure padding is correct
\ No newline at end of file
+    assert padded_vector[2:] == [0] * 3  # Ensure padding is correct
+
+LEARNING_STATE = {
+    "classLevel": 6, "consecutiveCorrect": 2, "consecutiveWrong": 1, "currentDifficulty": "medium",
+    "isInAdaptiveMode": True, "recentPerformance": [True, False, True], "timeSpent": 90, "hintsUsed": 1
+}
+QUESTION = {"difficulty": "easy", "options": [{}, {}, {}, {}], "conceptTags": ["fractions"]}
+
+
+def test_build_batch_matches_per_request_vector():
+    raw = StateBuilder(max_length=20, seed=0).extract_features([LEARNING_STATE], [QUESTION]).copy()
+    expected = StateBuilder(max_length=20).build_state_vector(raw[0, :10].tolist(), raw[0, 10:].tolist())
+    batch = StateBuilder(max_length=20, seed=0).build_batch([LEARNING_STATE], [QUESTION])
+    assert batch.shape == (1, 20) and batch.dtype == np.float32
+    np.testing.assert_allclose(batch[0], expected, atol=1e-5)
+    assert raw[0, 0] == np.float32(6 / 12) and raw[0, 5] == np.float32(2 / 3) and raw[0, 10] == 1.0
+
+
+def test_build_batch_reuses_its_buffer_and_accepts_models():
+    builder = StateBuilder(max_length=20, seed=1)
+    first = builder.build_batch([LEARNING_STATE] * 4, [QUESTION] * 4)
+    second = builder.build_batch([SimpleNamespace(**LEARNING_STATE)] * 2, [SimpleNamespace(**QUESTION)] * 2)
+    assert second.base is first.base or np.shares_memory(first, second)
+    # Missing and None fields fall back to the defaults of the request dicts
+    single = builder.build_state({"timeSpent": None}, {})
+    assert single.shape == (20,) and not np.shares_memory(single, second)
@@ -0,0 +1,127 @@
+import asyncio
+import httpx
+import pytest
+from src.services.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.services.gemini_client import GeminiClient
+from src.services.gemini_service import GeminiService
+from src.services.rate_limiter import GeminiRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, **overrides):
+    options = dict(window_size=10, min_calls=4, failure_rate_threshold=0.5, slow_call_seconds=5.0,
+                   slow_call_rate_threshold=0.75, open_seconds=30.0, clock=clock)
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_on_failure_rate_and_recovers_through_probe():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for failed in (False, True, False, True):
+        assert breaker.allow()
+        breaker.record(failed, 0.1)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["shortCircuited"] == 1
+
+    clock.now = 31
+    assert breaker.allow()          # the single half-open probe
+    assert not breaker.allow()      # concurrent calls still fail fast
+    breaker.record(False, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_and_slow_calls_trip():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.allow()
+        breaker.record(False, 6.0)
+    assert breaker.state == "open"
+
+    clock.now = 31
+    assert breaker.allow()
+    breaker.record(True, 0.1)
+    assert breaker.state == "open"
+    assert breaker.stats()["timesOpened"] == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def failing_stub(calls, status=503):
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(status)
+    return httpx.MockTransport(handler)
+
+
+@pytest.mark.asyncio
+async def test_client_stops_retrying_once_circuit_opens():
+    calls = []
+    breaker = make_breaker(FakeClock(), min_calls=2)
+    async with httpx.AsyncClient(transport=failing_stub(calls)) as http_client:
+        client = GeminiClient("http://stub/generate", max_retries=5, retry_base_delay=0, http_client=http_client,
+                              rate_limiter=GeminiRateLimiter(rpm=1000000, tpm=1000000000))
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate_content("prompt", breaker=breaker)
+        # Opened after the second failure, so the remaining 3 retries were skipped
+        assert len(calls) == 2
+        with pytest.raises(CircuitOpenError):
+            await client.generate_content("prompt", breaker=breaker)
+        assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_service_falls_back_instantly_while_open():
+    calls = []
+    service = GeminiService()
+    http_client = httpx.AsyncClient(transport=failing_stub(calls, status=429))
+    service.client = GeminiClient("http://stub/generate", max_retries=3, retry_base_delay=0, http_client=http_client,
+                                  rate_limiter=GeminiRateLimiter(rpm=1000000, tpm=1000000000))
+    service.breakers["batch"] = make_breaker(FakeClock(), min_calls=3)
+    try:
+        first = await service.generate_question_batch("Multiplication", "easy", 2)
+        upstream_calls = len(calls)
+        second = await service.generate_question_batch("Division", "easy", 2)
+    finally:
+        await http_client.aclose()
+    assert len(first) == 2 and len(second) == 2
+    assert upstream_calls == 3
+    assert len(calls) == upstream_calls
+    assert service.breaker_stats()["batch"]["state"] == "open"
+
+
+class BlockingRateLimiter:
+    async def acquire(self, tokens):
+        await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_gives_its_slot_back():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.allow()
+        breaker.record(True, 0.1)
+    clock.now = 31
+    client = GeminiClient("http://stub/generate", max_retries=1, http_client=httpx.AsyncClient(), rate_limiter=BlockingRateLimiter())
+    for call in (client.generate_content("prompt", breaker=breaker), anext(client.stream_content("prompt", breaker=breaker))):
+        task = asyncio.create_task(call)
+        await asyncio.sleep(0)
+        assert breaker.state == "half_open" and not breaker.allow()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Nothing was learned about upstream, so the next call may probe again
+        assert breaker.allow()
+        breaker.release()
+    await client.http_client.aclose()
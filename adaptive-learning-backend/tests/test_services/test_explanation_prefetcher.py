@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from src.data.question_bank import QuestionGenerator
+from src.services.explanation_prefetcher import ExplanationPrefetcher
+from src.services.gemini_service import GeminiService
+from src.services.llm_backends import FakeLLMBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def generous_quota(monkeypatch):
+    # Keep the quota-relative cap above the rates these tests configure
+    monkeypatch.setattr("src.services.explanation_prefetcher.settings.gemini_rpm", 1000000)
+
+
+def make_service():
+    service = GeminiService()
+    service.client = FakeLLMBackend(seed=1)
+    return service
+
+
+def wrong_answers(question):
+    correct = next(opt["text"] for opt in question["options"] if opt["correct"])
+    return [(question["question"], correct, opt["text"], question["conceptTags"]) for opt in question["options"] if not opt["correct"]]
+
+
+@pytest.mark.asyncio
+async def test_prefetched_wrong_answers_are_cache_hits():
+    service = make_service()
+    prefetcher = ExplanationPrefetcher(service, enabled=True, max_per_minute=6000, concurrency=2)
+    questions = QuestionGenerator(seed=2).generate_many("Multiplication", "easy", 2)
+    assert prefetcher.enqueue(questions) == 6
+    assert prefetcher.enqueue(questions) == 0   # already pending
+
+    prefetcher.start()
+    for _ in range(100):
+        if prefetcher.stats()["prefetched"] == 6:
+            break
+        await asyncio.sleep(0.01)
+    await prefetcher.stop()
+    assert service.client.calls == 6
+
+    for args in wrong_answers(questions[0]):
+        await service.generate_explanation(*args)
+    assert service.client.calls == 6
+    assert service.explanation_cache.stats()["hits"] >= 3
+
+
+@pytest.mark.asyncio
+async def test_budget_limits_prefetch_calls():
+    clock = FakeClock()
+    service = make_service()
+    prefetcher = ExplanationPrefetcher(service, enabled=True, max_per_minute=60, concurrency=1, clock=clock)
+    prefetcher.enqueue(QuestionGenerator(seed=3).generate_many("Division", "medium", 1))
+
+    assert await prefetcher.prefetch_next()
+    assert not await prefetcher.prefetch_next()   # budget spent
+    clock.now = 1.0
+    assert await prefetcher.prefetch_next()
+    assert prefetcher.stats()["deferred"] == 1
+
+
+@pytest.mark.asyncio
+async def test_defers_to_interactive_calls_and_drops_oldest():
+    service = make_service()
+    prefetcher = ExplanationPrefetcher(service, enabled=True, max_pending=4, max_per_minute=6000)
+    prefetcher.enqueue(QuestionGenerator(seed=4).generate_many("Addition", "easy", 2))
+    assert prefetcher.stats()["pending"] == 4
+    assert prefetcher.stats()["dropped"] == 2
+
+    service.breakers["explanation"].state = "open"
+    assert not await prefetcher.prefetch_next()
+    assert service.client.calls == 0
+
+
+def test_budget_stays_below_the_shared_quota(monkeypatch):
+    monkeypatch.setattr("src.services.explanation_prefetcher.settings.gemini_rpm", 15)
+    monkeypatch.setattr("src.services.explanation_prefetcher.settings.explanation_prefetch_rpm_share", 0.2)
+    assert ExplanationPrefetcher(make_service(), enabled=True).max_per_minute == pytest.approx(3)
+    assert ExplanationPrefetcher(make_service(), enabled=True, max_per_minute=30).max_per_minute == pytest.approx(7.5)
+
+
+def test_disabled_prefetcher_queues_nothing():
+    prefetcher = ExplanationPrefetcher(make_service(), enabled=False)
+    assert prefetcher.enqueue(QuestionGenerator(seed=5).generate_many("Subtraction", "easy", 1)) == 0
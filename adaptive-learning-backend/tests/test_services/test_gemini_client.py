@@ -0,0 +1,87 @@
+import json
+import httpx
+import pytest
+from src.services.gemini_client import GeminiClient
+from src.services.rate_limiter import GeminiRateLimiter
+
+
+def gemini_response(text):
+    return {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+
+
+def unlimited():
+    return GeminiRateLimiter(rpm=1000000, tpm=1000000000)
+
+
+@pytest.mark.asyncio
+async def test_generate_content_returns_candidate_text():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json=gemini_response("  hello  ")))
+    async with httpx.AsyncClient(transport=transport) as http_client:
+        client = GeminiClient("http://stub/generate", http_client=http_client, rate_limiter=unlimited())
+        assert await client.generate_content("prompt") == "hello"
+
+
+@pytest.mark.asyncio
+async def test_generate_content_retries_rate_limit():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 3:
+            return httpx.Response(429)
+        return httpx.Response(200, json=gemini_response("ok"))
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        client = GeminiClient("http://stub/generate", max_retries=3, retry_base_delay=0, http_client=http_client, rate_limiter=unlimited())
+        assert await client.generate_content("prompt") == "ok"
+    assert len(calls) == 3
+
+
+def test_retry_after_is_capped_at_the_maximum_backoff():
+    client = GeminiClient("http://stub/generate", retry_base_delay=10, retry_max_delay=30, rate_limiter=unlimited())
+    assert client._backoff_delay(0, httpx.Response(429, headers={"retry-after": "5"})) == 5
+    assert client._backoff_delay(0, httpx.Response(429, headers={"retry-after": "3600"})) == 30
+    assert client._backoff_delay(5) == 30
+
+@pytest.mark.asyncio
+async def test_generate_content_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        client = GeminiClient("http://stub/generate", max_retries=3, retry_base_delay=0, http_client=http_client, rate_limiter=unlimited())
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate_content("prompt")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_content_raises_after_transport_errors():
+    def handler(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        client = GeminiClient("http://stub/generate", max_retries=2, retry_base_delay=0, http_client=http_client, rate_limiter=unlimited())
+        with pytest.raises(httpx.TimeoutException):
+            await client.generate_content("prompt", timeout=0.1)
+
+
+@pytest.mark.asyncio
+async def test_stream_content_yields_sse_fragments():
+    body = "".join(
+        f"data: {json.dumps(gemini_response(text))}\r\n\r\n" for text in ('[{"id": 1}', ', {"id": 2}]')
+    )
+    requested = []
+
+    def handler(request):
+        requested.append(str(request.url))
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http_client:
+        client = GeminiClient("http://stub/models/m:generateContent?key=k", http_client=http_client, rate_limiter=unlimited())
+        fragments = [fragment async for fragment in client.stream_content("prompt")]
+    assert fragments == ['[{"id": 1}', ', {"id": 2}]']
+    assert requested == ["http://stub/models/m:streamGenerateContent?key=k&alt=sse"]
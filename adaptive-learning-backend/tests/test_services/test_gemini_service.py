@@ -1,3 +1,4 @@
+import pytest
 from fastapi import HTTPException
 from src.services.gemini_service import GeminiService
 
@@ -31,4 +32,45 @@ def test_gemini_service_error_handling(mocker):
         service.get_explanation("sample_question")
     except HTTPException as e:
         assert e.status_code == 500
-        assert e.detail == "Internal Server Error"
\ No newline at end of file
+        assert e.detail == "Internal Server Error"
+
+class ScriptedClient:
+    """Stands in for GeminiClient, replaying canned responses and recording prompts"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    async def generate_content(self, prompt, timeout=None, max_retries=None, breaker=None):
+        self.prompts.append(prompt)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def question_json(question_id, correct=("true", "false")):
+    options = ", ".join(f'{{"text": "{index}", "correct": {flag}}}' for index, flag in enumerate(correct))
+    return f'{{"id": {question_id}, "question": "Q{question_id}?", "options": [{options}]}}'
+
+
+@pytest.mark.asyncio
+async def test_batch_requests_only_the_missing_count():
+    service = GeminiService()
+    bad = question_json(2, correct=("false", "false"))
+    service.client = ScriptedClient([
+        f"[{question_json(1)}, {bad}, {question_json(3)}]",
+        f"[{question_json(4)}]"
+    ])
+    questions = await service.generate_question_batch("Multiplication", "easy", 3)
+    assert [question["id"] for question in questions] == [1, 3, 4]
+    assert "Generate 1 COMPLETELY DIFFERENT" in service.client.prompts[1]
+
+
+@pytest.mark.asyncio
+async def test_batch_falls_back_to_question_bank_on_error():
+    service = GeminiService()
+    service.client = ScriptedClient([RuntimeError("down")])
+    questions = await service.generate_question_batch("Division", "medium", 2)
+    assert len(questions) == 2
+    assert all(sum(option["correct"] for option in question["options"]) == 1 for question in questions)
@@ -0,0 +1,112 @@
+import asyncio
+import random
+import httpx
+import pytest
+from src.services.circuit_breaker import CircuitBreaker
+from src.services.gemini_client import GeminiClient
+from src.services.gemini_service import GeminiService
+from src.services.llm_backends import FakeLLMBackend, LLMBackend, create_llm_backend, gemini_url, parse_latency
+from src.services.rate_limiter import GeminiRateLimiter
+from src.services.stub_gemini_server import StubGeminiServer
+
+
+def test_parse_latency_distributions():
+    rng = random.Random(1)
+    assert parse_latency("0.25")(rng) == 0.25
+    assert all(0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2 for _ in range(50))
+    assert all(parse_latency("normal:0.0,1.0")(rng) >= 0.0 for _ in range(50))
+    assert all(parse_latency("lognormal:0.3,0.5")(rng) > 0.0 for _ in range(50))
+    with pytest.raises(ValueError):
+        parse_latency("pareto:1,2")
+
+
+def test_create_llm_backend_and_url():
+    assert isinstance(create_llm_backend("fake"), FakeLLMBackend)
+    assert isinstance(create_llm_backend("gemini", "http://stub/x"), GeminiClient)
+    assert gemini_url("http://127.0.0.1:8090/v1beta/", "m", "k") == "http://127.0.0.1:8090/v1beta/models/m:generateContent?key=k"
+
+
+def test_backend_missing_a_method_cannot_be_instantiated():
+    class GenerateOnly(LLMBackend):
+        async def generate_content(self, prompt, timeout=None, max_retries=None, breaker=None):
+            return ""
+
+    with pytest.raises(TypeError):
+        GenerateOnly()
+
+@pytest.mark.asyncio
+async def test_fake_answers_in_the_shape_each_prompt_asks_for():
+    backend = FakeLLMBackend(seed=3)
+    service = GeminiService()
+    service.client = backend
+    questions = await service.generate_question_batch("Multiplication", "easy", count=4)
+    assert len(questions) == 4
+    assert all(q["difficulty"] == "easy" for q in questions)
+    assert backend.stats() == {"calls": 1, "errors": 0}
+
+
+@pytest.mark.asyncio
+async def test_fake_errors_trip_the_breaker():
+    backend = FakeLLMBackend(error_rate=1.0)
+    breaker = CircuitBreaker("fake", window_size=4, min_calls=2, open_seconds=60)
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            await backend.generate_content("hi", breaker=breaker)
+    assert breaker.state == "open"
+    assert backend.errors == 2
+
+
+@pytest.mark.asyncio
+async def test_fake_releases_a_cancelled_probe():
+    breaker = CircuitBreaker("fake", window_size=4, min_calls=2, open_seconds=0)
+    for _ in range(2):
+        breaker.allow()
+        breaker.record(True, 0.1)
+    task = asyncio.create_task(FakeLLMBackend(latency=60).generate_content("hi", breaker=breaker))
+    await asyncio.sleep(0)
+    assert breaker.state == "half_open" and not breaker.allow()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert breaker.allow()
+
+@pytest.mark.asyncio
+async def test_gemini_service_end_to_end_on_fake_backend():
+    service = GeminiService()
+    service.client = FakeLLMBackend(seed=5)
+    questions = await service.generate_question_mix("Division", {"easy": 2, "medium": 2, "hard": 1})
+    assert [q["difficulty"] for q in questions] == ["easy", "easy", "medium", "medium", "hard"]
+    explanation = await service.generate_explanation("What is 12 ÷ 3?", "4", "3", ["division"])
+    assert "4" in explanation["explanation"]
+
+
+@pytest.mark.asyncio
+async def test_gemini_client_against_stub_server():
+    server = StubGeminiServer(responses=['{"ok": true}'])
+    url = server.start()
+    try:
+        async with httpx.AsyncClient() as http_client:
+            client = GeminiClient(url, max_retries=1, http_client=http_client,
+                                  rate_limiter=GeminiRateLimiter(rpm=1000, tpm=1000000))
+            assert await client.generate_content("hi") == '{"ok": true}'
+            streamed = "".join([chunk async for chunk in client.stream_content("hi")])
+            assert streamed == '{"ok": true}'
+        assert server.stats() == {"requests": 2, "errors": 0}
+    finally:
+        server.stop()
+
+
+@pytest.mark.asyncio
+async def test_stub_server_error_rate():
+    server = StubGeminiServer(error_rate=1.0, error_status=503)
+    url = server.start()
+    try:
+        async with httpx.AsyncClient() as http_client:
+            client = GeminiClient(url, max_retries=2, retry_base_delay=0, http_client=http_client,
+                                  rate_limiter=GeminiRateLimiter(rpm=1000, tpm=1000000))
+            with pytest.raises(httpx.HTTPStatusError) as error:
+                await client.generate_content("hi")
+        assert error.value.response.status_code == 503
+        assert server.errors == 2
+    finally:
+        server.stop()
@@ -0,0 +1,111 @@
+import pytest
+from src.services.llm_output import IncrementalJSONArrayParser, extract_json_value, parse_questions, validate_question
+
+STREAMED_RESPONSE = '''```json
+[
+  {"id": 1, "question": "What is 7 × 8?", "options": [{"text": "56", "correct": true}], "difficulty": "easy"},
+  {"id": 2, "question": "Sam has \\"3]\\" bags {of} 4 apples", "options": [], "difficulty": "medium"}
+]
+```'''
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalJSONArrayParser()
+    elements = []
+    for start in range(0, len(text), size):
+        elements.extend(parser.feed(text[start:start + size]))
+    return parser, elements
+
+
+def test_incremental_parser_is_independent_of_chunk_boundaries():
+    for size in (1, 3, 7, 64, len(STREAMED_RESPONSE)):
+        parser, elements = feed_in_chunks(STREAMED_RESPONSE, size)
+        assert [element["id"] for element in elements] == [1, 2]
+        assert elements[1]["question"] == 'Sam has "3]" bags {of} 4 apples'
+        assert parser.finished
+
+
+def test_incremental_parser_emits_elements_before_array_closes():
+    parser = IncrementalJSONArrayParser()
+    assert parser.feed('[{"id": 1}, {"id"') == [{"id": 1}]
+    assert not parser.finished
+    assert parser.feed(': 2}]') == [{"id": 2}]
+
+
+def test_incremental_parser_skips_malformed_elements():
+    parser, elements = feed_in_chunks('[{"id": 1}, {"id": oops}, {"id": 3}]', 5)
+    assert elements == [{"id": 1}, {"id": 3}]
+    assert parser.malformed == 1
+
+
+def make_question(question_id, correct=(True, False)):
+    options = ", ".join(f'{{"text": "{index}", "correct": {str(flag).lower()}}}' for index, flag in enumerate(correct))
+    return f'{{"id": {question_id}, "question": "Q{question_id}?", "options": [{options}]}}'
+
+
+def test_extract_json_value_handles_fences_prose_and_trailing_commas():
+    corpus = [
+        '```json\n{"a": 1,}\n```',
+        '```\n{"a": 1}\n```',
+        'Sure! Here it is: {"a": 1} Hope that helps [really].',
+        '{"a": 1}\n\nNote: values are in {braces}.',
+    ]
+    for text in corpus:
+        assert extract_json_value(text) == {"a": 1}
+    assert extract_json_value('[1, 2, {"b": "x]}"},]') == [1, 2, {"b": "x]}"}]
+
+
+def test_extract_json_value_raises_when_nothing_decodes():
+    for text in ("no json here", '{"a": 1', '{"a": nope}'):
+        with pytest.raises(ValueError):
+            extract_json_value(text)
+
+
+def test_parse_questions_salvages_valid_elements():
+    text = "Here are your questions:\n```json\n[" + ", ".join([
+        make_question(1),
+        make_question(2, correct=(False, False)),
+        make_question(3, correct=(True, True)),
+        '{"id": 4, "question": broken}',
+        make_question(5),
+    ]) + ",]\n```\nGood luck!"
+    questions, rejected = parse_questions(text, "easy")
+    assert [question["id"] for question in questions] == [1, 5]
+    assert all(question["difficulty"] == "easy" for question in questions)
+    assert rejected == 3
+
+
+def test_parse_questions_accepts_single_object():
+    questions, rejected = parse_questions("Answer: " + make_question(9))
+    assert [question["id"] for question in questions] == [9]
+    assert rejected == 0
+    assert "difficulty" not in questions[0]
+
+
+def test_validate_question_normalizes_fields():
+    question = validate_question({
+        "question": "  Pick one  ",
+        "options": [{"text": 4, "correct": "TRUE"}, {"text": "5", "correct": "false"}],
+        "difficulty": "Hard",
+        "conceptTags": "addition",
+    })
+    assert question["question"] == "Pick one"
+    assert [option["correct"] for option in question["options"]] == [True, False]
+    assert question["options"][0]["text"] == "4"
+    assert isinstance(question["id"], int)
+    assert question["difficulty"] == "hard"
+    assert question["conceptTags"] == []
+
+
+def test_validate_question_rejects_unusable_shapes():
+    assert validate_question(None) is None
+    assert validate_question({"question": "", "options": []}) is None
+    assert validate_question({"question": "Q", "options": [{"text": "a", "correct": True}]}) is None
+    assert validate_question({"question": "Q", "options": [{"text": "a", "correct": "yes"}, {"text": "b"}]}) is None
+
+
+def test_bracketed_prose_before_payload_is_skipped():
+    text = "Question set [v2] for you:\n[" + make_question(1) + "]"
+    questions, _ = parse_questions(text)
+    assert [question["id"] for question in questions] == [1]
+    assert extract_json_value('See [1] below: {"a": 1}', expected_type=dict) == {"a": 1}
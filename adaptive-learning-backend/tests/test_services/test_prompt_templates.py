@@ -0,0 +1,45 @@
+from src.services.prompt_templates import PROMPTS, PromptTemplate, question_template_name, render_mix_lines
+
+SAMPLE_VALUES = {
+    "topic": "Multiplication",
+    "difficulty": "easy",
+    "count": 3,
+    "total": 5,
+    "class_level": 3,
+    "grade_desc": "intermediate",
+    "unique_id": "1-2",
+    "batch_id": "3-4",
+    "numbers": [2, 3, 4, 5],
+    "names": ["Sarah", "Tom", "Maria"],
+    "objects": ["apples", "pens", "toys"],
+    "number_sets": [[2, 3, 4, 5, 6]],
+    "mix_lines": "- EXACTLY 1 question(s)",
+    "question": "What is {x}?",
+    "student_answer": "6",
+    "correct_answer": "5",
+    "concepts": "addition"
+}
+
+
+def test_every_template_renders_without_leftover_markers():
+    for name in PROMPTS.names():
+        prompt = PROMPTS.get(name).render(**SAMPLE_VALUES)
+        assert "<<" not in prompt
+        assert '"options": [' in prompt or '"encouragement"' in prompt
+
+
+def test_template_names_fall_back_to_medium_style():
+    assert question_template_name("batch", "math", "hard") == "batch/math/hard"
+    assert question_template_name("question", "english", "expert") == "question/science/medium"
+    assert render_mix_lines("math", {"easy": 2, "hard": 1}).splitlines()[0].startswith('- EXACTLY 2 question(s) with "difficulty": "easy"')
+
+
+def test_values_are_inserted_verbatim_and_sizes_tracked():
+    template = PromptTemplate("t", 'Q: {question} {{"a": 1}}')
+    assert template.fields == ["question"]
+    assert template.render(question="{x}") == 'Q: {x} {"a": 1}'
+    template.render(question="longer question")
+    stats = template.stats()
+    assert stats["renders"] == 2
+    assert stats["staticChars"] == len('Q:  {"a": 1}')
+    assert stats["maxChars"] == len('Q: longer question {"a": 1}')
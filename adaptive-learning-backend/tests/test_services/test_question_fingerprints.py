@@ -0,0 +1,50 @@
+from src.services.question_fingerprints import FingerprintIndex, dedupe_questions, question_fingerprints
+
+
+def math_question(text, answer):
+    return {"question": text, "options": [{"text": str(answer), "correct": True}, {"text": "1", "correct": False}]}
+
+
+def test_operand_signature_matches_rephrased_arithmetic():
+    direct = math_question("What is 7 × 8?", 56)
+    story = math_question("Tom has 8 bags with 7 apples each. How many apples?", 56)
+    other = math_question("What is 6 × 8?", 48)
+    assert question_fingerprints(direct)[1] == question_fingerprints(story)[1]
+    assert question_fingerprints(direct)[1] != question_fingerprints(other)[1]
+    # Science questions have no operands; only the normalized text counts
+    text_hash, operand_hash = question_fingerprints({"question": "Where do  fish live?", "options": []})
+    assert operand_hash is None
+    assert text_hash == question_fingerprints({"question": "where do fish live"})[0]
+
+
+def test_index_is_scoped_per_student_and_topic():
+    index = FingerprintIndex(max_scopes=10, max_per_scope=10)
+    question = math_question("What is 7 × 8?", 56)
+    index.add("s1", "Multiplication", question)
+    assert index.contains("s1", "multiplication", question)
+    assert not index.contains("s2", "Multiplication", question)
+    assert not index.contains("s1", "Division", question)
+
+    fresh, duplicates = index.filter_new("s1", "Multiplication", [question, math_question("What is 3 × 4?", 12), math_question("What is 4 × 3?", 12)])
+    assert [q["question"] for q in fresh] == ["What is 3 × 4?"]
+    assert len(duplicates) == 2
+    assert index.stats()["rejected"] == 2
+
+
+def test_index_memory_is_bounded():
+    index = FingerprintIndex(max_scopes=2, max_per_scope=3)
+    for number in range(10):
+        index.add("s1", "Multiplication", math_question(f"What is {number} × 2?", number * 2))
+    assert index.stats()["questions"] == 3
+    assert not index.contains("s1", "Multiplication", math_question("What is 0 × 2?", 0))
+    assert index.contains("s1", "Multiplication", math_question("What is 9 × 2?", 18))
+    index.add("s2", "Multiplication", math_question("What is 1 × 1?", 1))
+    index.add("s3", "Multiplication", math_question("What is 1 × 1?", 1))
+    assert index.stats()["scopes"] == 2
+    assert not index.contains("s1", "Multiplication", math_question("What is 9 × 2?", 18))
+
+
+def test_dedupe_questions_counts_dropped():
+    questions = [math_question("What is 7 × 8?", 56), math_question("What is 8 × 7?", 56), math_question("What is 2 + 2?", 4)]
+    unique, dropped = dedupe_questions(questions)
+    assert len(unique) == 2 and dropped == 1
@@ -0,0 +1,131 @@
+import asyncio
+import pytest
+from src.services.question_pool import QuestionPool
+
+
+class FakeGeminiService:
+    def __init__(self):
+        self.calls = []
+
+    async def generate_question_batch(self, topic, difficulty, count=3, class_level=5, subject_type='math'):
+        self.calls.append((topic, difficulty, count))
+        return [{"id": len(self.calls) * 100 + i, "question": f"{topic} {difficulty} {i}", "difficulty": difficulty} for i in range(count)]
+
+    async def generate_question_mix(self, topic, mix, class_level=5, subject_type='math'):
+        self.calls.append((topic, dict(mix)))
+        return [{"id": len(self.calls) * 100 + i, "question": f"{topic} {difficulty} {i}", "difficulty": difficulty}
+                for difficulty, count in mix.items() for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_empty_pool_generates_live_then_refills():
+    service = FakeGeminiService()
+    pool = QuestionPool(service, low_water=2, target=4, max_keys=10, refill_interval=60)
+
+    questions = await pool.take("Multiplication", "easy", 2)
+    assert len(questions) == 2
+    assert service.calls == [("Multiplication", {"easy": 2})]
+
+    assert await pool.refill_low_pools() == 4
+    assert pool.depth("Multiplication", "easy") == 4
+
+    questions = await pool.take("Multiplication", "easy", 2)
+    assert len(questions) == 2
+    assert len(service.calls) == 2  # served from the pool, no live call
+
+
+@pytest.mark.asyncio
+async def test_partial_pool_generates_only_shortfall():
+    service = FakeGeminiService()
+    pool = QuestionPool(service, low_water=2, target=1, max_keys=10, refill_interval=60)
+    pool.register("Division", "hard", 5, "math")
+    await pool.refill("Division", 5, "math", ["hard"])
+
+    questions = await pool.take("Division", "hard", 3, 5, "math")
+    assert len(questions) == 3
+    assert service.calls[-1] == ("Division", {"hard": 2})
+
+
+@pytest.mark.asyncio
+async def test_background_task_refills_after_take():
+    service = FakeGeminiService()
+    pool = QuestionPool(service, low_water=2, target=3, max_keys=10, refill_interval=60)
+    pool.start()
+    try:
+        await pool.take("Multiplication", "medium", 1)
+        for _ in range(100):
+            if pool.depth("Multiplication", "medium") == 3:
+                break
+            await asyncio.sleep(0.01)
+        stats = pool.stats()
+        assert stats["running"]
+        assert stats["pools"][0]["depth"] == 3
+        assert stats["pools"][0]["refills"] == 1
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.asyncio
+async def test_mix_uses_one_call_for_all_shortfalls_and_refill():
+    service = FakeGeminiService()
+    pool = QuestionPool(service, low_water=2, target=2, max_keys=10, refill_interval=60)
+    questions = await pool.take_mix("Multiplication", {"easy": 2, "medium": 2, "hard": 1})
+    assert [q["difficulty"] for q in questions] == ["easy", "easy", "medium", "medium", "hard"]
+    assert service.calls == [("Multiplication", {"easy": 2, "medium": 2, "hard": 1})]
+
+    await pool.refill_low_pools()
+    assert service.calls[-1] == ("Multiplication", {"easy": 2, "medium": 2, "hard": 2})
+    assert len(service.calls) == 2
+
+
+def test_pool_keys_are_bounded():
+    pool = QuestionPool(FakeGeminiService(), low_water=1, target=2, max_keys=2, refill_interval=60)
+    for topic in ("a", "b", "c"):
+        pool.register(topic, "easy")
+    assert [p["topic"] for p in pool.stats()["pools"]] == ["b", "c"]
+
+
+class RepeatingGeminiService(FakeGeminiService):
+    """Returns the same question texts, except for calls listed in `fresh_calls`"""
+
+    def __init__(self, fresh_calls):
+        super().__init__()
+        self.fresh_calls = fresh_calls
+
+    async def generate_question_mix(self, topic, mix, class_level=5, subject_type='math'):
+        self.calls.append((topic, dict(mix)))
+        suffix = f" v{len(self.calls)}" if len(self.calls) in self.fresh_calls else ""
+        return [{"id": i, "question": f"{topic} {difficulty} {i}{suffix}", "difficulty": difficulty}
+                for difficulty, count in mix.items() for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_student_is_not_served_repeats():
+    service = RepeatingGeminiService(fresh_calls={3})
+    pool = QuestionPool(service, low_water=0, target=2, max_keys=10, refill_interval=60)
+
+    first = await pool.take("Science", "easy", 2, student_id="s1")
+    # Call 2 repeats both questions, so call 3 asks for exactly those 2 again
+    second = await pool.take("Science", "easy", 2, student_id="s1")
+    assert {q["question"] for q in first}.isdisjoint(q["question"] for q in second)
+    assert service.calls[1:] == [("Science", {"easy": 2}), ("Science", {"easy": 2})]
+
+    # Another student may get the same questions
+    third = await pool.take("Science", "easy", 2, student_id="s2")
+    assert [q["question"] for q in third] == [q["question"] for q in first]
+
+
+class SurplusGeminiService(FakeGeminiService):
+    """Returns the same three questions per difficulty however many were asked for"""
+
+    async def generate_question_mix(self, topic, mix, class_level=5, subject_type='math'):
+        self.calls.append((topic, dict(mix)))
+        return [{"id": i, "question": f"{topic} {difficulty} {i}", "difficulty": difficulty}
+                for difficulty in mix for i in range(3)]
+
+
+@pytest.mark.asyncio
+async def test_unserved_live_candidates_are_not_marked_seen():
+    pool = QuestionPool(SurplusGeminiService(), low_water=0, target=2, max_keys=10, refill_interval=60)
+    served = [(await pool.take("Science", "easy", 1, student_id="s1"))[0]["question"] for _ in range(3)]
+    assert served == ["Science easy 0", "Science easy 1", "Science easy 2"]
@@ -0,0 +1,76 @@
+import asyncio
+import fcntl
+import pytest
+from src.services.rate_limiter import (
+    FileRateLimitBackend,
+    GeminiRateLimiter,
+    take_from_buckets,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_buckets_grant_until_request_quota_is_spent():
+    state = {}
+    for _ in range(15):
+        state, wait = take_from_buckets(state, 0.0, rpm=15, tpm=100000, tokens=10)
+        assert wait == 0
+    state, wait = take_from_buckets(state, 0.0, rpm=15, tpm=100000, tokens=10)
+    assert wait == pytest.approx(4.0)
+    state, wait = take_from_buckets(state, 4.0, rpm=15, tpm=100000, tokens=10)
+    assert wait == 0
+
+
+def test_buckets_enforce_token_quota():
+    state, wait = take_from_buckets({}, 0.0, rpm=100, tpm=600, tokens=500)
+    assert wait == 0
+    state, wait = take_from_buckets(state, 0.0, rpm=100, tpm=600, tokens=500)
+    assert wait == pytest.approx(40.0)
+
+
+@pytest.mark.asyncio
+async def test_file_backend_shares_quota_between_instances(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "quota.json")
+    first = FileRateLimitBackend(path, clock=clock)
+    second = FileRateLimitBackend(path, clock=clock)
+    assert await first.try_acquire(2, 1000, 1) == 0
+    assert await second.try_acquire(2, 1000, 1) == 0
+    assert await first.try_acquire(2, 1000, 1) > 0
+
+
+@pytest.mark.asyncio
+async def test_file_backend_waits_for_the_lock_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "quota.json")
+    backend = FileRateLimitBackend(path, clock=FakeClock())
+    with open(path, "a+") as held:
+        # Another worker holds the lock; the loop must keep running meanwhile
+        fcntl.flock(held, fcntl.LOCK_EX)
+        task = asyncio.create_task(backend.try_acquire(2, 1000, 1))
+        await asyncio.wait_for(asyncio.sleep(0.05), timeout=1)
+        assert not task.done()
+        fcntl.flock(held, fcntl.LOCK_UN)
+    assert await asyncio.wait_for(task, timeout=5) == 0
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_arrival_order():
+    # 1200 RPM refills one request every 50ms once the initial burst is spent
+    limiter = GeminiRateLimiter(rpm=1200, tpm=1000000)
+    while await limiter.backend.try_acquire(limiter.rpm, limiter.tpm, 0) == 0:
+        pass
+    order = []
+
+    async def waiter(name):
+        await limiter.acquire()
+        order.append(name)
+
+    tasks = [asyncio.create_task(waiter(name)) for name in ("a", "b", "c")]
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+    assert order == ["a", "b", "c"]
+    assert limiter.stats()["delayed"] == 3
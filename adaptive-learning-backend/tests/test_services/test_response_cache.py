@@ -0,0 +1,56 @@
+from src.services.response_cache import LRUTTLCache, make_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_cache_key_normalizes_text_and_tag_order():
+    first = make_cache_key("explanation", "What is  7 × 8?", ["Multiplication", "facts"], "56")
+    second = make_cache_key("explanation", "what is 7 × 8? ", ["facts", "multiplication"], "56")
+    assert first == second
+    assert first != make_cache_key("explanation", "What is 7 × 8?", ["facts"], "56")
+
+
+def test_cache_evicts_least_recently_used_by_entry_count():
+    cache = LRUTTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_evicts_by_byte_size():
+    cache = LRUTTLCache(max_entries=100, max_bytes=20)
+    cache.set("a", "x" * 10)
+    cache.set("b", "y" * 10)
+    assert len(cache) == 1
+    assert cache.current_bytes <= 20
+    assert not cache.set("huge", "z" * 100)
+
+
+def test_cache_expires_entries():
+    clock = FakeClock()
+    cache = LRUTTLCache(ttl_seconds=10, clock=clock)
+    cache.set("a", {"tip": "count by eights"})
+    clock.now = 9
+    assert cache.get("a") == {"tip": "count by eights"}
+    clock.now = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["expirations"] == 1
+    assert stats["entries"] == 0 and stats["bytes"] == 0
+
+
+def test_pop_removes_entry():
+    cache = LRUTTLCache()
+    cache.set("a", [1, 2])
+    assert cache.pop("a") == [1, 2]
+    assert cache.pop("a") is None
@@ -0,0 +1,118 @@
+import asyncio
+import random
+import sqlite3
+import pytest
+from src.services.gemini_service import GeminiService
+from src.services.llm_backends import FakeLLMBackend
+from src.services.prompt_templates import PROMPTS
+from src.services.response_store import ResponseStore, SQLiteResponseBackend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BrokenBackend:
+    async def get(self, key):
+        raise ConnectionError("down")
+
+    async def set(self, key, value, ttl_seconds):
+        raise ConnectionError("down")
+
+
+def make_service(path):
+    """A service as a fresh worker or restarted process would build it"""
+    service = GeminiService()
+    service.client = FakeLLMBackend(seed=1)
+    service.response_store = ResponseStore(SQLiteResponseBackend(path))
+    return service
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_round_trip_and_ttl(tmp_path):
+    clock = FakeClock()
+    backend = SQLiteResponseBackend(str(tmp_path / "store.sqlite3"), clock=clock)
+    await backend.set("k", {"tip": "count up"}, ttl_seconds=10)
+    assert await backend.get("k") == {"tip": "count up"}
+    clock.now = 11
+    assert await backend.get("k") is None
+    await backend.set("old", [1], ttl_seconds=5)
+    clock.now = 20
+    assert backend.purge_expired() == 1
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_waits_for_other_writers_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "store.sqlite3")
+    backend = SQLiteResponseBackend(path)
+    other_worker = sqlite3.connect(path, isolation_level=None)
+    other_worker.execute("BEGIN IMMEDIATE")
+    task = asyncio.create_task(backend.set("k", 1, ttl_seconds=10))
+    # The loop keeps serving while the write waits for the lock
+    await asyncio.wait_for(asyncio.sleep(0.05), timeout=1)
+    assert not task.done()
+    other_worker.execute("COMMIT")
+    await asyncio.wait_for(task, timeout=5)
+    other_worker.close()
+    assert await backend.get("k") == 1
+
+@pytest.mark.asyncio
+async def test_explanations_survive_restart_and_template_changes_invalidate(tmp_path, monkeypatch):
+    path = str(tmp_path / "store.sqlite3")
+    args = ("What is 9 × 6?", "54", "56", ["multiplication"])
+    first = make_service(path)
+    explanation = await first.generate_explanation(*args)
+    assert first.client.calls == 1
+
+    restarted = make_service(path)
+    assert await restarted.generate_explanation(*args) == explanation
+    assert restarted.client.calls == 0
+    assert restarted.response_store.stats()["hits"] == 1
+
+    monkeypatch.setattr(PROMPTS.get("explanation"), "version", "edited")
+    edited = make_service(path)
+    await edited.generate_explanation(*args)
+    assert edited.client.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_generated_questions_build_a_persistent_bank(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.services.gemini_service.settings.response_store_min_questions", 6)
+    monkeypatch.setattr("src.services.gemini_service.settings.response_store_generate_fraction", 0.0)
+    path = str(tmp_path / "store.sqlite3")
+    first = make_service(path)
+    for _ in range(2):
+        await first.generate_question_batch("Multiplication", "easy", count=3)
+    assert first.client.calls == 2
+
+    restarted = make_service(path)
+    questions = await restarted.generate_question_mix("Multiplication", {"easy": 2})
+    assert len(questions) == 2
+    assert restarted.client.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_full_bank_keeps_growing_from_a_share_of_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr("src.services.gemini_service.settings.response_store_min_questions", 3)
+    monkeypatch.setattr("src.services.gemini_service.settings.response_store_generate_fraction", 0.5)
+    service = make_service(str(tmp_path / "store.sqlite3"))
+    await service.generate_question_batch("Multiplication", "easy", count=3)
+    key = service._question_store_key("Multiplication", "easy", 5, "math")
+    random.seed(4)
+    for _ in range(20):
+        await service.generate_question_batch("Multiplication", "easy", count=1)
+    # Roughly half the requests still generated, and what they produced joined the bank
+    assert 5 <= service.client.calls - 1 <= 15
+    assert len(await service.response_store.get(key)) > 3
+
+@pytest.mark.asyncio
+async def test_store_errors_count_as_misses():
+    store = ResponseStore(BrokenBackend())
+    assert await store.get("k") is None
+    assert not await store.set("k", 1)
+    assert store.stats()["errors"] == 2
+    assert ResponseStore.make_key("explanation", "abc", "explanation:123") == "gemini:explanation:abc:123"
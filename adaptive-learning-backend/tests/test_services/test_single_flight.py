@@ -0,0 +1,65 @@
+import asyncio
+import pytest
+from src.services.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_calls_share_one_upstream_call():
+    flights = SingleFlight()
+    upstream_calls = []
+
+    async def upstream():
+        upstream_calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"tip": "count by sevens"}
+
+    results = await asyncio.gather(*(flights.do("same-key", upstream) for _ in range(30)))
+    assert len(upstream_calls) == 1
+    assert all(result == {"tip": "count by sevens"} for result in results)
+    assert flights.stats() == {"inFlight": 0, "upstreamCalls": 1, "collapsed": 29}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_collapsed():
+    flights = SingleFlight()
+
+    async def upstream(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(flights.do("a", lambda: upstream(1)), flights.do("b", lambda: upstream(2)))
+    assert results == [1, 2]
+    assert flights.stats()["collapsed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_key_is_released():
+    flights = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    results = await asyncio.gather(*(flights.do("k", failing) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def ok():
+        return "recovered"
+
+    assert await flights.do("k", ok) == "recovered"
+    assert flights.stats()["upstreamCalls"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    flights = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.create_task(flights.do("k", upstream))
+    second = asyncio.create_task(flights.do("k", upstream))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "done"